@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject.settings')
 
 application = get_asgi_application()
+
+# Prime the caches before the first request (settings.WARMUP_ON_STARTUP, see DjangoTradersApp/warmup.py).
+from DjangoTradersApp.warmup import on_application_loaded  # noqa: E402
+
+on_application_loaded()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "DjangoTradersApp.instrumentation.SQLInstrumentationMiddleware",
+    "DjangoTradersApp.routing.PrimaryPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -60,8 +63,18 @@ TEMPLATES = [
         "DIRS": [
             BASE_DIR / "static" / "templates",
         ],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compiled templates are kept for the life of the process (DjangoTradersApp/warmup.py compiles
+            # them all at startup). Replaces APP_DIRS, which cannot be combined with "loaders".
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
@@ -74,6 +87,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "DjangoProject.wsgi.application"
 
+# Compile all templates, resolve all URLs and prime the reference caches when a server process starts,
+# instead of on the first requests (DjangoTradersApp/warmup.py; "python manage.py warmup --measure" shows the gain).
+WARMUP_ON_STARTUP = True
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -95,6 +112,103 @@ DATABASES = {
     }
 }
 
+# Read replicas (DjangoTradersApp/routing.py): writes go to DATABASE_PRIMARY, reads to one of
+# DATABASE_REPLICAS chosen by DATABASE_REPLICA_POLICY ("round_robin" or "least_latency"), except the reads
+# of unsafe requests, of requests that wrote, and of the client's requests for DATABASE_REPLICA_PIN_SECONDS
+# after a write, which stay on the primary. Add replica aliases to DATABASES and list them here, e.g.
+#     "replica1": {..., "HOST": "replica1.internal", "TEST": {"MIRROR": "default"}},
+# With no replicas every query uses the primary.
+DATABASE_ROUTERS = ["DjangoTradersApp.routing.PrimaryReplicaRouter"]
+DATABASE_PRIMARY = "default"
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_POLICY = "round_robin"
+DATABASE_REPLICA_PIN_SECONDS = 5
+DATABASE_REPLICA_PROBE_SECONDS = 10
+DATABASE_PRIMARY_APPS = ["sessions"]
+
+
+# Caching
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Cached reference lookups (DjangoTradersApp/lookups.py), in seconds:
+# how long a list stays in the shared cache, and in each process's in-memory tier.
+REFERENCE_LOOKUP_TIMEOUT = 3600
+REFERENCE_LOOKUP_LOCAL_TIMEOUT = 60
+
+# Cached dropdown choices and their rendered <option> tags (DjangoTradersApp/choices.py), in seconds.
+# Writes to a table move its choice sets to a new version, so this only bounds how long unused versions are kept.
+CHOICE_SET_TIMEOUT = 3600
+
+# Cached product table rows (DjangoTradersApp/fragments.py), in seconds. Row keys include the version stamps
+# of the product, its category and its supplier, so this only bounds how long outdated rows are kept.
+PRODUCT_ROW_CACHE_TIMEOUT = 3600
+
+# Cached customer dashboards (DjangoTradersApp/dashboard.py), in seconds. Keys include the customer's version stamp,
+# bumped when the customer places an order, so this only bounds how long outdated dashboards are kept.
+CUSTOMER_DASHBOARD_CACHE_TIMEOUT = 3600
+
+# Search result caches (DjangoTradersApp/resultcache.py): results kept per process and cache, least recently used
+# first out. Hit/miss counters: DjTraders/Stats/SearchCache/.
+SEARCH_RESULT_CACHE_SIZE = 256
+
+# Release of the deployed code and templates (e.g. the git commit), part of the ETags of the conditional pages
+# (DjangoTradersApp/versioning.py) so a deploy does not keep serving 304s for the old markup.
+# When not set, every process start counts as a new release.
+RELEASE_ID = os.environ.get("DJANGO_RELEASE_ID")
+
+# Employee photos and category pictures (DjangoTradersApp/images.py): decoded images are kept as files in
+# IMAGE_CACHE_DIR (named by the row's version stamp), and responses may be cached by browsers for IMAGE_MAX_AGE seconds.
+IMAGE_CACHE_DIR = BASE_DIR / "cache" / "images"
+IMAGE_MAX_AGE = 30 * 24 * 3600
+
+# Employee commission tiers (DjangoTradersApp/commissions.py): (monthly net sales threshold, percent) pairs.
+# Each percentage applies to the part of an employee's monthly sales above its threshold.
+COMMISSION_TIERS = [(0, 2.0), (10000, 3.0), (25000, 5.0)]
+
+
+# Cursor (keyset) pagination for the customer and product lists (DjangoTradersApp/pagination.py).
+# When False, a list only uses it when the request has a "cursor" or "paging=keyset" parameter.
+KEYSET_PAGINATION = False
+
+
+# Per-request SQL instrumentation (DjangoTradersApp/instrumentation.py).
+# A WARNING is logged when a request runs more queries than the budget of its URL name;
+# DEFAULT_QUERY_BUDGET applies to URL names not listed (None: no budget).
+DEFAULT_QUERY_BUDGET = 50
+QUERY_BUDGETS = {
+    "DjTraders.CustomerDetail": 10,
+    "DjTraders.CustomerOrders": 5,
+    "DjTraders.ProductDetail": 5,
+    "DjTraders.Customers": 5,
+}
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# DjangoTradersApp logs operational metrics (e.g. order placement latency) at INFO level.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "DjangoTradersApp": {
+            "handlers": ["console"],
+            "level": "INFO",
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,145 @@
+"""
+Read-only JSON API for products (POS terminals and internal tools).
+
+    GET DjTraders/Api/Products/                          first page, all fields
+    GET DjTraders/Api/Products/?fields=product_id,unit_price,category_name
+    GET DjTraders/Api/Products/?cursor=<next_cursor>     the following page
+    GET DjTraders/Api/Products/?ids=1,2,3                a batch of products by ID (one query, no paging)
+
+fields= is translated into values(): only the requested columns are selected, and the category and
+supplier names are read through a join in the same query (like select_related, without building
+model instances) only when they are requested. Pages are ordered by product_id and use keyset
+cursors (pagination.KeysetPaginator), so deep pages cost the same as the first and no COUNT(*) is made.
+
+Responses are encoded with orjson when it is installed (json otherwise) straight from the rows,
+without templates. They carry an ETag/Last-Modified from the products, stock and reference version stamps
+(versioning.py), so a client polling an unchanged catalog gets 304 Not Modified.
+"""
+
+import json
+
+from django.db.models import F
+from django.http import HttpResponse
+
+from .models import Products
+from .pagination import InvalidCursor, KeysetPaginator
+
+try:
+    import orjson
+except ImportError:  # optional: the standard json module is used without it
+    orjson = None
+
+
+# Public field name: ORM lookup.
+PRODUCT_FIELDS = {
+    "product_id": "product_id",
+    "product_name": "product_name",
+    "quantity_per_unit": "quantity_per_unit",
+    "unit_price": "unit_price",
+    "units_in_stock": "units_in_stock",
+    "units_on_order": "units_on_order",
+    "reorder_level": "reorder_level",
+    "discontinued": "discontinued",
+    "category_id": "category_id",
+    "category_name": "category__category_name",
+    "supplier_id": "supplier_id",
+    "supplier_name": "supplier__company_name",
+}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_IDS = 500
+
+
+class BadRequest(ValueError):
+    """An invalid query parameter; the message is returned to the client."""
+
+
+# region Encoding
+
+def dumps(payload):
+    """The payload as JSON bytes."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS: integer keys become strings, as with json.
+        return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(payload, status=200):
+    return HttpResponse(dumps(payload), content_type="application/json", status=status)
+
+# endregion Encoding
+
+
+# region Query parameters
+
+def parse_fields(value):
+    """The requested field names, in order (all fields when value is empty)."""
+    if not value:
+        return list(PRODUCT_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in PRODUCT_FIELDS]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(PRODUCT_FIELDS)}.")
+    return fields
+
+
+def parse_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(",") if part.strip()))
+    except ValueError:
+        raise BadRequest("ids must be a comma-separated list of product IDs.")
+    if len(ids) > MAX_IDS:
+        raise BadRequest(f"At most {MAX_IDS} ids per request.")
+    return ids
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest("limit must be a number.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+# endregion Query parameters
+
+
+def product_values(fields):
+    """Products as dicts of the requested fields (product_id is always selected, for the cursors and batches)."""
+    selected = fields if "product_id" in fields else ["product_id", *fields]
+    columns = {name: F(PRODUCT_FIELDS[name]) for name in selected if PRODUCT_FIELDS[name] != name}
+    return Products.objects.values(*(name for name in selected if name not in columns), **columns)
+
+
+def project(rows, fields):
+    """Drops product_id from rows where it was selected only for paging."""
+    if "product_id" in fields:
+        return rows
+    return [{name: row[name] for name in fields} for row in rows]
+
+
+def products_page(params):
+    """The response payload of the products API for the query parameters (a QueryDict or dict)."""
+    fields = parse_fields(params.get("fields", ""))
+
+    if params.get("ids"):
+        ids = parse_ids(params["ids"])
+        rows = {row["product_id"]: row for row in product_values(fields).filter(product_id__in=ids)}
+        return {
+            "results": project([rows[product_id] for product_id in ids if product_id in rows], fields),
+            "missing": [product_id for product_id in ids if product_id not in rows],
+        }
+
+    paginator = KeysetPaginator(product_values(fields), parse_limit(params.get("limit")), "product_id")
+    try:
+        page = paginator.page(params.get("cursor") or None)
+    except InvalidCursor:
+        raise BadRequest("Invalid cursor.")
+    return {
+        "results": project(page.object_list, fields),
+        "next_cursor": page.next_cursor,
+        "previous_cursor": page.previous_cursor,
+    }
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class DjangotradersappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'DjangoTradersApp'
+
+    def ready(self):
+        # Connect the signal handlers that keep search documents and caches in sync with writes.
+        from . import signals  # noqa: F401
+
+        # Compile the templates and resolve the URLs before the first request (settings.WARMUP_ON_STARTUP).
+        from . import warmup
+        warmup.on_ready()
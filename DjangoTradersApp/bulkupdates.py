@@ -0,0 +1,327 @@
+"""
+Bulk product price and stock updates.
+
+Repricing hundreds of products through ProductUpdateView meant one form validation and one full-row UPDATE
+per product. Two set-based entry points replace that, each in one transaction:
+
+    apply_changes(selection, changes)   the same change for every selected product, e.g. +5% on the prices
+                                        of one supplier: Change("unit_price", "percent", 5).
+                                        One SELECT computes the current and new values of the selected rows
+                                        (the change as an F() expression, rows locked with SELECT ... FOR UPDATE
+                                        where supported), one UPDATE applies the expression to the changed rows.
+    apply_values(rows)                  explicit new values per product ({"product_id": 11, "unit_price": 21.5}):
+                                        one SELECT of the current values, then bulk_update().
+
+New values are validated in batch with ProductForm's rules (forms.validate_product_number) and the columns'
+ranges before anything is written; any invalid value rejects the whole batch with BulkUpdateError, which
+lists every error per product. Both return an UpdateSummary: the old and new value of every changed field.
+
+Bulk updates send no post_save signals, so products_updated() does what signals.py does for a product save:
+bumps the version stamps of the changed products (their pages and product table rows) and invalidates the
+product choice set (its labels show prices) and the product search result cache. The stamps are rows written
+in the update's transaction, so they change when it commits; the caches are not transactional, so they are
+invalidated once it has committed (before that, a concurrent request could cache the old values again).
+The search documents only hold names, so they are not touched.
+
+Used by the DjTraders.Api.ProductsBulkUpdate view and the "bulk_update_products" management command.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Round
+
+from . import choices, resultcache, versioning
+from .forms import validate_product_number
+from .models import Products
+
+
+# Editable field: Python type of its values.
+FIELDS = {
+    "unit_price": float,
+    "units_in_stock": int,
+    "units_on_order": int,
+    "reorder_level": int,
+}
+OPERATIONS = ("set", "add", "percent")
+PRICE_DECIMALS = 2
+BATCH_SIZE = 500
+
+
+class BulkUpdateError(ValueError):
+    """
+    An invalid bulk update. errors maps product IDs to {field: [messages]}
+    (empty when the request itself is invalid).
+    """
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+# region Changes
+
+@dataclass(frozen=True)
+class Change:
+    """
+    A change of one field of every selected product:
+        set      the value,
+        add      the value (negative to subtract),
+        percent  the value in percent (prices only).
+    Changed prices are rounded to cents.
+    """
+    field: str
+    operation: str
+    value: float
+
+    @classmethod
+    def parse(cls, field, operation, value):
+        """Builds a Change from user input; raises BulkUpdateError if it is invalid."""
+        if field not in FIELDS:
+            raise BulkUpdateError(f"Unknown field {field!r}; use one of {', '.join(FIELDS)}.")
+        if operation not in OPERATIONS:
+            raise BulkUpdateError(f"Unknown operation {operation!r}; use one of {', '.join(OPERATIONS)}.")
+        if operation == "percent" and field != "unit_price":
+            raise BulkUpdateError("Only unit_price can be changed by a percentage.")
+        kind = float if operation == "percent" else FIELDS[field]
+        return cls(field, operation, _number(value, kind, field))
+
+    def expression(self):
+        column = F(self.field)
+        if self.operation == "set":
+            return Value(self.value)
+        if self.operation == "add":
+            expression = column + self.value
+        else:
+            expression = column * (1 + self.value / 100)
+        if self.field != "unit_price":
+            return expression
+        # ROUND with a precision computes in numeric on PostgreSQL (a Decimal in Python): cast back to a float.
+        return Cast(Round(expression, PRICE_DECIMALS), FloatField())
+
+
+def _number(value, kind, name):
+    try:
+        number = kind(value)
+    except (TypeError, ValueError):
+        raise BulkUpdateError(f"{name}: {value!r} is not a{'n integer' if kind is int else ' number'}.")
+    if kind is int and isinstance(value, float) and value != number:
+        raise BulkUpdateError(f"{name}: {value!r} is not an integer.")
+    return number
+
+
+def select(supplier_id=None, category_id=None, product_ids=None, all_products=False):
+    """
+    The products to change: the intersection of the given filters.
+    Without any filter all_products must be True, so an incomplete request never reprices the whole catalog.
+    """
+    queryset = Products.objects.all()
+    if supplier_id is not None:
+        queryset = queryset.filter(supplier_id=supplier_id)
+    if category_id is not None:
+        queryset = queryset.filter(category_id=category_id)
+    if product_ids is not None:
+        queryset = queryset.filter(product_id__in=product_ids)
+    if supplier_id is None and category_id is None and product_ids is None and not all_products:
+        raise BulkUpdateError("Select the products by supplier, category or product IDs (or all products).")
+    return queryset
+
+# endregion Changes
+
+
+# region Validation
+
+def validate(values):
+    """The errors ({field: [messages]}) of new field values: ProductForm's rules and the column's range."""
+    errors = {}
+    for name, value in values.items():
+        try:
+            validate_product_number(name, value)
+            if value is not None:
+                Products._meta.get_field(name).run_validators(value)
+        except ValidationError as error:
+            errors.setdefault(name, []).extend(error.messages)
+    return errors
+
+# endregion Validation
+
+
+@dataclass
+class UpdateSummary:
+    """
+    The outcome of a bulk update: how many products were selected, and for each changed product
+    its name and {field: (old value, new value)} of the fields that changed.
+    """
+    matched: int = 0
+    changes: list = field(default_factory=list)
+    dry_run: bool = False
+    elapsed_ms: float = 0.0
+
+    @property
+    def updated(self):
+        return len(self.changes)
+
+    def as_dict(self):
+        return {
+            "matched": self.matched,
+            "updated": self.updated,
+            "dry_run": self.dry_run,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "changes": [
+                {"product_id": product_id, "product_name": name,
+                 "fields": {field_name: {"old": old, "new": new} for field_name, (old, new) in fields.items()}}
+                for product_id, name, fields in self.changes
+            ],
+        }
+
+
+def _diff(product_id, old_values, new_values, errors):
+    """Collects the errors of the new values; returns the changed fields ({field: (old, new)})."""
+    problems = validate(new_values)
+    if problems:
+        errors[product_id] = problems
+    return {name: (old_values[name], new) for name, new in new_values.items() if new != old_values[name]}
+
+
+def _check(errors):
+    if errors:
+        raise BulkUpdateError(f"{len(errors)} product(s) would get invalid values; nothing was changed.", errors)
+
+
+def apply_changes(queryset, changes, dry_run=False):
+    """
+    Applies the same changes to every product of queryset (see select()) in one transaction.
+    Raises BulkUpdateError (and changes nothing) if any new value is invalid.
+    """
+    if not changes:
+        raise BulkUpdateError("No changes given.")
+    if len({change.field for change in changes}) != len(changes):
+        raise BulkUpdateError("Each field can only be changed once per update.")
+    started = time.perf_counter()
+    expressions = {change.field: change.expression() for change in changes}
+    summary = UpdateSummary(dry_run=dry_run)
+    with transaction.atomic():
+        rows = list(
+            queryset.select_for_update().order_by("product_id")
+            .values("product_id", "product_name", *expressions)
+            .annotate(**{f"new_{name}": expression for name, expression in expressions.items()})
+        )
+        errors = {}
+        for row in rows:
+            fields = _diff(row["product_id"], row, {name: row[f"new_{name}"] for name in expressions}, errors)
+            if fields:
+                summary.changes.append((row["product_id"], row["product_name"], fields))
+        _check(errors)
+        summary.matched = len(rows)
+
+        changed_ids = [product_id for product_id, _, _ in summary.changes]
+        if changed_ids and not dry_run:
+            Products.objects.filter(product_id__in=changed_ids).update(**expressions)
+            products_updated(changed_ids)
+    summary.elapsed_ms = (time.perf_counter() - started) * 1000
+    return summary
+
+
+def parse_rows(rows):
+    """
+    Explicit new values ({"product_id": ..., field: value, ...} per product) with typed values.
+    Blank values (None or "") leave the field unchanged; a product may only appear once.
+    """
+    parsed = {}
+    for position, row in enumerate(rows, start=1):
+        unknown = set(row) - {"product_id", *FIELDS}
+        if unknown:
+            raise BulkUpdateError(f"Row {position}: unknown fields {', '.join(sorted(unknown))}.")
+        product_id = _number(row.get("product_id"), int, f"Row {position}: product_id")
+        if product_id in parsed:
+            raise BulkUpdateError(f"Row {position}: product {product_id} appears twice.")
+        parsed[product_id] = {
+            name: _number(value, FIELDS[name], f"Row {position}: {name}")
+            for name, value in row.items() if name != "product_id" and value not in (None, "")
+        }
+    return parsed
+
+
+def apply_values(rows, dry_run=False):
+    """
+    Sets explicit new values per product (see parse_rows()) in one transaction with bulk_update().
+    Raises BulkUpdateError (and changes nothing) for unknown products or invalid values.
+    """
+    started = time.perf_counter()
+    values = parse_rows(rows)
+    names = sorted({name for row in values.values() for name in row})
+    summary = UpdateSummary(dry_run=dry_run)
+    with transaction.atomic():
+        products = Products.objects.select_for_update().only("product_id", "product_name", *names).in_bulk(values)
+        errors = {product_id: {"product_id": ["Unknown product."]} for product_id in values if product_id not in products}
+        changed = []
+        for product_id in sorted(products):
+            product = products[product_id]
+            old_values = {name: getattr(product, name) for name in values[product_id]}
+            fields = _diff(product_id, old_values, values[product_id], errors)
+            if fields:
+                for name, (_, new) in fields.items():
+                    setattr(product, name, new)
+                changed.append(product)
+                summary.changes.append((product_id, product.product_name, fields))
+        _check(errors)
+        summary.matched = len(products)
+
+        if changed and not dry_run:
+            Products.objects.bulk_update(changed, names, batch_size=BATCH_SIZE)
+            products_updated([product.product_id for product in changed])
+    summary.elapsed_ms = (time.perf_counter() - started) * 1000
+    return summary
+
+
+def products_updated(product_ids):
+    """
+    What the post_save signal handlers (signals.py) do for a product save, for the bulk-updated products.
+    Call inside the update's transaction: the caches are invalidated when it commits.
+    """
+    versioning.bump(*(versioning.product_key(product_id) for product_id in product_ids), versioning.PRODUCTS)
+    transaction.on_commit(_invalidate_caches)
+
+
+def _invalidate_caches():
+    choices.invalidate_model(Products)
+    resultcache.invalidate_model(Products)
+
+
+def apply_request(payload):
+    """
+    Runs a bulk update described by a JSON object (the DjTraders.Api.ProductsBulkUpdate request body):
+        {"select": {"supplier_id": 1, "category_id": 2, "product_ids": [...], "all": true},
+         "changes": [{"field": "unit_price", "operation": "percent", "value": 5}, ...]}
+    or
+        {"products": [{"product_id": 11, "unit_price": 21.5, "units_in_stock": 40}, ...]}
+    with "dry_run": true to get the summary without writing.
+    """
+    if not isinstance(payload, dict):
+        raise BulkUpdateError("The request must be a JSON object.")
+    dry_run = bool(payload.get("dry_run", False))
+    if "products" in payload:
+        if not isinstance(payload["products"], list) or not all(isinstance(row, dict) for row in payload["products"]):
+            raise BulkUpdateError("products must be a list of objects.")
+        return apply_values(payload["products"], dry_run=dry_run)
+
+    selection = payload.get("select") or {}
+    changes = payload.get("changes") or []
+    if not isinstance(selection, dict) or not isinstance(changes, list):
+        raise BulkUpdateError("select must be an object and changes a list.")
+    product_ids = selection.get("product_ids")
+    queryset = select(
+        supplier_id=selection.get("supplier_id"),
+        category_id=selection.get("category_id"),
+        product_ids=[_number(product_id, int, "product_ids") for product_id in product_ids]
+        if product_ids is not None else None,
+        all_products=selection.get("all") is True,
+    )
+    try:
+        parsed = [Change.parse(change["field"], change["operation"], change["value"]) for change in changes]
+    except (KeyError, TypeError):
+        raise BulkUpdateError("Each change needs a field, an operation and a value.")
+    return apply_changes(queryset, parsed, dry_run=dry_run)
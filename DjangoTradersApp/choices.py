@@ -0,0 +1,177 @@
+"""
+Cached choice sets for the dropdowns of the order wizard and the product forms.
+
+A ModelChoiceField renders its <select> by querying the whole table and rendering one <option>
+template per row, on every render of the form (thousands of options for customers and products).
+
+A ChoiceSet keeps, per version of the underlying table:
+    - the (value, label) list, and
+    - the pre-rendered <option> HTML for it,
+in a per-process dictionary and in the Django cache (settings.CACHES), shared by all processes.
+
+Versioning (see versionedcache.py): writes to the set's model move it to a new version (invalidate_model,
+called from signals.py), so every process sees the change on its next render; entries of older versions are
+simply no longer read. A render on a warm cache costs one cache read (the version) and no database queries.
+
+CachedSelect is the Select widget that renders from a ChoiceSet; the forms' ModelChoiceFields keep
+their querysets, so validation (one primary-key lookup of the submitted value) is unchanged.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.forms import Select
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from . import versionedcache
+
+
+CACHE_KEY_PREFIX = "choice_set"
+
+
+class ChoiceSet(versionedcache.VersionedCache):
+    """
+    A cached list of (value, label) choices and their rendered <option> tags.
+
+    name:     unique name, used in the cache keys.
+    model:    model label, e.g. "DjangoTradersApp.Customers" (resolved lazily).
+    fields:   fields read with values_list; the first one is the option value.
+    label:    function building the option label from the values_list row.
+    filters:  queryset filters (e.g. {"discontinued": 0}).
+    order_by: ordering of the choices (defaults to the value field).
+    """
+
+    key_prefix = CACHE_KEY_PREFIX
+
+    def __init__(self, name, model, fields, label, filters=None, order_by=None):
+        super().__init__(name, [model])
+        self.fields = fields
+        self.label = label
+        self.filters = filters or {}
+        self.order_by = order_by or fields[0]
+        self._local = None  # (version, entry)
+
+    @property
+    def model(self):
+        return self.models[0]
+
+    @property
+    def timeout(self):
+        return getattr(settings, "CHOICE_SET_TIMEOUT", 3600)
+
+    def get(self):
+        """
+        Returns {"choices": [(value, label), ...], "options_html": "<option ...>..."} for the current version,
+        from the process tier, the Django cache or the database (in that order).
+        """
+        version = self.version()
+        local = self._local
+        if local is not None and local[0] == version:
+            return local[1]
+
+        key = self.entry_key(version)
+        entry = cache.get(key)
+        if entry is None:
+            entry = self.load()
+            cache.set(key, entry, self.timeout)
+        with self._lock:
+            self._local = (version, entry)
+        return entry
+
+    def load(self):
+        """Reads the choices (one query) and renders their <option> tags."""
+        rows = (
+            self.model.objects.filter(**self.filters)
+            .order_by(self.order_by)
+            .values_list(*self.fields)
+        )
+        choices = [(str(row[0]), self.label(*row)) for row in rows]
+        options_html = "".join(
+            format_html('<option value="{}">{}</option>', value, label) for value, label in choices
+        )
+        return {"choices": choices, "options_html": options_html}
+
+    @property
+    def choices(self):
+        return self.get()["choices"]
+
+    def clear_local(self):
+        self._local = None
+
+
+class CachedSelect(Select):
+    """
+    A Select widget that renders its options from a ChoiceSet instead of iterating the field's queryset.
+    The empty option is taken from the field's empty_label.
+    """
+
+    def __init__(self, choice_set, attrs=None):
+        super().__init__(attrs)
+        self.choice_set = choice_set
+
+    def _empty_label(self):
+        field = getattr(self.choices, "field", None)  # ModelChoiceIterator of the bound ModelChoiceField
+        return getattr(field, "empty_label", None)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        selected = [str(v) for v in self.format_value(value) if v != ""]
+        options = self.choice_set.get()["options_html"]
+        for item in selected:
+            option = format_html('<option value="{}">', item)
+            options = options.replace(option, option[:-1] + " selected>", 1)
+
+        empty_label = self._empty_label()
+        empty = ""
+        if empty_label is not None:
+            empty = format_html(
+                '<option value=""{}>{}</option>', mark_safe("" if selected else " selected"), empty_label
+            )
+        final_attrs = self.build_attrs(self.attrs, attrs)
+        return mark_safe(
+            format_html("<select name=\"{}\"{}>", name, flatatt(final_attrs)) + empty + options + "</select>"
+        )
+
+
+# region Registered choice sets
+
+CUSTOMERS = ChoiceSet(
+    "customers", "DjangoTradersApp.Customers", ("customer_id", "company_name"),
+    lambda customer_id, company_name: f"{company_name} ({customer_id})",
+)
+ORDERABLE_PRODUCTS = ChoiceSet(
+    "orderable_products", "DjangoTradersApp.Products", ("product_id", "product_name", "unit_price"),
+    lambda product_id, product_name, unit_price: f"{product_name} - ${unit_price or 0:.2f}",
+    filters={"discontinued": 0},
+)
+EMPLOYEES = ChoiceSet(
+    "employees", "DjangoTradersApp.Employees", ("employee_id", "first_name", "last_name"),
+    lambda employee_id, first_name, last_name: f"{first_name} {last_name}",
+)
+SHIPPERS = ChoiceSet(
+    "shippers", "DjangoTradersApp.Shippers", ("shipper_id", "company_name"),
+    lambda shipper_id, company_name: company_name,
+)
+SUPPLIERS = ChoiceSet(
+    "suppliers", "DjangoTradersApp.Suppliers", ("supplier_id", "company_name"),
+    lambda supplier_id, company_name: company_name,
+)
+CATEGORIES = ChoiceSet(
+    "categories", "DjangoTradersApp.Categories", ("category_id", "category_name"),
+    lambda category_id, category_name: category_name,
+)
+
+REGISTRY = [CUSTOMERS, ORDERABLE_PRODUCTS, EMPLOYEES, SHIPPERS, SUPPLIERS, CATEGORIES]
+
+# endregion Registered choice sets
+
+
+def invalidate_model(model):
+    """
+    Invalidates every registered choice set over the given model (call after writes to that model).
+    """
+    versionedcache.invalidate_model(REGISTRY, model)
+
+
+def invalidate_all():
+    versionedcache.invalidate_all(REGISTRY)
@@ -0,0 +1,228 @@
+"""
+Employee commission report: net sales and tiered commission per employee and month, for a date range.
+
+The orders placed through the order wizard are assigned to an employee "for commission" (Orders.employee).
+report() sums their lines in the database, in one query:
+    SELECT employee, month, SUM(net line total), SUM(quantity), COUNT(DISTINCT order)
+    FROM order_details JOIN orders JOIN employees
+    WHERE order_date BETWEEN start AND end GROUP BY employee, month
+so a year of lines is aggregated where it is stored; only one row per employee and month is returned,
+and the commission is computed on those rows. Orders without an employee or an order date are not counted.
+
+Commission rules (CommissionPlan) are marginal tiers over an employee's net sales of one calendar month:
+each tier's percentage applies to the part of the month's sales above its threshold, like tax brackets.
+The default plan is settings.COMMISSION_TIERS, a list of (threshold, percent) pairs:
+    COMMISSION_TIERS = [(0, 2.0), (10000, 3.0), (25000, 5.0)]
+(written "0:2,10000:3,25000:5" in the report's tiers field, see CommissionPlan.parse()); with it,
+$30,000 of sales in a month earn 2% of 10,000 + 3% of 15,000 + 5% of 5,000 = $900.
+Net sales are unit_price * quantity * (1 - discount / 100), as in OrderDetails.line_total.
+
+Used by the DjTraders.CommissionReport view (HTML and CSV download) and the "commission_report" command.
+"""
+
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import TruncMonth
+
+from .models import OrderDetails
+
+
+DEFAULT_TIERS = ((0, 2.0), (10000, 3.0), (25000, 5.0))
+CSV_COLUMNS = ("employee_id", "employee", "month", "orders", "units", "net_sales", "commission")
+
+
+class InvalidPlan(ValueError):
+    """Invalid commission tiers; the message is shown to the user."""
+
+
+# region Commission rules
+
+@dataclass(frozen=True)
+class Tier:
+    """Sales above threshold (in a month) earn percent commission, up to the next tier's threshold."""
+    threshold: float
+    percent: float
+
+
+@dataclass(frozen=True)
+class CommissionPlan:
+    """Marginal commission tiers, in ascending threshold order."""
+    tiers: tuple
+
+    @classmethod
+    def build(cls, tiers):
+        """A plan from (threshold, percent) pairs; raises InvalidPlan if they are not valid tiers."""
+        tiers = tuple(Tier(float(threshold), float(percent)) for threshold, percent in tiers)
+        if not tiers:
+            raise InvalidPlan("At least one commission tier is required.")
+        for tier in tiers:
+            if tier.threshold < 0:
+                raise InvalidPlan("Tier thresholds cannot be negative.")
+            if not 0 <= tier.percent <= 100:
+                raise InvalidPlan("Tier percentages must be between 0 and 100.")
+        if any(lower.threshold >= upper.threshold for lower, upper in zip(tiers, tiers[1:])):
+            raise InvalidPlan("Tier thresholds must be in ascending order.")
+        return cls(tiers)
+
+    @classmethod
+    def parse(cls, text):
+        """A plan from "threshold:percent" pairs separated by commas, e.g. "0:2,10000:3,25000:5"."""
+        try:
+            pairs = [
+                (float(threshold), float(percent))
+                for threshold, percent in (part.split(":") for part in text.split(",") if part.strip())
+            ]
+        except ValueError:
+            raise InvalidPlan('Use "threshold:percent" pairs separated by commas, e.g. "0:2,10000:3,25000:5".')
+        return cls.build(pairs)
+
+    @classmethod
+    def default(cls):
+        return cls.build(getattr(settings, "COMMISSION_TIERS", DEFAULT_TIERS))
+
+    def __str__(self):
+        return ",".join(f"{tier.threshold:g}:{tier.percent:g}" for tier in self.tiers)
+
+    def commission(self, sales):
+        """The commission on one month's net sales."""
+        total = 0.0
+        for tier, upper in zip(self.tiers, [*(tier.threshold for tier in self.tiers[1:]), None]):
+            if sales <= tier.threshold:
+                break
+            portion = (sales if upper is None else min(sales, upper)) - tier.threshold
+            total += portion * tier.percent / 100
+        return round(total, 2)
+
+# endregion Commission rules
+
+
+# region Report
+
+@dataclass
+class EmployeeMonth:
+    """The sales of one employee in one calendar month (month: its first day)."""
+    employee_id: int
+    employee_name: str
+    month: object
+    orders: int
+    units: int
+    net_sales: float
+    commission: float
+
+
+@dataclass
+class EmployeeCommission:
+    """An employee's months and totals in the report."""
+    employee_id: int
+    employee_name: str
+    months: list = field(default_factory=list)
+
+    @property
+    def orders(self):
+        return sum(month.orders for month in self.months)
+
+    @property
+    def units(self):
+        return sum(month.units for month in self.months)
+
+    @property
+    def net_sales(self):
+        return sum(month.net_sales for month in self.months)
+
+    @property
+    def commission(self):
+        return round(sum(month.commission for month in self.months), 2)
+
+
+@dataclass
+class CommissionReport:
+    """Commission per employee and month between start and end (inclusive) under plan."""
+    start: object
+    end: object
+    plan: CommissionPlan
+    months: list = field(default_factory=list)
+
+    def employees(self):
+        """The months grouped per employee, in report order (by name)."""
+        employees = {}
+        for month in self.months:
+            if month.employee_id not in employees:
+                employees[month.employee_id] = EmployeeCommission(month.employee_id, month.employee_name)
+            employees[month.employee_id].months.append(month)
+        return list(employees.values())
+
+    @property
+    def net_sales(self):
+        return sum(month.net_sales for month in self.months)
+
+    @property
+    def commission(self):
+        return round(sum(month.commission for month in self.months), 2)
+
+    def filename(self):
+        return f"commissions_{self.start:%Y-%m-%d}_{self.end:%Y-%m-%d}.csv"
+
+
+def monthly_sales(start, end):
+    """
+    Net sales, units and orders per employee and month of the orders dated start..end, aggregated in one
+    GROUP BY query (dicts ordered by employee name and month).
+    """
+    gross = F("unit_price") * F("quantity")
+    return (
+        OrderDetails.objects.order_by()
+        .filter(order__order_date__range=(start, end), order__employee__isnull=False)
+        .values(
+            employee_id=F("order__employee_id"),
+            first_name=F("order__employee__first_name"),
+            last_name=F("order__employee__last_name"),
+            month=TruncMonth("order__order_date"),
+        )
+        .annotate(
+            net_sales=Sum(gross - gross * F("discount") / Value(100.0), output_field=FloatField()),
+            units=Sum("quantity"),
+            orders=Count("order_id", distinct=True),
+        )
+        .order_by("last_name", "first_name", "employee_id", "month")
+    )
+
+
+def report(start, end, plan=None):
+    """The commission report for the orders dated start..end (inclusive), under plan (the default plan if None)."""
+    plan = plan or CommissionPlan.default()
+    months = [
+        EmployeeMonth(
+            employee_id=row["employee_id"],
+            employee_name=f"{row['first_name']} {row['last_name']}",
+            month=row["month"],
+            orders=row["orders"],
+            units=row["units"],
+            net_sales=round(row["net_sales"], 2),
+            commission=plan.commission(row["net_sales"]),
+        )
+        for row in monthly_sales(start, end)
+    ]
+    return CommissionReport(start, end, plan, months)
+
+# endregion Report
+
+
+def write_csv(commission_report, stream):
+    """Writes the per-employee, per-month rows of the report as CSV."""
+    writer = csv.writer(stream)
+    writer.writerow(CSV_COLUMNS)
+    for month in commission_report.months:
+        writer.writerow([
+            month.employee_id, month.employee_name, f"{month.month:%Y-%m}", month.orders, month.units,
+            f"{month.net_sales:.2f}", f"{month.commission:.2f}",
+        ])
+
+
+def to_csv(commission_report):
+    stream = io.StringIO()
+    write_csv(commission_report, stream)
+    return stream.getvalue()
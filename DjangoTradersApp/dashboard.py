@@ -0,0 +1,90 @@
+"""
+Cached customer dashboard (the context of CustomerDetailView / Customers/Detail.html).
+
+The page used to run a query for the order history, one per order for its shipper while rendering,
+a COUNT and a rollup lookup for the statistics, and the product lookups. build() fetches everything
+in two queries:
+    1. the orders with their totals (Orders.with_totals()) and shippers (JOIN),
+    2. the purchase summary (Customers.get_purchase_summary()),
+and derives the order count, revenue and product count from those two result sets.
+
+The assembled CustomerDashboard is cached (settings.CACHES) under a key made of the customer ID and
+the version stamps of the page (versioning.py):
+    customer_dashboard:<customer_id>:<customer version>-<products version>-<reference version>
+An order placed (or imported) for the customer bumps the customer's stamp, a product or reference data
+change bumps the others, so the next request builds a new dashboard; outdated entries are no longer read
+and expire after CUSTOMER_DASHBOARD_CACHE_TIMEOUT seconds. CustomerDetailView reads the same stamps for
+conditional GET, so a cached dashboard costs no query beyond the stamp lookup and the customer.
+"""
+
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versioning
+from .models import Customers
+
+
+CACHE_KEY_PREFIX = "customer_dashboard"
+
+
+def stamp_keys(customer_id):
+    """The version stamps of a customer's dashboard (and of its page)."""
+    return [versioning.customer_key(customer_id), versioning.PRODUCTS, versioning.REFERENCE]
+
+
+@dataclass
+class CustomerDashboard:
+    """The order history (Orders with totals and shippers) and purchase summary of a customer."""
+    orders: list = field(default_factory=list)
+    products: list = field(default_factory=list)
+
+    @property
+    def orders_count(self):
+        return len(self.orders)
+
+    @property
+    def revenue(self):
+        return sum(order.net_total for order in self.orders)
+
+    @property
+    def products_count(self):
+        return len(self.products)
+
+    def context(self):
+        return {
+            "orders": self.orders,
+            "orders_count": self.orders_count,
+            "revenue": self.revenue,
+            "products": self.products,
+            "products_count": self.products_count,
+        }
+
+
+def build(customer_id):
+    """Builds the dashboard of a customer with two queries."""
+    customer = Customers(customer_id=customer_id)
+    return CustomerDashboard(
+        orders=list(customer.get_orders().with_totals().select_related("ship_via")),
+        products=list(customer.get_purchase_summary()),
+    )
+
+
+def cache_key(customer_id, stamp):
+    return f"{CACHE_KEY_PREFIX}:{customer_id}:{stamp.etag}"
+
+
+def customer_dashboard(customer_id, stamp=None):
+    """
+    The dashboard of a customer, from the cache or built (and cached).
+    stamp: the page's versioning.Stamp when the caller already has it (read otherwise).
+    """
+    if stamp is None:
+        stamp = versioning.lookup(*stamp_keys(customer_id))
+    key = cache_key(customer_id, stamp)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = build(customer_id)
+        cache.set(key, dashboard, getattr(settings, "CUSTOMER_DASHBOARD_CACHE_TIMEOUT", 3600))
+    return dashboard
@@ -0,0 +1,141 @@
+"""
+Streaming CSV/JSONL exports of customers, orders (with computed totals) and order lines.
+
+Rows are read with QuerySet.values_list(...).iterator(chunk_size=...), so only tuples are built
+(no model instances) and only one chunk of rows is held in memory at a time;
+on PostgreSQL the iterator uses a server-side cursor.
+The output is produced by generators: StreamingHttpResponse (views.export) sends the first bytes
+as soon as the first chunk is read, and "python manage.py export" writes it to a file or stdout.
+Optional gzip compression is applied on the fly.
+"""
+
+import csv
+import json
+import zlib
+from dataclasses import dataclass
+
+from django.db.models import F
+
+from .models import Customers, OrderDetails, Orders
+
+
+DEFAULT_CHUNK_SIZE = 2000
+# Rows are joined into blocks of about this many characters before being yielded.
+BLOCK_SIZE = 64 * 1024
+FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """An exportable dataset: the queryset factory and the exported columns (in order)."""
+    name: str
+    columns: tuple
+    build_queryset: object
+
+    def rows(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yields one tuple per row."""
+        queryset = self.build_queryset().values_list(*self.columns)
+        return queryset.iterator(chunk_size=chunk_size)
+
+
+def _orders_queryset():
+    return Orders.objects.with_totals().order_by("order_id")
+
+
+def _order_lines_queryset():
+    gross = F("unit_price") * F("quantity")
+    return OrderDetails.objects.annotate(
+        line_total=gross - gross * F("discount") / 100.0,
+    ).order_by("order_id", "product_id")
+
+
+# The customers password column is deliberately never exported.
+DATASETS = {
+    dataset.name: dataset
+    for dataset in [
+        Dataset(
+            "customers",
+            ("customer_id", "company_name", "contact_name", "contact_title", "address", "city",
+             "region", "postal_code", "country", "phone", "fax"),
+            lambda: Customers.objects.order_by("customer_id"),
+        ),
+        Dataset(
+            "orders",
+            ("order_id", "customer_id", "employee_id", "order_date", "required_date", "shipped_date",
+             "ship_via", "freight", "ship_name", "ship_address", "ship_city", "ship_region",
+             "ship_postal_code", "ship_country", "line_count", "gross_total", "discount_total", "net_total"),
+            _orders_queryset,
+        ),
+        Dataset(
+            "order_lines",
+            ("order_id", "product_id", "unit_price", "quantity", "discount", "line_total"),
+            _order_lines_queryset,
+        ),
+    ]
+}
+
+
+# region Encoders
+
+class _Echo:
+    """A file-like object whose write() returns the value, so csv.writer can format single rows."""
+
+    def write(self, value):
+        return value
+
+
+def _blocks(lines):
+    """Joins lines into blocks of about BLOCK_SIZE characters (fewer, larger writes/chunks)."""
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield "".join(block)
+            block, size = [], 0
+    if block:
+        yield "".join(block)
+
+
+def csv_lines(dataset, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(dataset.columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(dataset, rows):
+    columns = dataset.columns
+    dumps = json.JSONEncoder(default=str, separators=(",", ":")).encode
+    for row in rows:
+        yield dumps(dict(zip(columns, row))) + "\n"
+
+
+def gzip_stream(chunks):
+    """Compresses a stream of byte chunks into a gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+# endregion Encoders
+
+
+def stream_export(name, file_format="csv", compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns a generator of bytes for the export of the named dataset.
+    Raises KeyError for an unknown dataset and ValueError for an unknown format.
+    """
+    dataset = DATASETS[name]
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}; use one of {', '.join(FORMATS)}.")
+    lines = csv_lines if file_format == "csv" else jsonl_lines
+    chunks = (block.encode("utf-8") for block in _blocks(lines(dataset, dataset.rows(chunk_size))))
+    return gzip_stream(chunks) if compress else chunks
+
+
+def export_filename(name, file_format, compress=False):
+    return f"{name}.{file_format}" + (".gz" if compress else "")
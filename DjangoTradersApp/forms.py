@@ -2,6 +2,8 @@ from django import forms
 from django.core.exceptions import ValidationError
 from datetime import date, timedelta
 from .models import Customers, Products, Employees, Shippers, Orders, OrderDetails, Categories, Suppliers
+from . import choices
+from .commissions import CommissionPlan, InvalidPlan
 
 
 class CustomerSelectionForm(forms.Form):
@@ -9,21 +11,18 @@ class CustomerSelectionForm(forms.Form):
     customer = forms.ModelChoiceField(
         queryset=Customers.objects.all(),
         label="Select Customer",
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        # Options are rendered from the cached choice set (choices.py), not by iterating the queryset
+        widget=choices.CachedSelect(choices.CUSTOMERS, attrs={'class': 'form-control'}),
         empty_label="-- Select a Customer --"
     )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['customer'].label_from_instance = lambda obj: f"{obj.company_name} ({obj.customer_id})"
-
 
 class ProductSelectionForm(forms.Form):
     """Form for selecting a product with quantity and discount."""
     product = forms.ModelChoiceField(
         queryset=Products.objects.filter(discontinued=0),
         label="Select Product",
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        widget=choices.CachedSelect(choices.ORDERABLE_PRODUCTS, attrs={'class': 'form-control'}),
         empty_label="-- Select a Product --"
     )
     quantity = forms.IntegerField(
@@ -39,23 +38,28 @@ class ProductSelectionForm(forms.Form):
         widget=forms.NumberInput(attrs={'class': 'form-control', 'min': '0', 'max': '100', 'step': '0.1'})
     )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['product'].label_from_instance = lambda obj: f"{obj.product_name} - ${obj.unit_price:.2f}"
-
     def clean_product(self):
         product = self.cleaned_data.get('product')
         if product and product.discontinued == 1:
             raise ValidationError("This product has been discontinued and cannot be ordered.")
         return product
 
+    def clean(self):
+        cleaned_data = super().clean()
+        product = cleaned_data.get('product')
+        quantity = cleaned_data.get('quantity')
+        # Early feedback only: the stock is reserved when the order is placed (ordering.reserve_stock).
+        if product and quantity and product.units_in_stock is not None and quantity > product.units_in_stock:
+            self.add_error('quantity', f"Only {product.units_in_stock} units of {product.product_name} are in stock.")
+        return cleaned_data
+
 
 class OrderDetailsForm(forms.Form):
     """Form for entering order details like employee, required date, and shipper."""
     employee = forms.ModelChoiceField(
         queryset=Employees.objects.all(),
         label="Assign Employee (for commission)",
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        widget=choices.CachedSelect(choices.EMPLOYEES, attrs={'class': 'form-control'}),
         empty_label="-- Select an Employee --"
     )
     required_date = forms.DateField(
@@ -66,7 +70,7 @@ class OrderDetailsForm(forms.Form):
     shipper = forms.ModelChoiceField(
         queryset=Shippers.objects.all(),
         label="Shipper",
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        widget=choices.CachedSelect(choices.SHIPPERS, attrs={'class': 'form-control'}),
         empty_label="-- Select a Shipper --"
     )
     ship_name = forms.CharField(
@@ -108,9 +112,7 @@ class OrderDetailsForm(forms.Form):
 
     def __init__(self, *args, customer=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['employee'].label_from_instance = lambda obj: f"{obj.first_name} {obj.last_name}"
-        self.fields['shipper'].label_from_instance = lambda obj: obj.company_name
-        
+
         # Pre-fill shipping info from customer if provided
         if customer:
             self.fields['ship_name'].initial = customer.company_name
@@ -127,6 +129,22 @@ class OrderDetailsForm(forms.Form):
         return required_date
 
 
+# Messages of the non-negative product number rules, shared by ProductForm and bulk updates (bulkupdates.py).
+PRODUCT_NUMBER_MESSAGES = {
+    'unit_price': "Unit price cannot be negative.",
+    'units_in_stock': "Units in stock cannot be negative.",
+    'units_on_order': "Units on order cannot be negative.",
+    'reorder_level': "Reorder level cannot be negative.",
+}
+
+
+def validate_product_number(field, value):
+    """Validate a numeric product field is non-negative (None is allowed)."""
+    if value is not None and value < 0:
+        raise ValidationError(PRODUCT_NUMBER_MESSAGES[field])
+    return value
+
+
 class ProductForm(forms.ModelForm):
     """Form for creating and updating products."""
 
@@ -147,8 +165,8 @@ class ProductForm(forms.ModelForm):
         widgets = {
             'product_id': forms.NumberInput(attrs={'class': 'form-control'}),
             'product_name': forms.TextInput(attrs={'class': 'form-control'}),
-            'supplier': forms.Select(attrs={'class': 'form-control'}),
-            'category': forms.Select(attrs={'class': 'form-control'}),
+            'supplier': choices.CachedSelect(choices.SUPPLIERS, attrs={'class': 'form-control'}),
+            'category': choices.CachedSelect(choices.CATEGORIES, attrs={'class': 'form-control'}),
             'quantity_per_unit': forms.TextInput(attrs={'class': 'form-control'}),
             'unit_price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
             'units_in_stock': forms.NumberInput(attrs={'class': 'form-control', 'min': '0'}),
@@ -171,11 +189,8 @@ class ProductForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Set up supplier label
-        self.fields['supplier'].label_from_instance = lambda obj: obj.company_name
+        # Option labels come from the cached SUPPLIERS / CATEGORIES choice sets (choices.py)
         self.fields['supplier'].empty_label = "-- Select a Supplier --"
-        # Set up category label
-        self.fields['category'].label_from_instance = lambda obj: obj.category_name
         self.fields['category'].empty_label = "-- Select a Category --"
 
     def clean_product_id(self):
@@ -200,31 +215,19 @@ class ProductForm(forms.ModelForm):
 
     def clean_unit_price(self):
         """Validate unit_price is non-negative."""
-        unit_price = self.cleaned_data.get('unit_price')
-        if unit_price is not None and unit_price < 0:
-            raise ValidationError("Unit price cannot be negative.")
-        return unit_price
+        return validate_product_number('unit_price', self.cleaned_data.get('unit_price'))
 
     def clean_units_in_stock(self):
         """Validate units_in_stock is non-negative."""
-        units_in_stock = self.cleaned_data.get('units_in_stock')
-        if units_in_stock is not None and units_in_stock < 0:
-            raise ValidationError("Units in stock cannot be negative.")
-        return units_in_stock
+        return validate_product_number('units_in_stock', self.cleaned_data.get('units_in_stock'))
 
     def clean_units_on_order(self):
         """Validate units_on_order is non-negative."""
-        units_on_order = self.cleaned_data.get('units_on_order')
-        if units_on_order is not None and units_on_order < 0:
-            raise ValidationError("Units on order cannot be negative.")
-        return units_on_order
+        return validate_product_number('units_on_order', self.cleaned_data.get('units_on_order'))
 
     def clean_reorder_level(self):
         """Validate reorder_level is non-negative."""
-        reorder_level = self.cleaned_data.get('reorder_level')
-        if reorder_level is not None and reorder_level < 0:
-            raise ValidationError("Reorder level cannot be negative.")
-        return reorder_level
+        return validate_product_number('reorder_level', self.cleaned_data.get('reorder_level'))
 
     def clean_quantity_per_unit(self):
         """Validate quantity_per_unit is within length constraints."""
@@ -239,3 +242,47 @@ class ProductForm(forms.ModelForm):
         if discontinued not in [0, 1]:
             raise ValidationError("Discontinued must be Yes (1) or No (0).")
         return discontinued
+
+
+class CommissionReportForm(forms.Form):
+    """Date range and commission tiers of the employee commission report (see commissions.py)."""
+    start = forms.DateField(
+        label="From",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        initial=lambda: date.today().replace(month=1, day=1)
+    )
+    end = forms.DateField(
+        label="To",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        initial=date.today
+    )
+    tiers = forms.CharField(
+        label="Commission Tiers",
+        required=False,
+        help_text='Monthly sales threshold and percent, e.g. "0:2,10000:3,25000:5". Empty for the default tiers.',
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+
+    @classmethod
+    def defaults(cls):
+        """The initial values of the fields, as data for a bound form (this year up to today, default tiers)."""
+        return {
+            name: field.initial() if callable(field.initial) else field.initial
+            for name, field in cls.base_fields.items()
+        }
+
+    def clean_tiers(self):
+        """Parse the tiers into a CommissionPlan (the default plan when empty)."""
+        tiers = self.cleaned_data.get('tiers')
+        try:
+            return CommissionPlan.parse(tiers) if tiers else CommissionPlan.default()
+        except InvalidPlan as error:
+            raise ValidationError(str(error))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+        if start and end and start > end:
+            self.add_error('end', "The end date must not be before the start date.")
+        return cleaned_data
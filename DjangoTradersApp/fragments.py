@@ -0,0 +1,72 @@
+"""
+Cached product table rows for the product list (Products/index.html).
+
+Each row is rendered from Products/row.html once and cached (settings.CACHES) under a key made of
+the product ID and the version stamps (versioning.py) of the product, its category and its supplier:
+    product_row:<product_id>:<product version>:<category version>:<supplier version>
+A product edit bumps the product's stamp and a category or supplier change bumps that category's or
+supplier's stamp, so exactly the affected rows get new keys; rows under old keys are no longer read
+and expire after PRODUCT_ROW_CACHE_TIMEOUT seconds.
+
+with_row_versions() makes the list's page query read only the product IDs, the name (the keyset
+pagination sort key) and the three stamps (primary-key subqueries on version_stamps), so a page whose
+rows are all cached costs that one query (plus the paginator's COUNT) and one cache get_many.
+Missed rows are loaded with their category and supplier in one query, rendered and stored with set_many.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .models import Categories, Products, VersionStamp, deferred_related
+
+
+CACHE_KEY_PREFIX = "product_row"
+ROW_TEMPLATE = "DjangoTradersApp/Products/row.html"
+
+
+def _stamp(prefix, field):
+    """The version of the stamp "<prefix><field value>" of the outer row (0 if it was never bumped)."""
+    key = Concat(Value(prefix), Cast(OuterRef(field), CharField()), output_field=CharField())
+    version = VersionStamp.objects.filter(key=key).values("version")[:1]
+    return Coalesce(Subquery(version), Value(0))
+
+
+def with_row_versions(queryset):
+    """The products of queryset with only what the row cache needs."""
+    return queryset.only("product_id", "product_name", "category_id", "supplier_id").annotate(
+        product_version=_stamp("product:", "product_id"),
+        category_version=_stamp("category:", "category_id"),
+        supplier_version=_stamp("supplier:", "supplier_id"),
+    )
+
+
+def row_key(product):
+    return (
+        f"{CACHE_KEY_PREFIX}:{product.product_id}:"
+        f"{product.product_version}:{product.category_version}:{product.supplier_version}"
+    )
+
+
+def render_rows(products):
+    """The rendered table rows of products (from with_row_versions), in order."""
+    products = list(products)
+    keys = {product.product_id: row_key(product) for product in products}
+    rows = cache.get_many(keys.values())
+    missing = [product_id for product_id, key in keys.items() if key not in rows]
+    if missing:
+        template = get_template(ROW_TEMPLATE)
+        loaded = (
+            Products.objects.select_related("category", "supplier")
+            .defer(*deferred_related("category", Categories)).in_bulk(missing)
+        )
+        rendered = {
+            keys[product_id]: template.render({"product": loaded[product_id]})
+            for product_id in missing if product_id in loaded
+        }
+        cache.set_many(rendered, getattr(settings, "PRODUCT_ROW_CACHE_TIMEOUT", 3600))
+        rows.update(rendered)
+    return [mark_safe(rows[keys[product.product_id]]) for product in products if keys[product.product_id] in rows]
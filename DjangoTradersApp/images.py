@@ -0,0 +1,167 @@
+"""
+Employee photos and category pictures, served from their own endpoints.
+
+    GET DjTraders/Images/Employees/<employee_id>/     Employees.photo
+    GET DjTraders/Images/Categories/<category_id>/    Categories.picture
+
+The binary columns are deferred by the models' managers (models.DeferredColumnsManager), so pages listing
+employees or categories no longer load them; this is the only code reading them, one row at a time.
+
+Northwind stores most images as OLE objects: a 78-byte OLE header in front of the actual image
+(a BMP, padded at the end). decode() finds the image by its signature, at the start of the column
+or behind that header, and trims BMPs to the size in their file header. Images are served in their
+stored format (BMP, PNG, JPEG or GIF), with its content type; nothing is re-encoded.
+
+Decoded images are cached as files in settings.IMAGE_CACHE_DIR, named by the kind, the row's ID and its
+version stamp (versioning.py):
+    <kind>-<id>-<version>
+A saved employee or category bumps its stamp, so the next request decodes the new image into a new file
+and removes the older ones; otherwise a request costs the stamp lookup and streaming the file
+(FileResponse). Files are written to a temporary name and renamed, so concurrent requests never
+read a partial file; a request whose new file was already replaced by a newer version serves the
+image it decoded.
+
+Responses carry an ETag/Last-Modified from the stamp (304 Not Modified when they still match) and
+Cache-Control: public, max-age=settings.IMAGE_MAX_AGE. image_url() adds the version to the URL,
+so pages linking images through it (the category picture on the product page) get a new URL,
+not a stale cached image, after a change.
+"""
+
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from . import versioning
+from .models import Categories, Employees
+
+
+# Size of the OLE object header in front of the Northwind images.
+OLE_HEADER_SIZE = 78
+# (signature, content type), checked at the start of the image.
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+UNKNOWN_CONTENT_TYPE = "application/octet-stream"
+
+
+@dataclass(frozen=True)
+class ImageSource:
+    """A binary image column: its model and field, the URL serving it and the version stamp of its rows."""
+    model: type
+    field: str
+    url_name: str
+    stamp_key: object
+
+    def load(self, object_id):
+        """The stored bytes of the row's image (None for a missing row or an empty column)."""
+        data = self.model.objects.filter(pk=object_id).values_list(self.field, flat=True).first()
+        return bytes(data) if data else None
+
+
+IMAGES = {
+    "employee": ImageSource(Employees, "photo", "DjTraders.EmployeePhoto", versioning.employee_key),
+    "category": ImageSource(Categories, "picture", "DjTraders.CategoryPicture", versioning.category_key),
+}
+
+
+# region Decoding
+
+def content_type(head):
+    """The content type of an image from its first bytes."""
+    for signature, kind in SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    return UNKNOWN_CONTENT_TYPE
+
+
+def decode(data):
+    """The image in a stored column value, without the OLE header (data itself when no image is recognized)."""
+    for offset in (0, OLE_HEADER_SIZE):
+        image = data[offset:]
+        kind = content_type(image[:8])
+        if kind == "image/bmp" and len(image) >= 6:
+            # The BMP file header holds the file size; OLE objects have trailing bytes after it.
+            size = int.from_bytes(image[2:6], "little")
+            if 0 < size <= len(image):
+                return image[:size]
+        elif kind != UNKNOWN_CONTENT_TYPE:
+            return image
+    return data
+
+# endregion Decoding
+
+
+# region File cache
+
+def cache_dir():
+    return Path(settings.IMAGE_CACHE_DIR)
+
+
+def cache_path(kind, object_id, stamp):
+    return cache_dir() / f"{kind}-{object_id}-{stamp.etag}"
+
+
+def _store(path, image, outdated_pattern):
+    """Writes the image to path atomically and removes the row's older versions (files matching outdated_pattern)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as stream:
+            stream.write(image)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    for outdated in path.parent.glob(outdated_pattern):
+        if outdated != path:
+            try:
+                outdated.unlink()
+            except OSError:  # removed by another request
+                pass
+
+
+def open_image(kind, object_id, stamp=None):
+    """
+    The decoded image of a row as (open binary file, content type), from the file cache or
+    decoded from the database (and stored). None when the row has no image.
+    stamp: the row's versioning.Stamp when the caller already has it (read otherwise).
+    """
+    source = IMAGES[kind]
+    if stamp is None:
+        stamp = versioning.lookup(source.stamp_key(object_id))
+    path = cache_path(kind, object_id, stamp)
+    try:
+        stream = open(path, "rb")
+    except FileNotFoundError:
+        data = source.load(object_id)
+        if data is None:
+            return None
+        image = decode(data)
+        _store(path, image, f"{kind}-{object_id}-*")
+        try:
+            stream = open(path, "rb")
+        except FileNotFoundError:  # removed by a request that stored a newer version in between
+            stream = io.BytesIO(image)
+    head = stream.read(8)
+    stream.seek(0)
+    return stream, content_type(head)
+
+
+def image_url(kind, object_id, stamp=None):
+    """The URL of a row's image, versioned by its stamp (so browsers may cache it for IMAGE_MAX_AGE)."""
+    source = IMAGES[kind]
+    if stamp is None:
+        stamp = versioning.lookup(source.stamp_key(object_id))
+    return f"{reverse(source.url_name, args=[object_id])}?{urlencode({'v': stamp.etag})}"
+
+# endregion File cache
@@ -0,0 +1,316 @@
+"""
+Streaming bulk order import (used by "python manage.py import_orders").
+
+Input formats:
+    JSONL: one order per line, with its lines nested:
+        {"customer_id": "ALFKI", "employee_id": 1, "shipper_id": 1, "order_date": "2025-01-31",
+         "required_date": "2025-02-14", "freight": 12.5, "ship_name": "...", ...,
+         "lines": [{"product_id": 11, "quantity": 3, "unit_price": 21.0, "discount": 0}, ...]}
+    CSV: one order line per row; consecutive rows with the same "order_ref" form one order.
+        Header columns: order_ref, customer_id, employee_id, shipper_id, order_date, required_date,
+        shipped_date, freight, ship_name, ship_address, ship_city, ship_region, ship_postal_code,
+        ship_country, product_id, quantity, unit_price, discount
+
+The file is read one record at a time and processed in chunks of "batch_size" orders.
+Per chunk: one lookup query each for customers, employees, shippers and products,
+then the valid orders and their lines are written with bulk_create in one transaction
+(which also adds them to the sales rollups and bumps the version stamps of their pages).
+A line without unit_price gets the product's current unit price; discount defaults to 0.
+Invalid orders are rejected as a whole and reported with their record number and reason.
+"""
+
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+
+from . import rollups, versioning
+from .models import Customers, Employees, OrderDetails, Orders, Products, Shippers
+from .ordering import allocate_order_ids
+
+
+SHIPPING_FIELDS = [
+    "ship_name", "ship_address", "ship_city", "ship_region", "ship_postal_code", "ship_country",
+]
+CSV_ORDER_FIELDS = [
+    "customer_id", "employee_id", "shipper_id", "order_date", "required_date", "shipped_date", "freight",
+] + SHIPPING_FIELDS
+CSV_LINE_FIELDS = ["product_id", "quantity", "unit_price", "discount"]
+# order_details.quantity is a smallint.
+MAX_QUANTITY = 32767
+
+
+class RejectedRecord(Exception):
+    """Raised while validating a record; the message is the reason reported for the rejected order."""
+
+
+@dataclass
+class ImportStats:
+    """Counters and rejected records of one import run."""
+    orders: int = 0
+    lines: int = 0
+    chunks: int = 0
+    rejected: list = field(default_factory=list)  # (record number, reason)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        """Imported order lines per second."""
+        return self.lines / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+# region Reading records
+
+def read_jsonl(stream):
+    """
+    Yields (record number, order dict) for every non-blank line of a JSONL stream.
+    Lines that are not valid JSON, or not a JSON object, are yielded as RejectedRecord instances instead of dicts.
+    """
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield number, RejectedRecord(f"invalid JSON: {error.msg}")
+            continue
+        if isinstance(record, dict):
+            yield number, record
+        else:
+            yield number, RejectedRecord(f"record is not a JSON object: {type(record).__name__}")
+
+
+def read_csv(stream):
+    """
+    Yields (record number, order dict) from a CSV stream with one order line per row.
+    Consecutive rows with the same order_ref are grouped into one order;
+    the record number is the row number of the order's first line.
+    """
+    reader = csv.DictReader(stream)
+    current_ref, current_number, current = None, None, None
+    for number, row in enumerate(reader, start=2):  # row 1 is the header
+        ref = row.get("order_ref") or f"row-{number}"
+        if ref != current_ref:
+            if current is not None:
+                yield current_number, current
+            current_ref, current_number = ref, number
+            current = {name: row.get(name) for name in CSV_ORDER_FIELDS}
+            current["lines"] = []
+        current["lines"].append({name: row.get(name) for name in CSV_LINE_FIELDS})
+    if current is not None:
+        yield current_number, current
+
+
+def chunked(records, size):
+    """Groups an iterable of records into lists of at most "size" records."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# endregion Reading records
+
+
+# region Value parsing
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _int(value, name, required=True):
+    if _blank(value):
+        if required:
+            raise RejectedRecord(f"{name} is required")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RejectedRecord(f"{name} is not an integer: {value!r}")
+
+
+def _float(value, name, default=None):
+    if _blank(value):
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RejectedRecord(f"{name} is not a number: {value!r}")
+
+
+def _date(value, name, default=None):
+    if _blank(value):
+        return default
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise RejectedRecord(f"{name} is not an ISO date (YYYY-MM-DD): {value!r}")
+
+
+def _str(value):
+    return None if _blank(value) else str(value)
+
+# endregion Value parsing
+
+
+class OrderImporter:
+    """
+    Imports order records in chunks. Use import_records() with the output of read_jsonl/read_csv.
+    """
+
+    def __init__(self, batch_size=500, line_batch_size=2000):
+        self.batch_size = batch_size
+        self.line_batch_size = line_batch_size
+        self.stats = ImportStats()
+
+    def import_records(self, records, on_chunk=None):
+        """
+        Imports all records and returns the ImportStats.
+        on_chunk(stats) is called after every chunk (e.g. to print progress).
+        """
+        started = time.perf_counter()
+        for chunk in chunked(records, self.batch_size):
+            self.import_chunk(chunk)
+            self.stats.elapsed_seconds = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(self.stats)
+        self.stats.elapsed_seconds = time.perf_counter() - started
+        return self.stats
+
+    def import_chunk(self, chunk):
+        """
+        Validates one chunk of (record number, order dict) against one batched lookup per reference table,
+        then writes the valid orders and their lines in one transaction.
+        """
+        references = self.load_references(record for _, record in chunk if isinstance(record, dict))
+
+        valid = []
+        for number, record in chunk:
+            try:
+                if isinstance(record, RejectedRecord):
+                    raise record
+                valid.append(self.parse_order(record, references))
+            except RejectedRecord as error:
+                self.stats.rejected.append((number, str(error)))
+
+        if valid:
+            with transaction.atomic():
+                order_ids = allocate_order_ids(len(valid))
+                orders, lines = [], []
+                for order_id, (order, order_lines) in zip(order_ids, valid):
+                    order.order_id = order_id
+                    orders.append(order)
+                    for line in order_lines:
+                        line.order_id = order_id
+                        lines.append(line)
+                Orders.objects.bulk_create(orders, batch_size=self.batch_size)
+                OrderDetails.objects.bulk_create(lines, batch_size=self.line_batch_size)
+                rollups.apply_orders(valid)
+                versioning.orders_written(valid)
+            self.stats.orders += len(orders)
+            self.stats.lines += len(lines)
+        self.stats.chunks += 1
+
+    def load_references(self, records):
+        """
+        Collects the customer, employee, shipper and product IDs used by the records
+        and loads each set with a single query.
+        """
+        customer_ids, employee_ids, shipper_ids, product_ids = set(), set(), set(), set()
+        for record in records:
+            customer_ids.add(_str(record.get("customer_id")))
+            employee_ids.add(_safe_int(record.get("employee_id")))
+            shipper_ids.add(_safe_int(record.get("shipper_id", record.get("ship_via"))))
+            lines = record.get("lines")
+            for line in lines if isinstance(lines, list) else []:
+                if isinstance(line, dict):
+                    product_ids.add(_safe_int(line.get("product_id")))
+        for ids in (customer_ids, employee_ids, shipper_ids, product_ids):
+            ids.discard(None)
+
+        return {
+            "customers": set(Customers.objects.filter(customer_id__in=customer_ids).values_list("customer_id", flat=True)),
+            "employees": set(Employees.objects.filter(employee_id__in=employee_ids).values_list("employee_id", flat=True)),
+            "shippers": set(Shippers.objects.filter(shipper_id__in=shipper_ids).values_list("shipper_id", flat=True)),
+            "products": {
+                product_id: unit_price
+                for product_id, unit_price in Products.objects.filter(product_id__in=product_ids)
+                .values_list("product_id", "unit_price")
+            },
+        }
+
+    def parse_order(self, record, references):
+        """
+        Builds an unsaved Orders instance and its unsaved OrderDetails from one record.
+        Raises RejectedRecord when the record is invalid.
+        """
+        if not isinstance(record, dict):
+            raise RejectedRecord("record is not an object")
+        customer_id = _str(record.get("customer_id"))
+        if customer_id is None:
+            raise RejectedRecord("customer_id is required")
+        if customer_id not in references["customers"]:
+            raise RejectedRecord(f"unknown customer_id {customer_id!r}")
+
+        employee_id = _int(record.get("employee_id"), "employee_id", required=False)
+        if employee_id is not None and employee_id not in references["employees"]:
+            raise RejectedRecord(f"unknown employee_id {employee_id}")
+
+        shipper_id = _int(record.get("shipper_id", record.get("ship_via")), "shipper_id", required=False)
+        if shipper_id is not None and shipper_id not in references["shippers"]:
+            raise RejectedRecord(f"unknown shipper_id {shipper_id}")
+
+        order = Orders(
+            customer_id=customer_id,
+            employee_id=employee_id,
+            ship_via_id=shipper_id,
+            order_date=_date(record.get("order_date"), "order_date", default=date.today()),
+            required_date=_date(record.get("required_date"), "required_date"),
+            shipped_date=_date(record.get("shipped_date"), "shipped_date"),
+            freight=_float(record.get("freight"), "freight", default=0.0),
+            **{name: _str(record.get(name)) for name in SHIPPING_FIELDS},
+        )
+
+        raw_lines = record.get("lines") or []
+        if not isinstance(raw_lines, list):
+            raise RejectedRecord("lines is not a list")
+        if not raw_lines:
+            raise RejectedRecord("order has no lines")
+        lines, seen_products = [], set()
+        for position, raw in enumerate(raw_lines, start=1):
+            if not isinstance(raw, dict):
+                raise RejectedRecord(f"line {position} is not an object")
+            product_id = _int(raw.get("product_id"), f"line {position} product_id")
+            if product_id not in references["products"]:
+                raise RejectedRecord(f"line {position}: unknown product_id {product_id}")
+            if product_id in seen_products:
+                raise RejectedRecord(f"line {position}: product_id {product_id} appears twice in the order")
+            seen_products.add(product_id)
+            quantity = _int(raw.get("quantity"), f"line {position} quantity")
+            if quantity <= 0:
+                raise RejectedRecord(f"line {position}: quantity must be positive")
+            if quantity > MAX_QUANTITY:
+                raise RejectedRecord(f"line {position}: quantity must be at most {MAX_QUANTITY}")
+            unit_price = _float(raw.get("unit_price"), f"line {position} unit_price",
+                                default=references["products"][product_id])
+            if unit_price is None or unit_price < 0:
+                raise RejectedRecord(f"line {position}: unit_price is missing or negative")
+            discount = _float(raw.get("discount"), f"line {position} discount", default=0.0)
+            if not 0 <= discount <= 100:
+                raise RejectedRecord(f"line {position}: discount must be between 0 and 100")
+            lines.append(OrderDetails(product_id=product_id, unit_price=unit_price,
+                                      quantity=quantity, discount=discount))
+        return order, lines
+
+
+def _safe_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
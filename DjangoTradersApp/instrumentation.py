@@ -0,0 +1,183 @@
+"""
+Per-request SQL instrumentation.
+
+SQLInstrumentationMiddleware installs a connection.execute_wrapper on every database connection
+for the duration of a request (so it also sees the queries templates run lazily while rendering,
+e.g. order.ship_via.company_name) and records:
+    - the number of queries and the total time spent in the database,
+    - duplicate fingerprints: the same SQL statement (parameters ignored) run more than once,
+      which is how N+1 query patterns show up.
+
+The results are added to the response as Server-Timing headers (visible in the browser's
+developer tools) and logged as one structured line per request to the
+"DjangoTradersApp.instrumentation" logger. A WARNING is logged when a URL name runs more queries
+than its budget: settings.QUERY_BUDGETS maps URL names (e.g. "DjTraders.CustomerDetail") to
+budgets, and settings.DEFAULT_QUERY_BUDGET (None for no limit) applies to all other URLs.
+
+For streaming responses only the queries made before the response is returned are counted.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# Duplicate fingerprints reported per request (most repeated first).
+MAX_REPORTED_DUPLICATES = 5
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Normalizes an SQL statement so that runs of the same statement with different values compare equal:
+    literals and placeholders become "?", IN (...) lists of any length become "(?+)".
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?+)", sql.replace("%s", "?"))
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+    """
+    An execute_wrapper that counts and times the queries run through it.
+    One recorder can be installed on several connections.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    def duplicates(self):
+        """(fingerprint, count) for every statement run more than once, most repeated first."""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+    def duplicate_count(self):
+        """Number of queries that repeated an earlier statement."""
+        return sum(count - 1 for _, count in self.duplicates())
+
+
+def query_budget(url_name):
+    """The query budget for a URL name (None: no budget)."""
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    if url_name in budgets:
+        return budgets[url_name]
+    return getattr(settings, "DEFAULT_QUERY_BUDGET", None)
+
+
+def server_timing(recorder, total_ms):
+    """The Server-Timing header value for a request."""
+    return ", ".join([
+        f'db;dur={recorder.duration_ms:.1f};desc="{recorder.count} queries"',
+        f'db-dup;desc="{recorder.duplicate_count()} duplicate queries"',
+        f"total;dur={total_ms:.1f}",
+    ])
+
+
+def _install(stack, recorder):
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Records the SQL queries of every request; see the module docstring.
+    Sync and async capable, so async views under ASGI stay async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            _install(stack, recorder)
+            # TemplateResponses are rendered inside get_response, so template queries are included.
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        # Database connections are per thread, and under ASGI the ORM runs a request's queries
+        # on that request's sync thread: install the wrappers there.
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(_install)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, started)
+
+    def finish(self, request, response, recorder, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        response["Server-Timing"] = server_timing(recorder, total_ms)
+        self.report(request, response, recorder, total_ms)
+        return response
+
+    def report(self, request, response, recorder, total_ms):
+        match = getattr(request, "resolver_match", None)
+        url_name = match.view_name if match else None
+        duplicates = recorder.duplicates()
+        details = {
+            "method": request.method,
+            "path": request.path,
+            "url_name": url_name,
+            "status": response.status_code,
+            "query_count": recorder.count,
+            "db_ms": round(recorder.duration_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "duplicate_queries": recorder.duplicate_count(),
+            "duplicates": [
+                {"sql": sql, "count": count} for sql, count in duplicates[:MAX_REPORTED_DUPLICATES]
+            ],
+        }
+        logger.info(
+            "%s %s (%s): %d queries, %.1f ms in the database, %d duplicates, %.1f ms total",
+            request.method, request.path, url_name, recorder.count, recorder.duration_ms,
+            recorder.duplicate_count(), total_ms,
+            extra={"sql": details},
+        )
+
+        budget = query_budget(url_name)
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                "%s ran %d queries, over its budget of %d%s",
+                url_name or request.path, recorder.count, budget,
+                f"; most repeated: {duplicates[0][1]}x {duplicates[0][0][:200]}" if duplicates else "",
+                extra={"sql": details, "query_budget": budget},
+            )
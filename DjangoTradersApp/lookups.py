@@ -0,0 +1,115 @@
+"""
+Cached reference lookups.
+
+Distinct-value lists used to fill dropdowns (customer countries, cities, regions, contact titles)
+almost never change, but were re-read with SELECT DISTINCT ... ORDER BY on every request.
+
+Each ReferenceLookup is cached in two tiers:
+    1. A per-process dictionary, so a hit costs no I/O at all.
+       Entries expire after REFERENCE_LOOKUP_LOCAL_TIMEOUT seconds (default 60), which bounds how long
+       another worker process can keep serving a list after it was invalidated elsewhere.
+    2. The Django cache (settings.CACHES), shared by all processes, under the lookup's current version
+       (see versionedcache.py), with a TTL of REFERENCE_LOOKUP_TIMEOUT seconds (default 3600).
+
+Writes invalidate the lookups of the written model (invalidate_model, called from signals.py
+when a customer is saved or deleted).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versionedcache
+
+
+CACHE_KEY_PREFIX = "reference_lookup"
+
+
+class ReferenceLookup(versionedcache.VersionedCache):
+    """
+    A cached, ordered list of the distinct values of one model field.
+
+    name:      unique name, used in the cache key.
+    model:     model label, e.g. "DjangoTradersApp.Customers" (resolved lazily, so models.py can use lookups).
+    field:     field whose distinct values are listed.
+    order_by:  ordering of the list (defaults to the field, ascending).
+    """
+
+    key_prefix = CACHE_KEY_PREFIX
+
+    def __init__(self, name, model, field, order_by=None):
+        super().__init__(name, [model])
+        self.field = field
+        self.order_by = order_by or field
+        self._local = None  # (expires_at, values)
+
+    @property
+    def model(self):
+        return self.models[0]
+
+    @property
+    def timeout(self):
+        return getattr(settings, "REFERENCE_LOOKUP_TIMEOUT", 3600)
+
+    @property
+    def local_timeout(self):
+        return getattr(settings, "REFERENCE_LOOKUP_LOCAL_TIMEOUT", 60)
+
+    def get(self):
+        """
+        Returns the list of values, from the process tier, the Django cache or the database (in that order).
+        """
+        local = self._local
+        if local is not None and local[0] > time.monotonic():
+            return local[1]
+
+        key = self.entry_key(self.version())
+        values = cache.get(key)
+        if values is None:
+            values = self.load()
+            cache.set(key, values, self.timeout)
+        with self._lock:
+            self._local = (time.monotonic() + self.local_timeout, values)
+        return values
+
+    def load(self):
+        """
+        Reads the values from the database (one SELECT DISTINCT query).
+        """
+        return list(
+            self.model.objects.values_list(self.field, flat=True)
+            .distinct()
+            .order_by(self.order_by)
+        )
+
+    def clear_local(self):
+        self._local = None
+
+
+# region Registered lookups
+
+CUSTOMER_COUNTRIES = ReferenceLookup("customer_countries", "DjangoTradersApp.Customers", "country", "-country")
+CUSTOMER_CITIES = ReferenceLookup("customer_cities", "DjangoTradersApp.Customers", "city")
+CUSTOMER_REGIONS = ReferenceLookup("customer_regions", "DjangoTradersApp.Customers", "region")
+CUSTOMER_CONTACT_TITLES = ReferenceLookup("customer_contact_titles", "DjangoTradersApp.Customers", "contact_title")
+
+REGISTRY = [
+    CUSTOMER_COUNTRIES,
+    CUSTOMER_CITIES,
+    CUSTOMER_REGIONS,
+    CUSTOMER_CONTACT_TITLES,
+]
+
+# endregion Registered lookups
+
+
+def invalidate_model(model):
+    """
+    Invalidates every registered lookup over the given model (call after writes to that model).
+    """
+    versionedcache.invalidate_model(REGISTRY, model)
+
+
+def invalidate_all():
+    versionedcache.invalidate_all(REGISTRY)
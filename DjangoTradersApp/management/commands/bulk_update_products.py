@@ -0,0 +1,83 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from DjangoTradersApp import bulkupdates
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk price and stock updates in one transaction, validated with the product form's rules. "
+        "Either the same changes for the selected products "
+        "(e.g. --supplier 1 --change unit_price percent 5) "
+        "or explicit values per product from a CSV or JSON file (--file). "
+        "See DjangoTradersApp/bulkupdates.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--supplier", type=int, help="Select the products of this supplier ID.")
+        parser.add_argument("--category", type=int, help="Select the products of this category ID.")
+        parser.add_argument("--products", help="Select these product IDs (comma-separated).")
+        parser.add_argument("--all", action="store_true", help="Select all products.")
+        parser.add_argument(
+            "--change", nargs=3, action="append", default=[], metavar=("FIELD", "OPERATION", "VALUE"),
+            help=f"A change of the selected products: field ({', '.join(bulkupdates.FIELDS)}), "
+                 f"operation ({', '.join(bulkupdates.OPERATIONS)}) and value. Repeatable.",
+        )
+        parser.add_argument(
+            "--file",
+            help="CSV or JSON (a list of objects) with product_id and new field values per product, "
+                 "instead of selections and changes. Blank values leave a field unchanged.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Show the changes without writing them.")
+
+    def handle(self, *args, **options):
+        try:
+            if options["file"]:
+                if options["change"]:
+                    raise CommandError("Use either --file or --change, not both.")
+                summary = bulkupdates.apply_values(self.read_rows(options["file"]), dry_run=options["dry_run"])
+            else:
+                queryset = bulkupdates.select(
+                    supplier_id=options["supplier"],
+                    category_id=options["category"],
+                    product_ids=self.product_ids(options["products"]),
+                    all_products=options["all"],
+                )
+                changes = [bulkupdates.Change.parse(*change) for change in options["change"]]
+                summary = bulkupdates.apply_changes(queryset, changes, dry_run=options["dry_run"])
+        except bulkupdates.BulkUpdateError as error:
+            for product_id, fields in sorted(error.errors.items()):
+                for name, messages in fields.items():
+                    self.stderr.write(f"  product {product_id} {name}: {' '.join(messages)}")
+            raise CommandError(str(error))
+
+        for product_id, name, fields in summary.changes:
+            described = ", ".join(f"{field_name} {old} -> {new}" for field_name, (old, new) in fields.items())
+            self.stdout.write(f"{product_id:>6} {name}: {described}")
+        verb = "Would update" if summary.dry_run else "Updated"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary.updated} of {summary.matched} selected products in {summary.elapsed_ms:.1f} ms."
+        ))
+
+    def product_ids(self, value):
+        if not value:
+            return None
+        try:
+            return [int(part) for part in value.split(",") if part.strip()]
+        except ValueError:
+            raise CommandError("--products must be a comma-separated list of product IDs.")
+
+    def read_rows(self, path):
+        try:
+            with open(path, newline="", encoding="utf-8") as stream:
+                if path.lower().endswith(".json"):
+                    rows = json.load(stream)
+                else:
+                    rows = list(csv.DictReader(stream))
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise CommandError(f"{path} must contain a list of objects.")
+        return rows
@@ -0,0 +1,56 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from DjangoTradersApp import commissions
+
+
+class Command(BaseCommand):
+    help = (
+        "Net sales and tiered commission per employee and month for the orders of a date range "
+        "(see DjangoTradersApp/commissions.py). Prints the totals per employee; --output writes the "
+        "per-month rows as CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, required=True, help="First order date (YYYY-MM-DD).")
+        parser.add_argument("--end", type=date.fromisoformat, required=True, help="Last order date (YYYY-MM-DD).")
+        parser.add_argument(
+            "--tiers",
+            help='Monthly sales threshold and percent pairs, e.g. "0:2,10000:3,25000:5" '
+                 "(default: settings.COMMISSION_TIERS).",
+        )
+        parser.add_argument("--output", "-o", help='CSV file of the per-month rows ("-" for standard output).')
+
+    def handle(self, *args, **options):
+        if options["start"] > options["end"]:
+            raise CommandError("--start must not be after --end.")
+        try:
+            plan = commissions.CommissionPlan.parse(options["tiers"]) if options["tiers"] else None
+        except commissions.InvalidPlan as error:
+            raise CommandError(str(error))
+
+        started = time.perf_counter()
+        report = commissions.report(options["start"], options["end"], plan)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if options["output"] == "-":
+            commissions.write_csv(report, self.stdout)
+            return
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as stream:
+                commissions.write_csv(report, stream)
+
+        self.stdout.write(f"{'employee':<28}{'orders':>8}{'units':>10}{'net sales':>16}{'commission':>14}")
+        for employee in report.employees():
+            self.stdout.write(
+                f"{employee.employee_name:<28}{employee.orders:>8}{employee.units:>10}"
+                f"{employee.net_sales:>16,.2f}{employee.commission:>14,.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Commission {report.commission:,.2f} on net sales of {report.net_sales:,.2f} "
+            f"({report.start} to {report.end}, tiers {report.plan}) in {elapsed_ms:.1f} ms."
+        ))
+        if options["output"]:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from DjangoTradersApp import exports
+
+
+class Command(BaseCommand):
+    help = "Streams customers, orders (with totals) or order_lines to a CSV/JSONL file or standard output."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(exports.DATASETS))
+        parser.add_argument("--format", choices=exports.FORMATS, default="csv")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip.")
+        parser.add_argument(
+            "--output", "-o", default="-",
+            help="Output file (default: standard output).",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=exports.DEFAULT_CHUNK_SIZE,
+            help=f"Rows fetched from the database per round trip (default {exports.DEFAULT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options["output"] == "-" and options["gzip"] and sys.stdout.isatty():
+            raise CommandError("Refusing to write gzip data to a terminal; use --output.")
+        chunks = exports.stream_export(
+            options["dataset"], options["format"], options["gzip"], options["chunk_size"]
+        )
+        if options["output"] == "-":
+            target = sys.stdout.buffer
+            for chunk in chunks:
+                target.write(chunk)
+            target.flush()
+        else:
+            with open(options["output"], "wb") as target:
+                for chunk in chunks:
+                    target.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,72 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from DjangoTradersApp.importing import OrderImporter, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams orders from a JSONL or CSV file into orders/order_details. "
+        "See DjangoTradersApp/importing.py for the file formats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - to read from standard input.")
+        parser.add_argument(
+            "--format", choices=["jsonl", "csv"],
+            help="Input format (default: from the file extension, jsonl for standard input).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Orders per chunk: one lookup per reference table and one transaction per chunk (default 500).",
+        )
+        parser.add_argument(
+            "--line-batch-size", type=int, default=2000,
+            help="Order lines per bulk INSERT statement (default 2000).",
+        )
+        parser.add_argument(
+            "--max-rejects-shown", type=int, default=20,
+            help="Number of rejected records listed in the report (default 20).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        self.verbosity = options["verbosity"]
+        file_format = options["format"] or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        if options["batch_size"] < 1 or options["line_batch_size"] < 1:
+            raise CommandError("Batch sizes must be positive.")
+
+        try:
+            stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        except OSError as error:
+            raise CommandError(f"Cannot open {path}: {error}")
+
+        reader = read_csv if file_format == "csv" else read_jsonl
+        importer = OrderImporter(
+            batch_size=options["batch_size"], line_batch_size=options["line_batch_size"]
+        )
+        try:
+            stats = importer.import_records(reader(stream), on_chunk=self.report_progress)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.orders} orders / {stats.lines} lines in {stats.elapsed_seconds:.2f}s "
+            f"({stats.rows_per_second:,.0f} rows/sec, {stats.chunks} chunks)."
+        ))
+        if stats.rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected {len(stats.rejected)} orders:"))
+            for number, reason in stats.rejected[:options["max_rejects_shown"]]:
+                self.stdout.write(f"  record {number}: {reason}")
+            hidden = len(stats.rejected) - options["max_rejects_shown"]
+            if hidden > 0:
+                self.stdout.write(f"  ... and {hidden} more")
+
+    def report_progress(self, stats):
+        if self.verbosity >= 2:
+            self.stderr.write(
+                f"chunk {stats.chunks}: {stats.orders} orders, {stats.lines} lines, "
+                f"{stats.rows_per_second:,.0f} rows/sec"
+            )
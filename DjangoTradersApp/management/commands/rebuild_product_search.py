@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from DjangoTradersApp import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the product search documents (and their full-text indexes) from the products table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Number of documents written per batch (default 500).",
+        )
+
+    def handle(self, *args, **options):
+        written = search.index_products(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} products."))
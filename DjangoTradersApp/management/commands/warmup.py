@@ -0,0 +1,104 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from DjangoTradersApp import warmup
+from DjangoTradersApp.models import Customers, Products
+
+
+def first_request_pages():
+    """(URL name, kwargs) of the pages whose first request is measured."""
+    pages = [
+        ("DjTraders.Products", {}),
+        ("DjTraders.Customers", {}),
+        ("DjTraders.ProductCreate", {}),
+        ("DjTraders.OrderCreate", {}),
+    ]
+    product_id = Products.objects.order_by("pk").values_list("pk", flat=True).first()
+    if product_id is not None:
+        pages += [("DjTraders.ProductDetail", {"product_id": product_id}),
+                  ("DjTraders.ProductEdit", {"product_id": product_id})]
+    customer_id = Customers.objects.order_by("pk").values_list("pk", flat=True).first()
+    if customer_id is not None:
+        pages += [("DjTraders.CustomerDetail", {"customer_id": customer_id}),
+                  ("DjTraders.CustomerOrders", {"customer_id": customer_id})]
+    return pages
+
+
+def measure_first_requests(warm):
+    """Milliseconds of the first request to each page in this process, optionally after warm_up()."""
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ("*",) and not host.startswith(".")]
+    client = Client(HTTP_HOST=hosts[0] if hosts else "localhost")
+    client.handler.load_middleware()  # a server loads it before the first request too
+    pages = first_request_pages()
+    warmup_ms = sum(ms for _, ms in warmup.warm_up().values()) if warm else 0.0
+    results = []
+    for name, kwargs in pages:
+        started = time.perf_counter()
+        response = client.get(reverse(name, kwargs=kwargs))
+        results.append({"url_name": name, "status": response.status_code,
+                        "ms": round((time.perf_counter() - started) * 1000, 2)})
+    return {"warmup_ms": round(warmup_ms, 2), "pages": results}
+
+
+class Command(BaseCommand):
+    help = (
+        "Warms up this process: compiles every template into the cached template loader, resolves every "
+        "named URL and primes the reference caches. With --measure, also reports the time of the first "
+        "request to the main pages in a new process without and with warm-up."
+    )
+    # The system checks import the URLconf, which would warm up the --measure processes.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--measure", action="store_true",
+            help="Report the cold start of new processes before and after warm-up.",
+        )
+        # Used by --measure for its child processes.
+        parser.add_argument("--first-requests", choices=["cold", "warm"], help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["first_requests"]:
+            result = measure_first_requests(warm=options["first_requests"] == "warm")
+            self.stdout.write(json.dumps(result))
+            return
+
+        report = warmup.warm_up()
+        self.stdout.write(f"Templates: {report['templates'][0]} compiled in {report['templates'][1]:.1f} ms")
+        self.stdout.write(f"URLs: {report['urls'][0]} resolved in {report['urls'][1]:.1f} ms")
+        self.stdout.write(f"Caches: {report['caches'][0]} primed in {report['caches'][1]:.1f} ms")
+        total = sum(ms for _, ms in report.values())
+        self.stdout.write(self.style.SUCCESS(f"Warm-up finished in {total:.1f} ms."))
+
+        if options["measure"]:
+            self.report_cold_start(self.run_child("cold"), self.run_child("warm"))
+
+    def run_child(self, mode):
+        completed = subprocess.run(
+            [sys.executable, "-m", "django", "warmup", "--first-requests", mode,
+             "--settings", settings.SETTINGS_MODULE],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"Measuring the {mode} start failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def report_cold_start(self, cold, warm):
+        self.stdout.write("\nFirst request to each page of a new process (ms):")
+        self.stdout.write(f"{'page':<28}{'before':>10}{'after':>10}")
+        for before, after in zip(cold["pages"], warm["pages"]):
+            self.stdout.write(f"{before['url_name']:<28}{before['ms']:>10.1f}{after['ms']:>10.1f}")
+        before_total = sum(page["ms"] for page in cold["pages"])
+        after_total = sum(page["ms"] for page in warm["pages"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Cold start: {before_total:.1f} ms before, {after_total:.1f} ms after warm-up "
+            f"({warm['warmup_ms']:.1f} ms of warm-up at worker start)."
+        ))
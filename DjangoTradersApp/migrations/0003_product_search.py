@@ -0,0 +1,98 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# PostgreSQL: weighted tsvector (name > category/supplier > quantity per unit) with a GIN index,
+# plus a trigram index on the whole document for partial-word (ILIKE '%...%') matches.
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE product_search_documents ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(product_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(category_name, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(supplier_name, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(quantity_per_unit, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX product_search_vector_idx ON product_search_documents USING GIN (search_vector)",
+    "CREATE INDEX product_search_trgm_idx ON product_search_documents USING GIN (document gin_trgm_ops)",
+]
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS product_search_trgm_idx",
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "ALTER TABLE product_search_documents DROP COLUMN IF EXISTS search_vector",
+]
+
+# SQLite: an external-content FTS5 index over product_search_documents, kept in sync by triggers.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE product_search_fts USING fts5(
+        product_name, category_name, supplier_name, quantity_per_unit,
+        content='product_search_documents', content_rowid='product_id'
+    )
+    """,
+    """
+    CREATE TRIGGER product_search_fts_ai AFTER INSERT ON product_search_documents BEGIN
+        INSERT INTO product_search_fts(rowid, product_name, category_name, supplier_name, quantity_per_unit)
+        VALUES (new.product_id, new.product_name, new.category_name, new.supplier_name, new.quantity_per_unit);
+    END
+    """,
+    """
+    CREATE TRIGGER product_search_fts_ad AFTER DELETE ON product_search_documents BEGIN
+        INSERT INTO product_search_fts(product_search_fts, rowid, product_name, category_name, supplier_name, quantity_per_unit)
+        VALUES ('delete', old.product_id, old.product_name, old.category_name, old.supplier_name, old.quantity_per_unit);
+    END
+    """,
+    """
+    CREATE TRIGGER product_search_fts_au AFTER UPDATE ON product_search_documents BEGIN
+        INSERT INTO product_search_fts(product_search_fts, rowid, product_name, category_name, supplier_name, quantity_per_unit)
+        VALUES ('delete', old.product_id, old.product_name, old.category_name, old.supplier_name, old.quantity_per_unit);
+        INSERT INTO product_search_fts(rowid, product_name, category_name, supplier_name, quantity_per_unit)
+        VALUES (new.product_id, new.product_name, new.category_name, new.supplier_name, new.quantity_per_unit);
+    END
+    """,
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS product_search_fts_au",
+    "DROP TRIGGER IF EXISTS product_search_fts_ad",
+    "DROP TRIGGER IF EXISTS product_search_fts_ai",
+    "DROP TABLE IF EXISTS product_search_fts",
+]
+
+
+def run_vendor_sql(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoTradersApp', '0002_northwind_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='DjangoTradersApp.products')),
+                ('product_name', models.CharField(max_length=40)),
+                ('category_name', models.CharField(blank=True, default='', max_length=15)),
+                ('supplier_name', models.CharField(blank=True, default='', max_length=40)),
+                ('quantity_per_unit', models.CharField(blank=True, default='', max_length=20)),
+                ('document', models.TextField()),
+            ],
+            options={
+                'db_table': 'product_search_documents',
+            },
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+def create_order_id_sequence(apps, schema_editor):
+    """
+    PostgreSQL: order IDs are allocated from a sequence (orders.order_id is a smallint without a default).
+    The sequence starts after the highest existing order ID.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE SEQUENCE IF NOT EXISTS orders_order_id_seq AS smallint MINVALUE 1 MAXVALUE 32767"
+    )
+    with connection.cursor() as cursor:
+        if 'orders' in connection.introspection.table_names(cursor):
+            cursor.execute(
+                "SELECT setval('orders_order_id_seq', COALESCE((SELECT MAX(order_id) FROM orders), 0) + 1, false)"
+            )
+
+
+def drop_order_id_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP SEQUENCE IF EXISTS orders_order_id_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoTradersApp', '0003_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdCounter',
+            fields=[
+                ('name', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('value', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'id_counters',
+            },
+        ),
+        migrations.RunPython(create_order_id_sequence, drop_order_id_sequence),
+    ]
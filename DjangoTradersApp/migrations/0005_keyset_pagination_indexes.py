@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+# (index name, table, columns) for the keyset pagination orderings in pagination.py.
+# customers and products are not managed by Django, so the indexes are only created when the tables exist.
+INDEXES = [
+    ("customers_company_name_keyset_idx", "customers", "company_name, customer_id"),
+    ("products_product_name_keyset_idx", "products", "product_name, product_id"),
+]
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+    for name, table, columns in INDEXES:
+        if table in tables:
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def drop_indexes(apps, schema_editor):
+    for name, table, columns in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoTradersApp', '0004_order_id_allocation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
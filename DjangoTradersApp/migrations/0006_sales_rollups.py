@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoTradersApp', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSales',
+            fields=[
+                ('revenue', models.FloatField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('customer', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='sales', serialize=False, to='DjangoTradersApp.customers')),
+            ],
+            options={
+                'db_table': 'customer_sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeSales',
+            fields=[
+                ('revenue', models.FloatField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('employee', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='sales', serialize=False, to='DjangoTradersApp.employees')),
+            ],
+            options={
+                'db_table': 'employee_sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySales',
+            fields=[
+                ('revenue', models.FloatField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('month', models.DateField(help_text='First day of the month.', primary_key=True, serialize=False)),
+            ],
+            options={
+                'db_table': 'monthly_sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSales',
+            fields=[
+                ('revenue', models.FloatField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('product', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='sales', serialize=False, to='DjangoTradersApp.products')),
+            ],
+            options={
+                'db_table': 'product_sales',
+            },
+        ),
+    ]
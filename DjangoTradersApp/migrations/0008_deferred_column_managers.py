@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoTradersApp', '0007_version_stamps'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='categories',
+            options={'base_manager_name': 'objects', 'managed': False},
+        ),
+        migrations.AlterModelOptions(
+            name='employees',
+            options={'base_manager_name': 'objects', 'managed': False},
+        ),
+    ]
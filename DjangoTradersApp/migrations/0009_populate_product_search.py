@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+
+
+def populate_documents(apps, schema_editor):
+    """
+    Builds the search documents of the existing products (as search.build_document does), so searches
+    find them right after deploying; products that already have a document are left alone.
+    Skipped where the Northwind tables do not exist (e.g. the test database).
+    """
+    if "products" not in schema_editor.connection.introspection.table_names():
+        return
+    ProductSearchDocument = apps.get_model("DjangoTradersApp", "ProductSearchDocument")
+    # The migration state of Products has no category/supplier relations, so they are joined in SQL.
+    sql = (
+        "SELECT p.product_id, p.product_name, c.category_name, s.company_name, p.quantity_per_unit "
+        "FROM products p "
+        "LEFT JOIN categories c ON c.category_id = p.category_id "
+        "LEFT JOIN suppliers s ON s.supplier_id = p.supplier_id "
+        "WHERE p.product_id NOT IN (SELECT product_id FROM product_search_documents) "
+        "ORDER BY p.product_id"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql)
+        products = cursor.fetchall()
+    documents = []
+    for product_id, *fields in products:
+        fields = [field or "" for field in fields]
+        documents.append(ProductSearchDocument(
+            product_id=product_id,
+            product_name=fields[0],
+            category_name=fields[1],
+            supplier_name=fields[2],
+            quantity_per_unit=fields[3],
+            document=" ".join(field for field in fields if field).lower(),
+        ))
+    ProductSearchDocument.objects.bulk_create(documents, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoTradersApp', '0008_deferred_column_managers'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
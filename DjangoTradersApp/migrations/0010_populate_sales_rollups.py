@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+REVENUE = "SUM(d.unit_price * d.quantity - d.unit_price * d.quantity * d.discount / 100.0)"
+# The first day of the order's month, per database vendor.
+MONTH = {
+    "postgresql": "CAST(date_trunc('month', o.order_date) AS date)",
+    "sqlite": "date(o.order_date, 'start of month')",
+}
+# (rollup table, key column, key expression, FROM clause); the same grouping as rollups.ROLLUPS.
+ROLLUPS = [
+    ("customer_sales", "customer_id", "o.customer_id", "order_details d JOIN orders o ON o.order_id = d.order_id"),
+    ("product_sales", "product_id", "d.product_id", "order_details d"),
+    ("employee_sales", "employee_id", "o.employee_id", "order_details d JOIN orders o ON o.order_id = d.order_id"),
+    ("monthly_sales", "month", None, "order_details d JOIN orders o ON o.order_id = d.order_id"),
+]
+
+
+def populate_rollups(apps, schema_editor):
+    """
+    Fills the sales rollup tables (created empty by 0006) from the existing orders, so the first order
+    placed or imported after deploying is added to complete totals. Runs the same set-based rebuild as
+    "python manage.py rebuild_rollups", as SQL: this migration must not depend on the current models.
+    Skipped where the Northwind tables do not exist (e.g. the test database).
+    """
+    connection = schema_editor.connection
+    tables = connection.introspection.table_names()
+    if "orders" not in tables or "order_details" not in tables:
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for table, key_column, key, source in ROLLUPS:
+            key = key or MONTH[connection.vendor]
+            cursor.execute(f"DELETE FROM {quote(table)}")
+            cursor.execute(
+                f"INSERT INTO {quote(table)} ({quote(key_column)}, revenue, units, order_count) "
+                f"SELECT {key}, {REVENUE}, SUM(d.quantity), COUNT(DISTINCT d.order_id) "
+                f"FROM {source} WHERE {key} IS NOT NULL GROUP BY {key}"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DjangoTradersApp', '0009_populate_product_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
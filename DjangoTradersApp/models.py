@@ -1,4 +1,33 @@
 from django.db import models
+from django.db.models import F, FloatField, Max, Min, OuterRef, Subquery, Sum, Count, Value
+from django.db.models.functions import Coalesce
+
+from . import lookups
+
+
+class DeferredColumnsManager(models.Manager):
+    """
+    Manager that leaves a model's binary and large text columns out of its queries (QuerySet.defer()),
+    so listing rows for their names (dropdowns, related objects) does not transfer the blobs.
+    A deferred column is loaded with an extra query when it is read from an instance;
+    only() / values() can still select it explicitly.
+
+    Set as the model's default and base manager (Meta.base_manager_name), so related object access
+    (product.category) defers them too. select_related() does not use the related model's manager:
+    add .defer(*deferred_related("category", Categories)) to such querysets.
+    """
+
+    def __init__(self, *deferred_fields):
+        super().__init__()
+        self.deferred_fields = deferred_fields
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*self.deferred_fields)
+
+
+def deferred_related(relation, model):
+    """The defer() names of model's deferred columns behind a select_related() relation."""
+    return [f"{relation}__{name}" for name in model._default_manager.deferred_fields]
 
 
 class Customers(models.Model):
@@ -64,26 +93,13 @@ class Customers(models.Model):
         """
         return self.orders.all().order_by("-order_date")
 
-    def get_ordered_products(self):
+    def get_purchase_summary(self):
         """
-        Returns a queryset of all products ordered by this customer.
-        Since we're using property-based relationships for OrderDetails,
-        we need to manually traverse the relationships.
+        Returns one row per product this customer bought, with the units, net spend,
+        first and last order dates and number of orders (see OrderDetailsQuerySet.purchase_summary),
+        computed by a single GROUP BY query, most spent first.
         """
-        # Get all orders for this customer
-        customer_orders = self.orders.all()
-
-        # Get all order_ids for this customer
-        order_ids = list(customer_orders.values_list("order_id", flat=True))
-
-        # Get all OrderDetails for these orders
-        order_details = OrderDetails.objects.filter(order_id__in=order_ids)
-
-        # Get all product_ids from these order details
-        product_ids = list(order_details.values_list("product_id", flat=True))
-
-        # Return products that were ordered by this customer
-        return Products.objects.filter(product_id__in=product_ids).distinct()
+        return OrderDetails.objects.filter(order__customer_id=self.customer_id).purchase_summary()
 
     # endregion Added in version 1.1
 
@@ -103,13 +119,10 @@ class Customers(models.Model):
         classmethod: A Member method - a method that is bound to the class and not the instance.
         cls: The class itself. The data type is <class 'DjangoTradersApp.models.Customers'>
 
+        The list is cached (see lookups.py) and invalidated when a customer is saved or deleted,
+        so the SELECT DISTINCT runs once instead of on every request.
         """
-        countries = (
-            cls.objects.values_list("country", flat=True)
-            .distinct()
-            .order_by("-country")
-        )
-        return countries
+        return lookups.CUSTOMER_COUNTRIES.get()
 
     # endregion Class Methods
 
@@ -145,85 +158,174 @@ class Employees(models.Model):
     )
     photo_path = models.CharField(max_length=255, blank=True, null=True)
 
+    # The photo and notes are only read by the photo endpoint (images.py) and when accessed explicitly.
+    objects = DeferredColumnsManager("photo", "notes")
+
     class Meta:
         managed = False
         db_table = "employees"
+        base_manager_name = "objects"
 
     # endregion
 
 
+class OrderDetailsQuerySet(models.QuerySet):
+    """
+    Custom QuerySet for OrderDetails.
+    """
+
+    def with_related(self):
+        """
+        Loads the order and product of every line in the same query (SQL JOIN),
+        so walking line items and reading detail.order / detail.product runs no extra queries.
+        """
+        return self.select_related("order", "product")
+
+    def purchase_summary(self):
+        """
+        Groups the lines by product, in one query (JOIN orders and products).
+        Returns dicts, most spent first, with:
+            product_id, product_name
+            units: total quantity.
+            net_spend: sum of unit_price * quantity less the discounts.
+            first_order_date, last_order_date: order dates of the first and last order.
+            order_count: number of orders (a product appears once per order).
+        """
+        gross = F("unit_price") * F("quantity")
+        return (
+            self.order_by()
+            .values("product_id", product_name=F("product__product_name"))
+            .annotate(
+                units=Sum("quantity"),
+                net_spend=Sum(gross - gross * F("discount") / Value(100.0), output_field=FloatField()),
+                first_order_date=Min("order__order_date"),
+                last_order_date=Max("order__order_date"),
+                order_count=Count("order_id"),
+            )
+            .order_by("-net_spend", "product_id")
+        )
+
+
 # v 1.2 added functionality to calculate line total with discount
+# v 1.3 restored the composite primary key and the foreign keys to Orders and Products
 class OrderDetails(models.Model):
     """
             Edits/Additions:
     Model:
         1. Added a method to calculate the line total with discount.
-        2. Removed ForeignKey relationships and replaced with properties to fetch related objects.
+        2. ForeignKeys to Orders and Products (order, product), as in GeneratedModels.py.
+           v1.3: they replace the earlier order/product properties, which ran one query on every
+           access and could not be used with select_related/prefetch_related.
         3. Added comments to explain the use of @property decorator.
-        4. Removed CompositePrimaryKey as Django does not support it natively.
+        4. CompositePrimaryKey("order_id", "product_id") as the primary key, as in the table.
+           v1.3: restored, as Django 5.2 supports composite primary keys.
 
     Functions:
-        1. order: Property to get the related Order object.
-        2. product: Property to get the related Product object.
+        1. order: ForeignKey to the related Order object (column order_id).
+        2. product: ForeignKey to the related Product object (column product_id).
         3. line_total: Property to calculate the line total after applying discount.
 
+    Related lookups now work in both directions, for example:
+        OrderDetails.objects.with_related()                 - lines with their order and product
+        Orders.objects.with_lines()                         - orders with their lines and products
+        order.orderdetails_set.all()                        - the lines of one order
+        Products.objects.filter(orderdetails__order__in=orders)
     """
 
     # region OrderDetails Fields from Database.
-
-    # Note: Removed ForeignKey relationships to Orders and Products.
-    # Use only the actual database columns that exist and added properties to fetch related objects instead.
-    order_id = models.IntegerField(primary_key=True)
-    product_id = models.IntegerField()
+    pk = models.CompositePrimaryKey("order_id", "product_id")
+    order = models.ForeignKey("Orders", models.DO_NOTHING)
+    product = models.ForeignKey("Products", models.DO_NOTHING)
     unit_price = models.FloatField()
     quantity = models.SmallIntegerField()
     discount = models.FloatField()
 
+    objects = OrderDetailsQuerySet.as_manager()
+
     class Meta:
         managed = False
         db_table = "order_details"
 
     # endregion
 
-    # Add properties to get related objects
-    @property
-    def order(self):
-        """
-        The "@property" decorator is used, instead of a method, to allow access to the object.
-
-        By adding the "@property", you can access it like an attribute, without needing to call it like a method.
-        By accessing it as an attribute, you can write cleaner and more intuitive code.
-        Most importantly, a property behaves like an attribute, but works like a method
-        by executing code inside the property/method when accessed.
-
-        Moreover, the property is stored in memory like an attribute,
-        while  method is handled as methods that are called from the dictionary of the parent object.
-
-        Bottom line  - we dont need to call it like a method with parentheses - we can just use "order_details_instance.order"
-        to get the Order object related to the OrderDetails instance.
-        """
-        return Orders.objects.get(order_id=self.order_id)
-
-    @property
-    def product(self):
-        """
-        As with the above, this works just like a method, but is accessed like an attribute.
-        Used to get the Product object related to this OrderDetails instance.
-        """
-        return Products.objects.get(product_id=self.product_id)
-
     @property
     def line_total(self):
         """
         Calculate the line total after applying discount
         Line Total = (Unit Price * Quantity) - Discount
         Returns the line total as a float.
+
+        The "@property" decorator is used, instead of a method, so it can be accessed like an attribute
+        ("detail.line_total") without calling it with parentheses, while still running the code inside.
         """
         gross_total = self.unit_price * self.quantity
         discount_total = gross_total * (self.discount / 100)
         return gross_total - discount_total
 
 
+class OrdersQuerySet(models.QuerySet):
+    """
+    Custom QuerySet for Orders.
+    Used as the manager for Orders (Orders.objects and customer.orders),
+    so every Orders queryset can call these methods.
+    """
+
+    def with_totals(self):
+        """
+        Annotates every order with its line count, gross, discount and net totals,
+        computed by the database in the same query that fetches the orders.
+
+        Without this, each {{ order.order_total }} in a template runs one extra
+        order_details query per order and sums the lines in Python.
+
+        Annotations added:
+            line_count: number of order_details lines.
+            gross_total: sum of unit_price * quantity.
+            discount_total: sum of the discount amounts (discount is a percentage).
+            net_total: gross_total - discount_total (same value as get_order_total()).
+        """
+        gross = F("unit_price") * F("quantity")
+        discount = gross * F("discount") / Value(100.0)
+
+        def line_aggregate(aggregate):
+            # Correlated subquery: one aggregated row for the outer order.
+            lines = (
+                OrderDetails.objects.filter(order=OuterRef("pk"))
+                .order_by()
+                .values("order_id")
+                .annotate(value=aggregate)
+                .values("value")
+            )
+            return Subquery(lines)
+
+        return self.annotate(
+            line_count=Coalesce(line_aggregate(Count("product_id")), 0),
+            gross_total=Coalesce(
+                line_aggregate(Sum(gross, output_field=FloatField())),
+                0.0,
+                output_field=FloatField(),
+            ),
+            discount_total=Coalesce(
+                line_aggregate(Sum(discount, output_field=FloatField())),
+                0.0,
+                output_field=FloatField(),
+            ),
+        ).annotate(net_total=F("gross_total") - F("discount_total"))
+
+    def with_lines(self):
+        """
+        Prefetches the order_details lines of every order, together with their products.
+        Loading any number of orders with their lines takes two queries in total
+        (orders, then lines JOIN products), instead of one query per order and per line.
+        """
+        return self.prefetch_related(
+            models.Prefetch(
+                "orderdetails_set",
+                queryset=OrderDetails.objects.select_related("product"),
+            )
+        )
+
+
 class Orders(models.Model):
     """
     Edits/Additions:
@@ -240,8 +342,13 @@ class Orders(models.Model):
     4. Added a property "order_total" to provide easier access to the order total in templates.
         This property does not do anything, it simply asks for the value of get_order_total and returns it.
                 This way, in templates, we can use {{ order.order_total }} instead of calling a method.
+
+    5. Added OrdersQuerySet as the manager. Orders.objects.with_totals() (or customer.get_orders().with_totals())
+        computes the totals in SQL, and "order_total" reads that annotation when it is present.
     """
 
+    objects = OrdersQuerySet.as_manager()
+
     # region Order Fields from Database.
     order_id = models.SmallIntegerField(primary_key=True)
     customer = models.ForeignKey(
@@ -273,8 +380,9 @@ class Orders(models.Model):
         """
         Get all order details for this order.
         Returns a list of OrderDetails objects.
+        Uses the prefetched lines when the order was loaded with with_lines().
         """
-        return OrderDetails.objects.filter(order_id=self.order_id)
+        return self.orderdetails_set.all()
 
     def get_order_total(self):
         """
@@ -290,7 +398,11 @@ class Orders(models.Model):
     def order_total(self):
         """
         Property version of get_order_total for easier template access.
+        Uses the net_total annotation from with_totals() when the order was loaded with it,
+        so no extra query is run.
         """
+        if "net_total" in self.__dict__:
+            return self.net_total
         return self.get_order_total()
 
 
@@ -300,9 +412,13 @@ class Categories(models.Model):
     description = models.TextField(blank=True, null=True)
     picture = models.BinaryField(blank=True, null=True)
 
+    # The picture and description are only read by the picture endpoint (images.py) and when accessed explicitly.
+    objects = DeferredColumnsManager("description", "picture")
+
     class Meta:
         managed = False
         db_table = "categories"
+        base_manager_name = "objects"
 
 
 class Products(models.Model):
@@ -358,3 +474,118 @@ class Suppliers(models.Model):
     class Meta:
         managed = False
         db_table = "suppliers"
+
+
+# region App tables
+"""
+Unlike the Northwind tables above, the tables below are created and maintained by this app
+(managed = True, created by the migrations in DjangoTradersApp/migrations).
+"""
+
+
+class ProductSearchDocument(models.Model):
+    """
+    The search document of one product, maintained by DjangoTradersApp.search.
+    Holds the text that product searches match against (product name, category name,
+    supplier name and quantity per unit), so a search reads one indexed table
+    instead of scanning products and joining categories and suppliers.
+
+    On PostgreSQL the migration adds a weighted tsvector column with a GIN index and a
+    trigram index on "document"; on SQLite it adds an FTS5 index kept in sync by triggers.
+    """
+
+    # db_constraint=False: products is not managed by Django, so no database-level FK is created.
+    product = models.OneToOneField(
+        Products, models.DO_NOTHING, primary_key=True, db_constraint=False, related_name="search_document"
+    )
+    product_name = models.CharField(max_length=40)
+    category_name = models.CharField(max_length=15, blank=True, default="")
+    supplier_name = models.CharField(max_length=40, blank=True, default="")
+    quantity_per_unit = models.CharField(max_length=20, blank=True, default="")
+    document = models.TextField()
+
+    class Meta:
+        db_table = "product_search_documents"
+
+
+class IdCounter(models.Model):
+    """
+    A named, locked counter used to allocate primary keys on databases without sequences (SQLite).
+    On PostgreSQL, order IDs come from the orders_order_id_seq sequence instead.
+    See DjangoTradersApp.ordering.allocate_order_ids.
+    """
+
+    name = models.CharField(max_length=30, primary_key=True)
+    value = models.IntegerField()
+
+    class Meta:
+        db_table = "id_counters"
+
+
+class SalesRollup(models.Model):
+    """
+    Running sales totals, maintained incrementally by DjangoTradersApp.rollups when orders are placed
+    and rebuilt from scratch by "python manage.py rebuild_rollups".
+    revenue is the net total of the lines (after discounts), units the quantity sold,
+    order_count the number of orders.
+    """
+
+    revenue = models.FloatField(default=0)
+    units = models.IntegerField(default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class CustomerSales(SalesRollup):
+    # db_constraint=False on all rollups: the Northwind tables are not managed by Django.
+    customer = models.OneToOneField(
+        Customers, models.DO_NOTHING, primary_key=True, db_constraint=False, related_name="sales"
+    )
+
+    class Meta:
+        db_table = "customer_sales"
+
+
+class ProductSales(SalesRollup):
+    product = models.OneToOneField(
+        Products, models.DO_NOTHING, primary_key=True, db_constraint=False, related_name="sales"
+    )
+
+    class Meta:
+        db_table = "product_sales"
+
+
+class EmployeeSales(SalesRollup):
+    employee = models.OneToOneField(
+        Employees, models.DO_NOTHING, primary_key=True, db_constraint=False, related_name="sales"
+    )
+
+    class Meta:
+        db_table = "employee_sales"
+
+
+class MonthlySales(SalesRollup):
+    month = models.DateField(primary_key=True, help_text="First day of the month.")
+
+    class Meta:
+        db_table = "monthly_sales"
+
+
+class VersionStamp(models.Model):
+    """
+    The version of one cacheable entity (e.g. "product:11", "customer:ALFKI"), changed by every write
+    that changes how the entity's pages look. Maintained by DjangoTradersApp.versioning and used
+    for the ETag and Last-Modified headers of the product and customer pages.
+    """
+
+    key = models.CharField(max_length=60, primary_key=True)
+    version = models.BigIntegerField()
+    modified = models.DateTimeField()
+
+    class Meta:
+        db_table = "version_stamps"
+
+
+# endregion App tables
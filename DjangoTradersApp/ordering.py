@@ -0,0 +1,249 @@
+"""
+Order placement service.
+
+place_order() writes an order header and all of its lines in one atomic transaction:
+    1. allocate the order ID (a sequence on PostgreSQL, a locked counter row elsewhere),
+    2. reserve the ordered units (reserve_stock()),
+    3. INSERT the order,
+    4. INSERT all lines with a single bulk_create,
+    5. add the order to the sales rollups (rollups.py) and bump the version stamps of its pages (versioning.py).
+
+Concurrent checkouts can no longer pick the same "max(order_id) + 1" or sell the same units twice,
+a failure leaves no half-written order behind, and an order costs a fixed number of round trips
+however many lines it has.
+The transaction only locks rows of the order's own customer, employee and products. The rows every
+order changes (the global "stock" stamp, the month's sales totals) are written once it has committed,
+so concurrent checkouts do not queue behind each other's commits on them.
+Each placement is timed and logged to the "DjangoTradersApp.ordering" logger.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, IntegerField, Max, Value, When
+
+from . import rollups, versioning
+from .models import IdCounter, OrderDetails, Orders, Products
+
+
+logger = logging.getLogger(__name__)
+
+ORDER_ID_SEQUENCE = "orders_order_id_seq"
+ORDER_ID_COUNTER = "orders"
+# Reservation attempts when the stock changes between reading and decrementing it (databases without row locks).
+RESERVATION_ATTEMPTS = 3
+
+
+# region Order ID allocation
+
+def allocate_order_ids(count=1, using=None):
+    """
+    Allocates "count" new, unique order IDs and returns them as a list.
+    Must be called inside transaction.atomic() so the IDs are only used by the caller's transaction.
+    """
+    conn = connection if using is None else transaction.get_connection(using)
+    if conn.vendor == "postgresql":
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)", [ORDER_ID_SEQUENCE, count]
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return _allocate_from_counter(count, conn.alias)
+
+
+def _allocate_from_counter(count, using):
+    """
+    Counter-table allocation: the UPDATE takes the row (on SQLite, the database) write lock,
+    so concurrent transactions wait for each other instead of reading the same value.
+    The counter is created on first use, starting after the highest existing order ID.
+    """
+    counters = IdCounter.objects.using(using)
+    with transaction.atomic(using=using):
+        if not counters.filter(name=ORDER_ID_COUNTER).update(value=F("value") + count):
+            highest = Orders.objects.using(using).aggregate(highest=Max("order_id"))["highest"] or 0
+            try:
+                with transaction.atomic(using=using):
+                    counters.create(name=ORDER_ID_COUNTER, value=highest + count)
+            except IntegrityError:
+                # Another transaction created the counter first: take the next block from it.
+                counters.filter(name=ORDER_ID_COUNTER).update(value=F("value") + count)
+        last = counters.get(name=ORDER_ID_COUNTER).value
+    return list(range(last - count + 1, last + 1))
+
+# endregion Order ID allocation
+
+
+# region Stock reservation
+
+@dataclass
+class Shortage:
+    """An order line asking for more units than are in stock (available is 0 for a deleted product)."""
+    product_id: int
+    product_name: str
+    requested: int
+    available: int
+
+    def __str__(self):
+        return f"{self.product_name}: {self.requested} ordered, {self.available} in stock"
+
+
+class InsufficientStock(Exception):
+    """Raised by place_order() when order lines cannot be reserved; shortages lists every such line."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(
+            "Insufficient stock: " + "; ".join(str(shortage) for shortage in shortages) if shortages
+            else "The stock changed while the order was placed; please try again."
+        )
+
+
+def requested_quantities(items):
+    """Units per product ID of cart items (lines of the same product are added up)."""
+    quantities = {}
+    for item in items:
+        quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+    return quantities
+
+
+def _shortages(quantities, stock):
+    shortages = []
+    for product_id, requested in sorted(quantities.items()):
+        name, available = stock.get(product_id, (str(product_id), 0))
+        if available is not None and available < requested:
+            shortages.append(Shortage(product_id, name, requested, available))
+    return shortages
+
+
+def reserve_stock(items):
+    """
+    Decrements units_in_stock by the ordered quantities of cart items, or raises InsufficientStock
+    listing every line that cannot be served (and changes nothing). Must run inside transaction.atomic().
+
+    The products are read with SELECT ... FOR UPDATE in product ID order, so concurrent checkouts lock
+    shared products in the same order (no deadlocks) and wait for each other; all lines are then
+    decremented by one conditional UPDATE (units_in_stock >= the line's quantity), which on databases
+    without row locks (SQLite) is the guard: if another checkout took the units in between, fewer rows
+    are updated, the UPDATE is rolled back and the reservation is read and tried again.
+    Products without a units_in_stock value are not stock-managed and are not reserved.
+    Returns the IDs of the products whose stock was decremented.
+    """
+    quantities = requested_quantities(items)
+    for _ in range(RESERVATION_ATTEMPTS):
+        stock = {
+            product_id: (name, units_in_stock)
+            for product_id, name, units_in_stock in Products.objects.select_for_update()
+            .filter(product_id__in=quantities).order_by("product_id")
+            .values_list("product_id", "product_name", "units_in_stock")
+        }
+        shortages = _shortages(quantities, stock)
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        tracked = {product_id: quantities[product_id] for product_id, (_, units) in stock.items() if units is not None}
+        if not tracked:
+            return []
+        needed = Case(
+            *(When(product_id=product_id, then=Value(quantity)) for product_id, quantity in tracked.items()),
+            output_field=IntegerField(),
+        )
+        try:
+            with transaction.atomic():
+                updated = Products.objects.filter(product_id__in=tracked, units_in_stock__gte=needed).update(
+                    units_in_stock=F("units_in_stock") - needed
+                )
+                if updated != len(tracked):
+                    raise _StockChanged
+        except _StockChanged:
+            continue
+        return list(tracked)
+    raise InsufficientStock(_shortages(quantities, stock))
+
+
+class _StockChanged(Exception):
+    """Rolls back a partial reservation."""
+
+# endregion Stock reservation
+
+
+# region Order placement
+
+@dataclass
+class PlacementResult:
+    """The placed order, its lines and how long the placement took (in milliseconds)."""
+    order: Orders
+    lines: list = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def order_total(self):
+        return sum(line.line_total for line in self.lines)
+
+
+def build_order_lines(order_id, items):
+    """
+    Builds unsaved OrderDetails from cart items (dicts with product_id, unit_price, quantity, discount),
+    as stored in the order wizard's session data.
+    """
+    return [
+        OrderDetails(
+            order_id=order_id,
+            product_id=item["product_id"],
+            unit_price=item["unit_price"],
+            quantity=item["quantity"],
+            discount=item["discount"],
+        )
+        for item in items
+    ]
+
+
+def place_order(customer, employee, shipper, items, required_date, shipping=None, order_date=None, freight=0):
+    """
+    Places an order: allocates its ID, reserves the stock and writes the header plus all lines in one transaction.
+    Raises InsufficientStock (and writes nothing) if some lines ask for more units than are in stock.
+
+    customer, employee, shipper: model instances.
+    items: cart items (dicts with product_id, unit_price, quantity, discount).
+    shipping: dict with ship_name, ship_address, ship_city, ship_region, ship_postal_code, ship_country.
+    Returns a PlacementResult.
+    """
+    shipping = shipping or {}
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        order_id = allocate_order_ids(1)[0]
+        reserved = reserve_stock(items)
+        order = Orders(
+            order_id=order_id,
+            customer=customer,
+            employee=employee,
+            order_date=order_date or date.today(),
+            required_date=required_date,
+            ship_via=shipper,
+            freight=freight,
+            ship_name=shipping.get("ship_name"),
+            ship_address=shipping.get("ship_address"),
+            ship_city=shipping.get("ship_city"),
+            ship_region=shipping.get("ship_region"),
+            ship_postal_code=shipping.get("ship_postal_code"),
+            ship_country=shipping.get("ship_country"),
+        )
+        order.save(force_insert=True)
+        lines = OrderDetails.objects.bulk_create(build_order_lines(order_id, items))
+        rollups.apply_orders([(order, lines)])
+        versioning.orders_written([(order, lines)])
+        if reserved:
+            transaction.on_commit(lambda: versioning.bump(versioning.STOCK))
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        "Placed order %s (%d lines) in %.1f ms",
+        order_id, len(lines), elapsed_ms,
+        extra={"order_id": order_id, "line_count": len(lines), "elapsed_ms": elapsed_ms},
+    )
+    return PlacementResult(order=order, lines=lines, elapsed_ms=elapsed_ms)
+
+# endregion Order placement
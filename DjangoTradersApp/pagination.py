@@ -0,0 +1,242 @@
+"""
+Keyset (seek) pagination.
+
+Django's Paginator pages with OFFSET (the database reads and discards every earlier row,
+so deep pages get slower linearly) and runs a COUNT(*) of the whole result for every page.
+
+KeysetPaginator orders by (sort field, primary key) and asks for the rows after (or before)
+the last row seen: WHERE sort >= v AND (sort > v OR pk > k) ORDER BY sort, pk LIMIT n + 1.
+With an index on (sort field, pk) every page costs the same, and no count query is made.
+The position is carried in opaque "next"/"previous" cursors instead of page numbers.
+
+KeysetPage offers the parts of django.core.paginator.Page the templates use
+(object_list, number, has_next, has_previous, ...), plus next_cursor/previous_cursor.
+Views opt in through KeysetPaginationMixin.
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+# region Cursors
+
+def encode_cursor(position):
+    """Encodes a cursor position dict as an opaque, URL-safe string."""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by encode_cursor. Raises InvalidCursor for anything else: the position must be
+    an object with a direction "d", a scalar key "k" (and value "v") and a page number "n" of at least 1.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(position, dict) or position.get("d") not in ("next", "prev"):
+        raise InvalidCursor(cursor)
+    if not _is_scalar(position.get("k")) or ("v" in position and not _is_scalar(position["v"])):
+        raise InvalidCursor(cursor)
+    number = position.get("n", 1)
+    if not isinstance(number, int) or isinstance(number, bool) or number < 1:
+        raise InvalidCursor(cursor)
+    return position
+
+
+def _is_scalar(value):
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+# endregion Cursors
+
+
+class KeysetPaginator:
+    """
+    Pages a queryset by (sort_field, pk).
+    The sort field must not be NULL (rows with NULL sort values would be skipped).
+    For the best performance the table should have an index on (sort_field, pk).
+    """
+
+    # KeysetPage has no total, so templates can check these instead of num_pages/page_range.
+    num_pages = None
+    page_range = ()
+
+    def __init__(self, queryset, per_page, sort_field="pk"):
+        self.per_page = int(per_page)
+        self.pk_name = queryset.model._meta.pk.attname
+        self.sort_field = self.pk_name if sort_field == "pk" else sort_field
+        self.queryset = queryset.order_by(*self._ordering(reverse=False))
+
+    def _ordering(self, reverse):
+        prefix = "-" if reverse else ""
+        if self.sort_field == self.pk_name:
+            return [prefix + self.pk_name]
+        return [prefix + self.sort_field, prefix + self.pk_name]
+
+    def _seek(self, value, key, direction):
+        """Rows strictly after (next) or before (prev) the (value, key) position."""
+        op = "gt" if direction == "next" else "lt"
+        if self.sort_field == self.pk_name:
+            return Q(**{f"{self.pk_name}__{op}": key})
+        # (sort >= v) AND (sort > v OR pk > k): the leading range condition lets the database
+        # seek into the (sort, pk) index instead of filtering it from the start.
+        return Q(**{f"{self.sort_field}__{op}e": value}) & (
+            Q(**{f"{self.sort_field}__{op}": value}) | Q(**{f"{self.pk_name}__{op}": key})
+        )
+
+    def _clean(self, name, value):
+        """A cursor value as the Python value of the field, within the field's range. Raises InvalidCursor."""
+        if value is None:
+            raise InvalidCursor(value)
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:  # e.g. a sort field across a relation
+            return value
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except ValidationError:
+            raise InvalidCursor(value)
+        return value
+
+    def _position(self, obj, direction, number):
+        # Rows are model instances, or dicts for values() querysets (which must include both fields).
+        if isinstance(obj, dict):
+            value, key = obj[self.sort_field], obj[self.pk_name]
+        else:
+            value, key = getattr(obj, self.sort_field), getattr(obj, self.pk_name)
+        return {
+            "v": value,
+            "k": key,
+            "d": direction,
+            "n": number,
+        }
+
+    def page(self, cursor=None):
+        """
+        Returns the KeysetPage for a cursor (None for the first page).
+        Raises InvalidCursor for a malformed cursor, or one whose key or value is not valid for its field.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        queryset = self.queryset
+        backwards = position is not None and position["d"] == "prev"
+        if position is not None:
+            key = self._clean(self.pk_name, position["k"])
+            value = key if self.sort_field == self.pk_name else self._clean(self.sort_field, position.get("v"))
+            queryset = queryset.filter(self._seek(value, key, position["d"]))
+        if backwards:
+            queryset = queryset.order_by(*self._ordering(reverse=True))
+
+        # One extra row tells whether there is another page in the reading direction.
+        rows = list(queryset[: self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if position is None:
+            number = 1
+        else:
+            previous_number = position.get("n") or 1
+            number = max(previous_number - 1, 1) if backwards else previous_number + 1
+
+        has_next = more if not backwards else True
+        has_previous = (position is not None) if not backwards else more
+        return KeysetPage(
+            rows,
+            number=number,
+            paginator=self,
+            next_cursor=encode_cursor(self._position(rows[-1], "next", number)) if has_next and rows else None,
+            previous_cursor=encode_cursor(self._position(rows[0], "prev", number)) if has_previous and rows else None,
+        )
+
+
+class KeysetPage:
+    """
+    A page of a KeysetPaginator, usable where templates expect a Page (page_obj).
+    next_page_number()/previous_page_number() only number the pages for display;
+    links must use next_cursor/previous_cursor.
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, number, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def __repr__(self):
+        return f"<KeysetPage {self.number}>"
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset pagination for ListViews.
+
+    Keyset mode is used when settings.KEYSET_PAGINATION is True or the request carries a "cursor"
+    (or "paging=keyset") parameter, and the view's queryset is a real QuerySet.
+    Otherwise the view paginates as usual with Django's Paginator.
+
+    keyset_sort_field: the (non-NULL) field pages are ordered by; ties are broken by the primary key.
+    """
+
+    keyset_sort_field = "pk"
+
+    def keyset_enabled(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            return False
+        params = self.request.GET
+        return (
+            getattr(settings, "KEYSET_PAGINATION", False)
+            or "cursor" in params
+            or params.get("paging") == "keyset"
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_enabled(queryset):
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_sort_field)
+        try:
+            page = paginator.page(self.request.GET.get("cursor") or None)
+        except InvalidCursor:
+            raise Http404("Invalid page cursor.")
+        return (paginator, page, page.object_list, page.has_other_pages())
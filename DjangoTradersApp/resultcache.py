@@ -0,0 +1,150 @@
+"""
+Search result caches.
+
+A product search (ProductsListView's "search") or a customer search (CustomerListView's "customer",
+"title" and "country") used to run again for every page of its result and for every repeat of a
+popular query. A ResultCache stores the ordered primary keys of a result once, keyed by the normalized
+filter set; every page is then served from the list (ResultList loads only the rows of the page).
+
+Each process keeps up to SEARCH_RESULT_CACHE_SIZE results per cache (default 256), least recently used
+first out. Entries are tagged with the cache's version (see versionedcache.py), which all processes share:
+writes to the searched tables move it to a new version (invalidate_model, called from signals.py) and every
+process drops its older entries on their next use.
+
+Each cache counts hits, misses and evictions per process; stats() returns them
+(shown by the DjTraders.SearchCacheStats view).
+"""
+
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import versionedcache
+
+
+CACHE_KEY_PREFIX = "search_results"
+
+
+class ResultList:
+    """
+    The rows of an ordered primary-key list, for ListView and its Paginator.
+
+    len() counts the keys (no COUNT(*) query), and a slice loads only its own rows
+    (one pk__in query, returned in list order).
+    """
+
+    def __init__(self, pks, queryset):
+        self.pks = list(pks)
+        self.queryset = queryset
+        self.model = queryset.model
+        # The list order is the order, so the paginator must not warn about an unordered list.
+        self.ordered = True
+
+    def __len__(self):
+        return len(self.pks)
+
+    def count(self):
+        return len(self.pks)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            pks = self.pks[index]
+            rows = self.queryset.in_bulk(pks)
+            return [rows[pk] for pk in pks if pk in rows]
+        if index < 0:
+            index += len(self.pks)
+        return self[index:index + 1][0]
+
+
+def normalize(filters):
+    """The cache key of a filter set: its non-empty (name, value) pairs, sorted by name."""
+    return tuple(sorted((name, value) for name, value in filters.items() if value))
+
+
+class ResultCache(versionedcache.VersionedCache):
+    """
+    A per-process LRU of search results (ordered primary-key lists).
+
+    name:   unique name, used for the version key and in stats().
+    models: labels of the models whose writes change the results, e.g. ["DjangoTradersApp.Customers"].
+    """
+
+    key_prefix = CACHE_KEY_PREFIX
+
+    def __init__(self, name, models):
+        super().__init__(name, models)
+        self._entries = OrderedDict()  # filter key: (version, pks)
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def max_entries(self):
+        return getattr(settings, "SEARCH_RESULT_CACHE_SIZE", 256)
+
+    def get(self, filters, load):
+        """
+        The primary keys of the result for filters (a dict of normalized filter values),
+        from the cache or from load() (which returns them in order).
+        """
+        key = normalize(filters)
+        version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        pks = list(load())
+        with self._lock:
+            self._entries[key] = (version, pks)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return pks
+
+    def clear_local(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# region Registered caches
+
+PRODUCT_SEARCHES = ResultCache(
+    "product_search",
+    # Search documents include the category and supplier names.
+    ["DjangoTradersApp.Products", "DjangoTradersApp.Categories", "DjangoTradersApp.Suppliers"],
+)
+CUSTOMER_SEARCHES = ResultCache("customer_search", ["DjangoTradersApp.Customers"])
+
+REGISTRY = [PRODUCT_SEARCHES, CUSTOMER_SEARCHES]
+
+# endregion Registered caches
+
+
+def invalidate_model(model):
+    """Invalidates every registered cache whose results depend on the given model (call after writes)."""
+    versionedcache.invalidate_model(REGISTRY, model)
+
+
+def invalidate_all():
+    versionedcache.invalidate_all(REGISTRY)
+
+
+def stats():
+    return [result_cache.stats() for result_cache in REGISTRY]
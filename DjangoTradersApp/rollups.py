@@ -0,0 +1,164 @@
+"""
+Sales rollup tables: revenue, units and order count per customer, product, employee and month.
+
+apply_orders() adds newly placed orders to the rollups (called inside the placing transaction by
+ordering.place_order and by the order import), so the rollups never need re-summing order_details.
+The customer, product and employee rows are updated in that transaction; the monthly totals, one row that
+every order of the month updates, once it has committed (see apply_orders()).
+rebuild() recomputes all rollups from orders/order_details with one INSERT ... SELECT ... GROUP BY
+per table ("python manage.py rebuild_rollups").
+
+Revenue is the net line total, unit_price * quantity * (1 - discount / 100), as in OrderDetails.line_total.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import CustomerSales, EmployeeSales, MonthlySales, OrderDetails, ProductSales
+
+
+def _line_revenue():
+    gross = F("unit_price") * F("quantity")
+    return Sum(gross - gross * F("discount") / 100.0, output_field=FloatField())
+
+
+# (rollup model, key column, expression grouping order_details rows by that key)
+ROLLUPS = [
+    (CustomerSales, "customer_id", F("order__customer_id")),
+    (ProductSales, "product_id", F("product_id")),
+    (EmployeeSales, "employee_id", F("order__employee_id")),
+    (MonthlySales, "month", TruncMonth("order__order_date")),
+]
+# Rollups over all orders: every order adds to the same row, so they are updated after the commit.
+DEFERRED_ROLLUPS = {MonthlySales}
+
+
+def sales_for(model, key):
+    """
+    The rollup row of one customer/product/employee/month (a single primary-key lookup),
+    or an unsaved all-zero row when nothing has been sold yet.
+    """
+    key_name = next(name for rollup, name, _ in ROLLUPS if rollup is model)
+    return model.objects.filter(**{key_name: key}).first() or model(**{key_name: key})
+
+
+async def asales_for(model, key):
+    """Async version of sales_for (for the async views)."""
+    key_name = next(name for rollup, name, _ in ROLLUPS if rollup is model)
+    return await model.objects.filter(**{key_name: key}).afirst() or model(**{key_name: key})
+
+
+# region Incremental updates
+
+def _month(value):
+    return value.replace(day=1) if value else None
+
+
+def order_deltas(orders_with_lines):
+    """
+    Sums the (revenue, units, order_count) to add to each rollup row for the given orders.
+    orders_with_lines: iterable of (Orders instance, list of OrderDetails).
+    Returns {rollup model: {key: [revenue, units, order_count]}}.
+    """
+    deltas = {model: defaultdict(lambda: [0.0, 0, 0]) for model, _, _ in ROLLUPS}
+    for order, lines in orders_with_lines:
+        revenue = sum(line.line_total for line in lines)
+        units = sum(line.quantity for line in lines)
+        for model, key in (
+            (CustomerSales, order.customer_id),
+            (EmployeeSales, order.employee_id),
+            (MonthlySales, _month(order.order_date)),
+        ):
+            if key is not None:
+                delta = deltas[model][key]
+                delta[0] += revenue
+                delta[1] += units
+                delta[2] += 1
+        for line in lines:
+            delta = deltas[ProductSales][line.product_id]
+            delta[0] += line.line_total
+            delta[1] += line.quantity
+            delta[2] += 1
+    return deltas
+
+
+def apply_orders(orders_with_lines):
+    """
+    Adds orders to the rollups with one UPDATE ... SET x = x + delta per affected row
+    (an INSERT for rows that do not exist yet). Call inside the transaction that writes the orders.
+
+    The DEFERRED_ROLLUPS rows are updated once that transaction has committed (transaction.on_commit),
+    in a transaction of their own: held until the commit, the lock on the month's row would make
+    concurrent checkouts wait for each other. An order that commits while the process stops before
+    the callback runs is missing from the monthly totals until the next rebuild ("rebuild_rollups").
+    """
+    deltas = order_deltas(orders_with_lines)
+    _apply(deltas, [rollup for rollup in ROLLUPS if rollup[0] not in DEFERRED_ROLLUPS])
+    transaction.on_commit(lambda: _apply(deltas, [rollup for rollup in ROLLUPS if rollup[0] in DEFERRED_ROLLUPS]))
+
+
+def _apply(deltas, rollups):
+    with transaction.atomic():
+        for model, key_name, _ in rollups:
+            for key, (revenue, units, order_count) in deltas[model].items():
+                _add(model, key_name, key, revenue, units, order_count)
+
+
+def _add(model, key_name, key, revenue, units, order_count):
+    increments = {
+        "revenue": F("revenue") + revenue,
+        "units": F("units") + units,
+        "order_count": F("order_count") + order_count,
+    }
+    if model.objects.filter(**{key_name: key}).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**{key_name: key}, revenue=revenue, units=units, order_count=order_count)
+    except IntegrityError:
+        # Created concurrently by another transaction: add to it instead.
+        model.objects.filter(**{key_name: key}).update(**increments)
+
+# endregion Incremental updates
+
+
+# region Rebuild
+
+def rebuild():
+    """
+    Recomputes every rollup table from orders and order_details, set-based:
+    DELETE, then INSERT INTO <rollup> SELECT key, SUM(revenue), SUM(quantity), COUNT(DISTINCT order) ... GROUP BY key.
+    Returns {table name: rows written}.
+    """
+    written = {}
+    with transaction.atomic():
+        for model, key_name, key_expression in ROLLUPS:
+            table = model._meta.db_table
+            select = (
+                OrderDetails.objects.order_by()
+                .annotate(rollup_key=key_expression)
+                .filter(rollup_key__isnull=False)
+                .values("rollup_key")
+                .annotate(
+                    total_revenue=_line_revenue(),
+                    total_units=Sum("quantity"),
+                    total_orders=Count("order_id", distinct=True),
+                )
+                .values_list("rollup_key", "total_revenue", "total_units", "total_orders")
+            )
+            sql, params = select.query.sql_with_params()
+            quote = connection.ops.quote_name
+            key_column = model._meta.get_field(key_name).column
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {quote(table)}")
+                cursor.execute(
+                    f"INSERT INTO {quote(table)} ({quote(key_column)}, revenue, units, order_count) {sql}",
+                    params,
+                )
+                written[table] = cursor.rowcount
+    return written
+
+# endregion Rebuild
@@ -0,0 +1,256 @@
+"""
+Primary/replica database routing.
+
+Almost all requests only read (product and customer lists, customer details, order lists), so reads
+can be spread over read replicas while every write goes to the primary database:
+    settings.DATABASE_PRIMARY          alias of the primary (default "default"),
+    settings.DATABASE_REPLICAS         aliases of the replicas (default []: everything uses the primary),
+    settings.DATABASE_REPLICA_POLICY   "round_robin" (default) or "least_latency",
+    settings.DATABASE_PRIMARY_APPS     apps whose tables are always read from the primary (default ["sessions"],
+                                       so a session written by one request is never read stale by the next).
+
+Replicas lag behind the primary, so reads are pinned to the primary when a user could otherwise miss
+their own write:
+    - for the whole request when it is not a safe method (POST etc.: product create/update, order_confirm),
+    - for the rest of the request after any write (the router's db_for_write pins it),
+    - for the next DATABASE_REPLICA_PIN_SECONDS seconds (default 5) of the user's session after a write,
+      through a cookie set by PrimaryPinningMiddleware,
+    - inside transactions on the primary (transaction.atomic()), so reads and writes see the same data.
+Outside requests (management commands, shell) a write pins the rest of the current thread/context;
+pin_scope(pinned=True) pins a block of code explicitly.
+
+"least_latency" measures every replica with "SELECT 1" at most every DATABASE_REPLICA_PROBE_SECONDS seconds
+(default 10) and reads from the fastest one; replicas whose probe fails are skipped until the next probe,
+and reads fall back to the primary when no replica is reachable.
+
+Replica aliases are never migrated (they receive the schema through replication); in tests, configure
+them with "TEST": {"MIRROR": "default"}.
+"""
+
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+PIN_COOKIE = "db_primary_pin"
+
+# Smoothing factor of the latency averages (weight of the newest probe).
+LATENCY_SMOOTHING = 0.3
+
+
+# region Settings
+
+def primary_alias():
+    return getattr(settings, "DATABASE_PRIMARY", "default")
+
+
+def replica_aliases():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def primary_apps():
+    return getattr(settings, "DATABASE_PRIMARY_APPS", ["sessions"])
+
+
+def pin_seconds():
+    return getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+
+# endregion Settings
+
+
+# region Pinning
+
+class PinState:
+    """Whether reads of the current request (or context) must go to the primary."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False  # a write happened in this request: pin the session too
+
+
+# A mutable object rather than a bool: the ORM of async views runs on another thread, in a copy of the
+# request's context, and a write there has to pin the reads of the rest of the request.
+_state = contextvars.ContextVar("db_pin_state", default=None)
+
+
+def is_pinned():
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+def pin():
+    """Pins the reads of the current request/context to the primary after a write."""
+    state = _state.get()
+    if state is None:
+        state = PinState()
+        _state.set(state)
+    state.pinned = True
+    state.wrote = True
+
+
+@contextmanager
+def pin_scope(pinned=False):
+    """
+    Gives the block its own pin state (as a request has): writes inside it only pin the block.
+    With pinned=True every read inside the block goes to the primary.
+    """
+    state = PinState(pinned=pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+# endregion Pinning
+
+
+# region Replica selection
+
+class RoundRobin:
+    """Cycles through the replicas."""
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def choose(self, replicas):
+        return replicas[next(self._counter) % len(replicas)]
+
+
+class LeastLatency:
+    """
+    Chooses the replica with the lowest smoothed probe latency (None when no replica is reachable).
+    """
+
+    def __init__(self):
+        self.latencies = {}  # alias: seconds (smoothed); None while unreachable
+        self._probed_at = None
+        self._lock = threading.Lock()
+
+    def choose(self, replicas):
+        interval = getattr(settings, "DATABASE_REPLICA_PROBE_SECONDS", 10)
+        now = time.monotonic()
+        if self._probed_at is None or now - self._probed_at >= interval:
+            with self._lock:
+                if self._probed_at is None or now - self._probed_at >= interval:
+                    self._probed_at = now
+                    for alias in replicas:
+                        self.record(alias, self.probe(alias))
+        reachable = [alias for alias in replicas if self.latencies.get(alias, 0) is not None]
+        if not reachable:
+            return None
+        return min(reachable, key=lambda alias: self.latencies.get(alias, 0))
+
+    def record(self, alias, latency):
+        previous = self.latencies.get(alias)
+        if latency is None or previous is None:
+            self.latencies[alias] = latency
+        else:
+            self.latencies[alias] = LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * previous
+
+    @staticmethod
+    def probe(alias):
+        """Round-trip time of "SELECT 1" on the replica, or None if it fails."""
+        started = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        except DatabaseError:
+            return None
+        return time.perf_counter() - started
+
+
+POLICIES = {"round_robin": RoundRobin, "least_latency": LeastLatency}
+
+# endregion Replica selection
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the primary and reads to a replica unless the reads are pinned (see the module docstring).
+    Without DATABASE_REPLICAS it leaves every decision to Django (returns None).
+    """
+
+    def __init__(self):
+        self._selectors = {}
+
+    def selector(self):
+        policy = getattr(settings, "DATABASE_REPLICA_POLICY", "round_robin")
+        if policy not in self._selectors:
+            self._selectors[policy] = POLICIES[policy]()
+        return self._selectors[policy]
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas:
+            return None
+        primary = primary_alias()
+        if (
+            is_pinned()
+            or model._meta.app_label in primary_apps()
+            or connections[primary].in_atomic_block
+        ):
+            return primary
+        return self.selector().choose(replicas) or primary
+
+    def db_for_write(self, model, **hints):
+        if not replica_aliases():
+            return None
+        if model._meta.app_label not in primary_apps():
+            pin()
+        return primary_alias()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        databases = {primary_alias(), *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class PrimaryPinningMiddleware:
+    """
+    Pins the reads of unsafe requests, and of requests within DATABASE_REPLICA_PIN_SECONDS of a write
+    by the same client, to the primary; sets the pin cookie after requests that wrote.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with pin_scope(self.pinned(request)) as state:
+            response = self.get_response(request)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        with pin_scope(self.pinned(request)) as state:
+            response = await self.get_response(request)
+        return self.finish(state, response)
+
+    @staticmethod
+    def pinned(request):
+        return request.method not in ("GET", "HEAD", "OPTIONS", "TRACE") or PIN_COOKIE in request.COOKIES
+
+    @staticmethod
+    def finish(state, response):
+        if state.wrote and replica_aliases():
+            response.set_cookie(PIN_COOKIE, "1", max_age=pin_seconds(), httponly=True, samesite="Lax")
+        return response
@@ -0,0 +1,222 @@
+"""
+Product search engine.
+
+Every product has a search document (ProductSearchDocument) holding the text a search can match:
+product name, category name, supplier name and quantity per unit.
+Searches read only that indexed table, instead of OR-ing four icontains filters over
+products JOIN categories JOIN suppliers on every request.
+
+Backends (chosen from the database in use):
+    postgresql: weighted tsvector with a GIN index (ranked with ts_rank), plus a trigram
+                index on the document so partial words still match.
+    sqlite:     FTS5 index (ranked with bm25), used for local and test runs. FTS5 only matches word
+                prefixes, so documents matching the terms as substrings (LIKE) are added after them.
+    others:     falls back to the original icontains filters.
+The views search through cached_search_product_ids(), which keeps recent results (see resultcache.py).
+
+The documents are kept in sync by the signal handlers in DjangoTradersApp/signals.py
+(product saved through ProductCreateView/ProductUpdateView, category or supplier renamed).
+Migration 0009 builds them for the products existing when it runs; to rebuild them all
+(e.g. after bulk changes made outside Django) run:  python manage.py rebuild_product_search
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Categories, Products, ProductSearchDocument, deferred_related
+from .resultcache import PRODUCT_SEARCHES, ResultList
+
+
+# Relevance weights for the FTS5 bm25() ranking, in column order:
+# product_name, category_name, supplier_name, quantity_per_unit
+SQLITE_BM25_WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+
+# Search terms are reduced to letters and digits, so user input can never break the MATCH/tsquery syntax.
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+# region Search documents
+
+def build_document(product):
+    """
+    Returns an unsaved ProductSearchDocument for a product.
+    Reads product.category and product.supplier, so load products with
+    select_related("category", "supplier") when building many documents.
+    """
+    category_name = product.category.category_name if product.category_id else ""
+    supplier_name = product.supplier.company_name if product.supplier_id else ""
+    fields = [product.product_name or "", category_name, supplier_name, product.quantity_per_unit or ""]
+    return ProductSearchDocument(
+        product_id=product.product_id,
+        product_name=fields[0],
+        category_name=fields[1],
+        supplier_name=fields[2],
+        quantity_per_unit=fields[3],
+        document=" ".join(field for field in fields if field).lower(),
+    )
+
+
+def index_product(product):
+    """
+    Creates or refreshes the search document of one product.
+    """
+    document = build_document(product)
+    ProductSearchDocument.objects.update_or_create(
+        product_id=document.product_id,
+        defaults={
+            "product_name": document.product_name,
+            "category_name": document.category_name,
+            "supplier_name": document.supplier_name,
+            "quantity_per_unit": document.quantity_per_unit,
+            "document": document.document,
+        },
+    )
+
+
+def index_products(products=None, batch_size=500):
+    """
+    Rebuilds the search documents of the given products (all products by default).
+    The existing documents of those products are deleted and re-inserted in batches.
+    Returns the number of documents written.
+    """
+    if products is None:
+        products = Products.objects.all()
+    products = (
+        products.select_related("category", "supplier")
+        .defer(*deferred_related("category", Categories)).order_by("product_id")
+    )
+
+    written = 0
+    batch = []
+    for product in products.iterator(chunk_size=batch_size):
+        batch.append(build_document(product))
+        if len(batch) >= batch_size:
+            written += _replace_documents(batch)
+            batch = []
+    if batch:
+        written += _replace_documents(batch)
+    return written
+
+
+def _replace_documents(documents):
+    ProductSearchDocument.objects.filter(product_id__in=[d.product_id for d in documents]).delete()
+    ProductSearchDocument.objects.bulk_create(documents)
+    return len(documents)
+
+
+def remove_product(product_id):
+    """
+    Deletes the search document of a product.
+    """
+    ProductSearchDocument.objects.filter(product_id=product_id).delete()
+
+# endregion Search documents
+
+
+# region Searching
+
+def search_terms(search):
+    """
+    Splits a search string into lower-case terms (letters and digits only).
+    """
+    return TERM_PATTERN.findall(search.lower())
+
+
+def search_product_ids(search, limit=None):
+    """
+    Returns the IDs of the products matching the search string, most relevant first.
+    Every term must match somewhere in the product's search document: word prefix matches rank first,
+    then documents containing the terms (in order) anywhere, like the original icontains filters.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return []
+
+    vendor = connection.vendor
+    if vendor == "postgresql":
+        sql, params = _postgresql_query(search, terms)
+    elif vendor == "sqlite":
+        sql, params = _sqlite_query(terms)
+    else:
+        return list(_fallback_queryset(search).values_list("product_id", flat=True)[:limit])
+
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def cached_search_product_ids(search):
+    """
+    search_product_ids() through the product search result cache (resultcache.py).
+    Searches with the same terms share an entry (the full-text backends only use the terms).
+    """
+    if connection.vendor in ("postgresql", "sqlite"):
+        key = " ".join(search_terms(search))
+    else:
+        key = search.lower()
+    return PRODUCT_SEARCHES.get({"search": key}, lambda: search_product_ids(search))
+
+
+def _postgresql_query(search, terms):
+    # Every term as a prefix match: 'chai':* & 'tea':*
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    like = "%" + "%".join(terms) + "%"
+    sql = (
+        "SELECT product_id FROM product_search_documents "
+        "WHERE search_vector @@ to_tsquery('simple', %s) OR document ILIKE %s "
+        "ORDER BY ts_rank(search_vector, to_tsquery('simple', %s)) DESC, "
+        "similarity(document, %s) DESC, product_id"
+    )
+    return sql, [tsquery, like, tsquery, search.lower()]
+
+
+def _sqlite_query(terms):
+    # Every term as a quoted prefix match: "chai"* AND "tea"*, ranked by bm25 (negative, best first);
+    # then the substring matches FTS5 cannot find ('hai' in "chai"), ranked after all of them.
+    match = " AND ".join(f'"{term}"*' for term in terms)
+    like = "%" + "%".join(terms) + "%"
+    weights = ", ".join(str(weight) for weight in SQLITE_BM25_WEIGHTS)
+    sql = (
+        "SELECT product_id FROM ("
+        f"SELECT rowid AS product_id, bm25(product_search_fts, {weights}) AS relevance FROM product_search_fts "
+        "WHERE product_search_fts MATCH %s "
+        "UNION ALL "
+        "SELECT product_id, 0 AS relevance FROM product_search_documents "
+        "WHERE document LIKE %s AND product_id NOT IN "
+        "(SELECT rowid FROM product_search_fts WHERE product_search_fts MATCH %s)"
+        ") ORDER BY relevance, product_id"
+    )
+    return sql, [match, like, match]
+
+
+def _fallback_queryset(search):
+    return Products.objects.filter(
+        Q(product_name__icontains=search) |
+        Q(category__category_name__icontains=search) |
+        Q(supplier__company_name__icontains=search) |
+        Q(quantity_per_unit__icontains=search)
+    ).order_by("product_id")
+
+# endregion Searching
+
+
+class RankedProducts(ResultList):
+    """
+    A ranked list of products for ListView and its Paginator.
+
+    The matching IDs are found once (search_product_ids), so the paginator counts them with len()
+    instead of running COUNT(*) over the search, and only the products of the requested page
+    are loaded from the products table (one pk__in query per page, in ranked order).
+    """
+
+    def __init__(self, product_ids, queryset=None):
+        super().__init__(product_ids, queryset if queryset is not None else Products.objects.all())
+
+    @property
+    def product_ids(self):
+        return self.pks
@@ -0,0 +1,131 @@
+"""
+Signal handlers that keep derived data in sync with writes to the Northwind tables.
+Connected in DjangoTradersApp.apps.DjangotradersappConfig.ready().
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import choices, lookups, resultcache, search, versioning
+from .models import Categories, Customers, Employees, Products, Shippers, Suppliers
+
+
+# region Product search documents
+
+@receiver(post_save, sender=Products, dispatch_uid="products_search_index")
+def product_saved(sender, instance, **kwargs):
+    """ProductCreateView / ProductUpdateView saves: refresh the product's search document."""
+    search.index_product(instance)
+
+
+@receiver(post_delete, sender=Products, dispatch_uid="products_search_remove")
+def product_deleted(sender, instance, **kwargs):
+    search.remove_product(instance.product_id)
+
+
+@receiver(post_save, sender=Categories, dispatch_uid="categories_search_index")
+def category_saved(sender, instance, **kwargs):
+    """A renamed category changes the search document of all its products."""
+    search.index_products(Products.objects.filter(category_id=instance.category_id))
+
+
+@receiver(post_save, sender=Suppliers, dispatch_uid="suppliers_search_index")
+def supplier_saved(sender, instance, **kwargs):
+    """A renamed supplier changes the search document of all its products."""
+    search.index_products(Products.objects.filter(supplier_id=instance.supplier_id))
+
+# endregion Product search documents
+
+
+# region Reference lookups
+
+@receiver(post_save, sender=Customers, dispatch_uid="customers_lookups_saved")
+@receiver(post_delete, sender=Customers, dispatch_uid="customers_lookups_deleted")
+def customer_changed(sender, instance, **kwargs):
+    """Countries, cities, regions and contact titles may have changed."""
+    lookups.invalidate_model(Customers)
+
+# endregion Reference lookups
+
+
+# region Choice sets
+
+@receiver(post_save, sender=Customers, dispatch_uid="customers_choices_saved")
+@receiver(post_delete, sender=Customers, dispatch_uid="customers_choices_deleted")
+@receiver(post_save, sender=Products, dispatch_uid="products_choices_saved")
+@receiver(post_delete, sender=Products, dispatch_uid="products_choices_deleted")
+@receiver(post_save, sender=Employees, dispatch_uid="employees_choices_saved")
+@receiver(post_delete, sender=Employees, dispatch_uid="employees_choices_deleted")
+@receiver(post_save, sender=Shippers, dispatch_uid="shippers_choices_saved")
+@receiver(post_delete, sender=Shippers, dispatch_uid="shippers_choices_deleted")
+@receiver(post_save, sender=Suppliers, dispatch_uid="suppliers_choices_saved")
+@receiver(post_delete, sender=Suppliers, dispatch_uid="suppliers_choices_deleted")
+@receiver(post_save, sender=Categories, dispatch_uid="categories_choices_saved")
+@receiver(post_delete, sender=Categories, dispatch_uid="categories_choices_deleted")
+def reference_row_changed(sender, instance, **kwargs):
+    """The dropdown choices (and their rendered options) over this table are outdated."""
+    choices.invalidate_model(sender)
+
+# endregion Choice sets
+
+
+# region Version stamps
+
+@receiver(post_save, sender=Products, dispatch_uid="products_version_saved")
+@receiver(post_delete, sender=Products, dispatch_uid="products_version_deleted")
+def product_changed(sender, instance, **kwargs):
+    """The product's page, and the customer pages listing products, are outdated."""
+    versioning.bump(versioning.product_key(instance.product_id), versioning.PRODUCTS)
+
+
+@receiver(post_save, sender=Customers, dispatch_uid="customers_version_saved")
+@receiver(post_delete, sender=Customers, dispatch_uid="customers_version_deleted")
+def customer_version_changed(sender, instance, **kwargs):
+    versioning.bump(versioning.customer_key(instance.customer_id))
+
+
+@receiver(post_save, sender=Categories, dispatch_uid="categories_version_saved")
+@receiver(post_delete, sender=Categories, dispatch_uid="categories_version_deleted")
+def category_version_changed(sender, instance, **kwargs):
+    """Also outdates the product table rows of the category's products."""
+    versioning.bump(versioning.category_key(instance.category_id), versioning.REFERENCE)
+
+
+@receiver(post_save, sender=Suppliers, dispatch_uid="suppliers_version_saved")
+@receiver(post_delete, sender=Suppliers, dispatch_uid="suppliers_version_deleted")
+def supplier_version_changed(sender, instance, **kwargs):
+    """Also outdates the product table rows of the supplier's products."""
+    versioning.bump(versioning.supplier_key(instance.supplier_id), versioning.REFERENCE)
+
+
+@receiver(post_save, sender=Shippers, dispatch_uid="shippers_version_saved")
+@receiver(post_delete, sender=Shippers, dispatch_uid="shippers_version_deleted")
+def reference_version_changed(sender, instance, **kwargs):
+    """Shipper names appear on the customer pages."""
+    versioning.bump(versioning.REFERENCE)
+
+
+@receiver(post_save, sender=Employees, dispatch_uid="employees_version_saved")
+@receiver(post_delete, sender=Employees, dispatch_uid="employees_version_deleted")
+def employee_version_changed(sender, instance, **kwargs):
+    """Employee names appear on the customer pages; also outdates the employee's photo."""
+    versioning.bump(versioning.employee_key(instance.employee_id), versioning.REFERENCE)
+
+# endregion Version stamps
+
+
+# region Search result caches
+
+@receiver(post_save, sender=Products, dispatch_uid="products_results_saved")
+@receiver(post_delete, sender=Products, dispatch_uid="products_results_deleted")
+@receiver(post_save, sender=Categories, dispatch_uid="categories_results_saved")
+@receiver(post_delete, sender=Categories, dispatch_uid="categories_results_deleted")
+@receiver(post_save, sender=Suppliers, dispatch_uid="suppliers_results_saved")
+@receiver(post_delete, sender=Suppliers, dispatch_uid="suppliers_results_deleted")
+@receiver(post_save, sender=Customers, dispatch_uid="customers_results_saved")
+@receiver(post_delete, sender=Customers, dispatch_uid="customers_results_deleted")
+def searched_row_changed(sender, instance, **kwargs):
+    """Cached search results over this table may have changed."""
+    resultcache.invalidate_model(sender)
+
+# endregion Search result caches
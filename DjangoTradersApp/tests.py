@@ -1,7 +1,63 @@
-from django.test import TestCase, Client, override_settings
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import SkipTest, mock
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Permission, User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
 from django.urls import reverse
-from .models import Products, Categories, Suppliers
-from .forms import ProductForm
+from django.utils.http import http_date
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction, IntegrityError
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from .models import (Products, Categories, Suppliers, Customers, Employees, Shippers, Orders, OrderDetails,
+                     CustomerSales, ProductSales, EmployeeSales, MonthlySales, ProductSearchDocument, VersionStamp,
+                     deferred_related)
+from .forms import ProductForm, ProductSelectionForm
+from . import (api, bulkupdates, choices, commissions, dashboard, fragments, images, importing, instrumentation, lookups, ordering, pagination,
+               resultcache, rollups, routing, search, versioning, warmup)
+
+
+class UnmanagedModelsMixin:
+    """
+    The Northwind models are managed = False, so the test database is created without their tables.
+    Subclasses list the models they need in unmanaged_models (referenced tables first);
+    the tables are created before the tests run and dropped afterwards.
+    """
+    unmanaged_models = []
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            for model in cls.unmanaged_models:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(cls.unmanaged_models):
+                editor.delete_model(model)
+
+
+class UnmanagedModelsTestCase(UnmanagedModelsMixin, TestCase):
+    pass
 
 
 # These tests focus on form validation logic and don't require database access
@@ -156,3 +212,1606 @@ class ProductURLPatternsTest(TestCase):
         url = reverse('DjTraders.ProductEdit', kwargs={'product_id': '1'})
         self.assertEqual(url, '/DjTraders/Products/1/Edit/')
 
+
+class OrderFixturesTestCase(UnmanagedModelsTestCase):
+    """Creates one customer with two orders: order 1 has two lines, order 2 has none."""
+    unmanaged_models = [Categories, Suppliers, Products, Customers, Employees, Shippers, Orders, OrderDetails]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customers.objects.create(customer_id='ALFKI', company_name='Alfreds Futterkiste')
+        Products.objects.create(product_id=11, product_name='Queso Cabrales', discontinued=0)
+        Products.objects.create(product_id=12, product_name='Queso Manchego', discontinued=0)
+        Orders.objects.create(order_id=1, customer=cls.customer)
+        Orders.objects.create(order_id=2, customer=cls.customer)
+        OrderDetails.objects.create(order_id=1, product_id=11, unit_price=10.0, quantity=2, discount=0)
+        OrderDetails.objects.create(order_id=1, product_id=12, unit_price=20.0, quantity=5, discount=10)
+
+
+class OrderTotalsTest(OrderFixturesTestCase):
+    """Tests for Orders.objects.with_totals() and the order_total property."""
+
+    def test_with_totals_annotations(self):
+        """Test that line count, gross, discount and net totals are computed in SQL."""
+        order = Orders.objects.with_totals().get(order_id=1)
+        self.assertEqual(order.line_count, 2)
+        self.assertAlmostEqual(order.gross_total, 120.0)
+        self.assertAlmostEqual(order.discount_total, 10.0)
+        self.assertAlmostEqual(order.net_total, 110.0)
+
+    def test_with_totals_order_without_lines(self):
+        """Test that an order with no lines gets zero totals instead of None."""
+        order = Orders.objects.with_totals().get(order_id=2)
+        self.assertEqual(order.line_count, 0)
+        self.assertEqual(order.net_total, 0.0)
+
+    def test_order_total_uses_annotation(self):
+        """Test that order_total reads the annotation without running another query."""
+        orders = list(self.customer.get_orders().with_totals())
+        with self.assertNumQueries(0):
+            totals = {order.order_id: order.order_total for order in orders}
+        self.assertAlmostEqual(totals[1], Orders.objects.get(order_id=1).get_order_total())
+
+
+class OrderDetailsRelationsTest(OrderFixturesTestCase):
+    """Tests for the OrderDetails composite primary key and its order/product relations."""
+
+    def test_composite_primary_key(self):
+        """Test that lines of the same order are told apart by (order_id, product_id)."""
+        detail = OrderDetails.objects.get(pk=(1, 12))
+        self.assertEqual(detail.quantity, 5)
+
+    def test_with_related_loads_order_and_product(self):
+        """Test that with_related() reads order and product without extra queries."""
+        details = list(OrderDetails.objects.with_related())
+        with self.assertNumQueries(0):
+            names = sorted(detail.product.product_name for detail in details)
+            customers = {detail.order.customer_id for detail in details}
+        self.assertEqual(names, ['Queso Cabrales', 'Queso Manchego'])
+        self.assertEqual(customers, {'ALFKI'})
+
+    def test_with_lines_prefetches_lines_and_products(self):
+        """Test that with_lines() loads any number of orders and their products in two queries."""
+        with self.assertNumQueries(2):
+            orders = list(Orders.objects.with_lines().order_by('order_id'))
+            lines = [
+                (detail.product.product_name, detail.line_total)
+                for order in orders for detail in order.get_order_details()
+            ]
+        self.assertEqual(len(lines), 2)
+
+    def test_products_lookup_through_order_details(self):
+        """Test that products can be filtered through order_details (used by CustomerDetail)."""
+        orders = Orders.objects.filter(customer=self.customer)
+        products = Products.objects.filter(orderdetails__order__in=orders).distinct()
+        self.assertEqual(products.count(), 2)
+        self.assertEqual(len(self.customer.get_purchase_summary()), 2)
+
+    def test_order_success_page_query_count(self):
+        """Test that the success page renders its lines in a constant number of queries."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('DjTraders.OrderSuccess', kwargs={'order_id': 1}))
+        self.assertContains(response, 'Queso Manchego')
+
+
+class ProductSearchTest(UnmanagedModelsTestCase):
+    """Tests for the product search engine (search.py) and the ProductsListView search."""
+    unmanaged_models = [Categories, Suppliers, Products]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.beverages = Categories.objects.create(category_id=1, category_name='Beverages')
+        cls.supplier = Suppliers.objects.create(supplier_id=1, company_name='Exotic Liquids')
+        Products.objects.create(product_id=1, product_name='Chai', category=cls.beverages,
+                                supplier=cls.supplier, quantity_per_unit='10 boxes x 20 bags', discontinued=0)
+        Products.objects.create(product_id=2, product_name='Chang', category=cls.beverages,
+                                supplier=cls.supplier, quantity_per_unit='24 - 12 oz bottles', discontinued=0)
+        Products.objects.create(product_id=3, product_name='Beverages Sampler', quantity_per_unit='1 box',
+                                discontinued=0)
+
+    def setUp(self):
+        cache.clear()  # cached search results and product rows of other tests
+
+    def test_search_matches_every_document_field(self):
+        """Test that name, category, supplier and quantity per unit are all searchable."""
+        self.assertEqual(search.search_product_ids('chai'), [1])
+        self.assertEqual(sorted(search.search_product_ids('exotic')), [1, 2])
+        self.assertEqual(search.search_product_ids('bottles'), [2])
+
+    def test_search_matches_word_prefixes(self):
+        """Test that partially typed words match."""
+        self.assertEqual(sorted(search.search_product_ids('ch')), [1, 2])
+
+    def test_search_matches_substrings_after_prefixes(self):
+        """Test that terms inside words still match, as with the original icontains filters."""
+        self.assertEqual(search.search_product_ids('hai'), [1])
+        Products.objects.create(product_id=4, product_name='Chai Latte', quantity_per_unit='6 cups', discontinued=0)
+        Products.objects.create(product_id=5, product_name='Masala Chai', quantity_per_unit='hai', discontinued=0)
+        self.assertEqual(search.search_product_ids('hai')[0], 5)
+        self.assertEqual(sorted(search.search_product_ids('hai')), [1, 4, 5])
+
+    def test_migration_builds_missing_documents(self):
+        """Test that the data migration indexes the existing products, so search works right after deploying."""
+        populate = importlib.import_module('DjangoTradersApp.migrations.0009_populate_product_search').populate_documents
+        search.remove_product(2)
+        populate(django_apps, SimpleNamespace(connection=connection))
+        self.assertEqual(search.search_product_ids('chang'), [2])
+        self.assertEqual(ProductSearchDocument.objects.count(), 3)
+
+    def test_search_ranks_name_matches_first(self):
+        """Test that a match in the product name ranks above a match in the category."""
+        self.assertEqual(search.search_product_ids('beverages')[0], 3)
+
+    def test_search_ignores_query_syntax(self):
+        """Test that quotes and operators in the search cannot break the query."""
+        self.assertEqual(search.search_product_ids('"chai" * -'), [1])
+        self.assertEqual(search.search_product_ids('!!'), [])
+
+    def test_product_update_refreshes_document(self):
+        """Test that saving a product (as ProductUpdateView does) updates its search document."""
+        product = Products.objects.get(product_id=2)
+        product.product_name = 'Lager'
+        product.save()
+        self.assertEqual(search.search_product_ids('lager'), [2])
+        self.assertEqual(search.search_product_ids('chang'), [])
+
+    def test_category_rename_refreshes_documents(self):
+        """Test that renaming a category updates the documents of its products."""
+        self.beverages.category_name = 'Drinks'
+        self.beverages.save()
+        self.assertEqual(sorted(search.search_product_ids('drinks')), [1, 2])
+
+    def test_products_list_view_search(self):
+        """Test that the product list shows ranked search results without a COUNT query."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('DjTraders.Products'), {'search': 'exotic'})
+        self.assertContains(response, 'Chai')
+        self.assertNotContains(response, 'Beverages Sampler')
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+
+
+class ReferenceLookupTest(UnmanagedModelsTestCase):
+    """Tests for the cached reference lookups (lookups.py) behind Customers.get_all_countries()."""
+    unmanaged_models = [Customers]
+
+    @classmethod
+    def setUpTestData(cls):
+        Customers.objects.create(customer_id='ALFKI', company_name='Alfreds Futterkiste', country='Germany')
+        Customers.objects.create(customer_id='ANATR', company_name='Ana Trujillo', country='Mexico')
+        Customers.objects.create(customer_id='ANTON', company_name='Antonio Moreno', country='Mexico')
+
+    def setUp(self):
+        lookups.invalidate_all()
+
+    def test_countries_distinct_and_ordered(self):
+        """Test that countries are distinct and keep the original descending order."""
+        self.assertEqual(Customers.get_all_countries(), ['Mexico', 'Germany'])
+
+    def test_cached_hit_runs_no_query(self):
+        """Test that a second call is served from the process tier without any query."""
+        Customers.get_all_countries()
+        with self.assertNumQueries(0):
+            Customers.get_all_countries()
+
+    def test_shared_cache_tier_after_local_expiry(self):
+        """Test that a process-tier miss is filled from the Django cache, not the database."""
+        Customers.get_all_countries()
+        lookups.CUSTOMER_COUNTRIES._local = None
+        with self.assertNumQueries(0):
+            self.assertEqual(Customers.get_all_countries(), ['Mexico', 'Germany'])
+
+    def test_customer_save_invalidates(self):
+        """Test that saving a customer invalidates the cached lists."""
+        Customers.get_all_countries()
+        Customers.objects.create(customer_id='BERGS', company_name='Berglunds snabbkop', country='Sweden')
+        self.assertEqual(Customers.get_all_countries(), ['Sweden', 'Mexico', 'Germany'])
+
+    def test_invalidation_moves_to_a_new_version(self):
+        """Test that invalidating moves the shared tier to a new version, so the older list is no longer read."""
+        Customers.get_all_countries()
+        version = lookups.CUSTOMER_COUNTRIES.version()
+        lookups.invalidate_model(Customers)
+        self.assertGreater(lookups.CUSTOMER_COUNTRIES.version(), version)
+        self.assertIsNone(cache.get(lookups.CUSTOMER_COUNTRIES.entry_key(lookups.CUSTOMER_COUNTRIES.version())))
+
+    def test_other_lookups(self):
+        """Test the lookups for the other customer fields."""
+        Customers.objects.filter(customer_id='ALFKI').update(city='Berlin')
+        lookups.invalidate_model(Customers)
+        self.assertCountEqual(lookups.CUSTOMER_CITIES.get(), [None, 'Berlin'])
+
+
+class OrderPlacementTest(OrderFixturesTestCase):
+    """Tests for the order placement service (ordering.py) and order_confirm."""
+
+    def setUp(self):
+        self.employee = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy')
+        self.shipper = Shippers.objects.create(shipper_id=1, company_name='Speedy Express')
+        self.items = [
+            {'product_id': 11, 'product_name': 'Queso Cabrales', 'unit_price': 21.0, 'quantity': 3, 'discount': 0},
+            {'product_id': 12, 'product_name': 'Queso Manchego', 'unit_price': 38.0, 'quantity': 1, 'discount': 5},
+        ]
+
+    def place(self, items=None):
+        return ordering.place_order(
+            customer=self.customer, employee=self.employee, shipper=self.shipper,
+            items=self.items if items is None else items,
+            required_date=date.today() + timedelta(days=7),
+            shipping={'ship_name': 'Alfreds Futterkiste', 'ship_country': 'Germany'},
+        )
+
+    def test_allocate_order_ids_after_highest_existing(self):
+        """Test that IDs continue after the highest existing order and never repeat."""
+        with transaction.atomic():
+            first = ordering.allocate_order_ids(2)
+            second = ordering.allocate_order_ids(1)
+        self.assertEqual(first, [3, 4])
+        self.assertEqual(second, [5])
+
+    def test_place_order_writes_header_and_lines(self):
+        """Test that the order and all its lines are written with bulk_create."""
+        self.place()  # creates the ID counter
+        with CaptureQueriesContext(connection) as queries:
+            result = self.place()
+        statements = [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        # Counter UPDATE + SELECT, stock SELECT (the products have no stock figure: nothing to reserve),
+        # order INSERT, one INSERT for all lines,
+        # then one UPDATE per rollup row (customer, employee, 2 products) and one version stamp upsert;
+        # the month's rollup row is updated after the commit
+        self.assertEqual(len(statements), 10)
+        order = Orders.objects.with_totals().get(order_id=result.order.order_id)
+        self.assertEqual(order.line_count, 2)
+        self.assertAlmostEqual(order.net_total, result.order_total)
+        self.assertEqual(order.ship_country, 'Germany')
+        self.assertGreaterEqual(result.elapsed_ms, 0)
+
+    def test_failed_placement_leaves_no_order(self):
+        """Test that a failing line rolls back the whole order."""
+        duplicate_lines = self.items + [self.items[0]]
+        with self.assertRaises(IntegrityError):
+            self.place(duplicate_lines)
+        self.assertEqual(Orders.objects.count(), 2)
+
+    def test_order_confirm_places_order(self):
+        """Test the confirm step of the order wizard."""
+        session = self.client.session
+        session['order_data'] = {
+            'customer_id': 'ALFKI',
+            'products': self.items,
+            'order_details': {
+                'employee_id': 1, 'shipper_id': 1,
+                'required_date': (date.today() + timedelta(days=7)).isoformat(),
+                'ship_name': 'Alfreds Futterkiste', 'ship_address': 'Obere Str. 57', 'ship_city': 'Berlin',
+                'ship_region': '', 'ship_postal_code': '12209', 'ship_country': 'Germany',
+            },
+        }
+        session.save()
+        response = self.client.post(reverse('DjTraders.OrderConfirm'), {'action': 'confirm'})
+        self.assertRedirects(response, reverse('DjTraders.OrderSuccess', kwargs={'order_id': 3}))
+        self.assertEqual(OrderDetails.objects.filter(order_id=3).count(), 2)
+
+
+class OrderImportTest(OrderFixturesTestCase):
+    """Tests for the streaming order import (importing.py and manage.py import_orders)."""
+
+    def import_file(self, suffix, content, *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        output = io.StringIO()
+        call_command('import_orders', handle.name, *args, stdout=output)
+        return output.getvalue()
+
+    def test_import_jsonl_with_rejects(self):
+        """Test that valid orders are imported and invalid ones are reported, not imported."""
+        Products.objects.filter(product_id=11).update(unit_price=21.0)
+        records = [
+            {'customer_id': 'ALFKI', 'order_date': '2025-01-31',
+             'lines': [{'product_id': 11, 'quantity': 2}, {'product_id': 12, 'quantity': 1, 'unit_price': 30, 'discount': 10}]},
+            {'customer_id': 'NOBODY', 'lines': [{'product_id': 11, 'quantity': 1}]},
+            {'customer_id': 'ALFKI', 'lines': [{'product_id': 99, 'quantity': 1}]},
+        ]
+        content = '\n'.join(json.dumps(record) for record in records) + '\n{not json\n'
+        output = self.import_file('.jsonl', content, '--batch-size', '2')
+
+        self.assertIn('Imported 1 orders / 2 lines', output)
+        self.assertIn("record 2: unknown customer_id 'NOBODY'", output)
+        self.assertIn('record 3: line 1: unknown product_id 99', output)
+        self.assertIn('record 4: invalid JSON', output)
+        order = Orders.objects.with_totals().get(order_id=3)
+        self.assertEqual(order.line_count, 2)
+        # The line without unit_price is priced from the product
+        self.assertAlmostEqual(order.gross_total, 2 * 21.0 + 30.0)
+
+    def test_malformed_records_are_rejected_without_aborting(self):
+        """Test that JSON values that are not orders, non-list lines and out-of-range quantities are rejected."""
+        content = '\n'.join([
+            '[1, 2]',
+            '"x"',
+            json.dumps({'customer_id': 'ALFKI', 'lines': 5}),
+            json.dumps({'customer_id': 'ALFKI', 'lines': [{'product_id': 11, 'quantity': 40000, 'unit_price': 1}]}),
+            json.dumps({'customer_id': 'ALFKI', 'lines': [{'product_id': 11, 'quantity': 1, 'unit_price': 1}]}),
+        ]) + '\n'
+        output = self.import_file('.jsonl', content, '--batch-size', '2')
+
+        self.assertIn('Imported 1 orders / 1 lines', output)
+        self.assertIn('record 1: record is not a JSON object: list', output)
+        self.assertIn('record 2: record is not a JSON object: str', output)
+        self.assertIn('record 3: lines is not a list', output)
+        self.assertIn('record 4: line 1: quantity must be at most 32767', output)
+
+    def test_import_csv_groups_rows_by_order_ref(self):
+        """Test that consecutive CSV rows with the same order_ref become one order."""
+        content = (
+            'order_ref,customer_id,order_date,product_id,quantity,unit_price,discount\n'
+            'A,ALFKI,2025-02-01,11,1,10,0\n'
+            'A,ALFKI,2025-02-01,12,2,20,0\n'
+            'B,ALFKI,2025-02-02,12,5,20,50\n'
+        )
+        output = self.import_file('.csv', content)
+        self.assertIn('Imported 2 orders / 3 lines', output)
+        totals = {order.order_id: order.net_total for order in Orders.objects.with_totals().filter(order_id__gt=2)}
+        self.assertEqual(totals, {3: 50.0, 4: 50.0})
+
+    def test_chunk_uses_one_lookup_per_reference_table(self):
+        """Test that a chunk of orders is validated with one query per reference table."""
+        records = [(n, {'customer_id': 'ALFKI', 'lines': [{'product_id': 12, 'quantity': 1, 'unit_price': 5}]})
+                   for n in range(1, 51)]
+        importer = importing.OrderImporter(batch_size=50)
+        with CaptureQueriesContext(connection) as queries:
+            importer.import_records(iter(records))
+        selects = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(importer.stats.orders, 50)
+        # customers, employees, shippers, products, plus the order ID counter
+        self.assertLessEqual(len(selects), 6)
+
+
+class ChoiceSetTest(OrderFixturesTestCase):
+    """Tests for the cached dropdown choices (choices.py) of the order wizard and product forms."""
+
+    def setUp(self):
+        choices.invalidate_all()
+
+    def test_step_two_warm_cache_runs_no_product_query(self):
+        """Test that the product dropdown of wizard step 2 is rendered from the cache."""
+        url = reverse('DjTraders.OrderCreateForCustomer', kwargs={'customer_id': 'ALFKI'})
+        self.client.get(url)  # warms the cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if '"products"' in q['sql']])
+        self.assertContains(response, '<option value="11">Queso Cabrales - $0.00</option>', html=True)
+
+    def test_write_invalidates_choice_set(self):
+        """Test that saving a product moves its choice set to a new version."""
+        version = choices.ORDERABLE_PRODUCTS.version()
+        self.assertNotIn('Tofu', str(ProductSelectionForm()['product']))
+        Products.objects.create(product_id=14, product_name='Tofu', unit_price=23.25, discontinued=0)
+        self.assertGreater(choices.ORDERABLE_PRODUCTS.version(), version)
+        self.assertIn('Tofu - $23.25', str(ProductSelectionForm()['product']))
+
+    def test_rendering_marks_selected_and_escapes(self):
+        """Test that the selected value is marked and labels are escaped."""
+        Categories.objects.create(category_id=1, category_name='Dairy & <Cheese>')
+        product = Products.objects.create(product_id=15, product_name='Brie', category_id=1, discontinued=0)
+        html = str(ProductForm(instance=product)['category'])
+        self.assertIn('<option value="1" selected>Dairy &amp; &lt;Cheese&gt;</option>', html)
+        self.assertIn('<option value="">-- Select a Category --</option>', html)
+        self.assertIn('<option value="" selected>-- Select a Supplier --</option>', str(ProductForm()['supplier']))
+
+
+class SalesRollupTest(OrderFixturesTestCase):
+    """Tests for the sales rollup tables (rollups.py and manage.py rebuild_rollups)."""
+
+    def setUp(self):
+        Orders.objects.filter(order_id=1).update(order_date=date(2025, 3, 14))
+        self.employee = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy')
+        self.shipper = Shippers.objects.create(shipper_id=1, company_name='Speedy Express')
+
+    def snapshot(self):
+        return {
+            model.__name__: sorted((row.pk, round(row.revenue, 6), row.units, row.order_count)
+                                   for row in model.objects.all())
+            for model in (CustomerSales, ProductSales, EmployeeSales, MonthlySales)
+        }
+
+    def test_rebuild_from_orders(self):
+        """Test that the rebuild sums the existing orders set-based."""
+        written = rollups.rebuild()
+        self.assertEqual(written['customer_sales'], 1)
+        customer = CustomerSales.objects.get(customer_id='ALFKI')
+        self.assertAlmostEqual(customer.revenue, 110.0)
+        self.assertEqual((customer.units, customer.order_count), (7, 1))
+        self.assertEqual(ProductSales.objects.get(product_id=12).units, 5)
+        self.assertEqual(MonthlySales.objects.get().month, date(2025, 3, 1))
+
+    def test_incremental_updates_match_rebuild(self):
+        """Test that placing orders updates the rollups exactly as a full rebuild would."""
+        rollups.rebuild()
+        items = [
+            {'product_id': 11, 'unit_price': 21.0, 'quantity': 3, 'discount': 0},
+            {'product_id': 12, 'unit_price': 38.0, 'quantity': 1, 'discount': 5},
+        ]
+        for order_date in (date(2025, 3, 20), date(2025, 4, 2)):
+            with self.captureOnCommitCallbacks(execute=True):
+                ordering.place_order(self.customer, self.employee, self.shipper, items,
+                                     required_date=order_date, order_date=order_date)
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(CustomerSales.objects.get(customer_id='ALFKI').order_count, 3)
+
+    def test_detail_pages_read_rollups(self):
+        """Test that the customer and product pages show the rollup totals."""
+        rollups.rebuild()
+        response = self.client.get(reverse('DjTraders.CustomerDetail', kwargs={'customer_id': 'ALFKI'}))
+        self.assertEqual(response.context['orders_count'], 2)
+        self.assertContains(response, '$110.00')
+        response = self.client.get(reverse('DjTraders.ProductDetail', kwargs={'product_id': 12}))
+        self.assertContains(response, '5 in 1 order')
+
+    def test_rebuild_rollups_command(self):
+        """Test the rebuild_rollups management command."""
+        output = io.StringIO()
+        call_command('rebuild_rollups', stdout=output)
+        self.assertIn('product_sales: 2 rows', output.getvalue())
+
+    def test_migration_fills_the_rollups(self):
+        """Test that the data migration builds the rollups as rebuild() does, so the next placed order is added to full totals."""
+        populate = importlib.import_module('DjangoTradersApp.migrations.0010_populate_sales_rollups').populate_rollups
+        populate(django_apps, SimpleNamespace(connection=connection))
+        filled = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(filled, self.snapshot())
+        ordering.place_order(self.customer, self.employee, self.shipper,
+                             [{'product_id': 11, 'unit_price': 10.0, 'quantity': 1, 'discount': 0}],
+                             required_date=date.today() + timedelta(days=7))
+        customer = CustomerSales.objects.get(customer_id='ALFKI')
+        self.assertAlmostEqual(customer.revenue, 120.0)
+        self.assertEqual(customer.order_count, 2)
+
+    def test_function_based_customer_detail_shows_revenue(self):
+        response = self.client.get(reverse('CustomerDetail', kwargs={'customer_id': 'ALFKI'}))
+        self.assertEqual(response.context['orders_count'], 2)
+        self.assertAlmostEqual(response.context['revenue'], 110.0)
+        self.assertContains(response, '$110.00')
+
+
+class ExportTest(OrderFixturesTestCase):
+    """Tests for the streaming exports (exports.py, the export view and manage.py export)."""
+
+    def get_export(self, dataset, **params):
+        response = self.client.get(reverse('DjTraders.Export', kwargs={'dataset': dataset}), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_customers_csv_without_password(self):
+        """Test the customers CSV export and that passwords are never exported."""
+        Customers.objects.filter(customer_id='ALFKI').update(password='secret')
+        response, content = self.get_export('customers')
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows[0][0], 'customer_id')
+        self.assertNotIn('password', rows[0])
+        self.assertEqual(rows[1][:2], ['ALFKI', 'Alfreds Futterkiste'])
+        self.assertNotIn(b'secret', content)
+
+    def test_orders_jsonl_with_totals(self):
+        """Test that the orders export includes the SQL-computed totals."""
+        response, content = self.get_export('orders', format='jsonl')
+        orders = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([order['order_id'] for order in orders], [1, 2])
+        self.assertEqual(orders[0]['line_count'], 2)
+        self.assertAlmostEqual(orders[0]['net_total'], 110.0)
+
+    def test_order_lines_gzip(self):
+        """Test the gzip-compressed order lines export."""
+        response, content = self.get_export('order_lines', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = list(csv.reader(io.StringIO(gzip.decompress(content).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertAlmostEqual(float(rows[2][5]), 90.0)
+
+    def test_unknown_dataset_and_format(self):
+        """Test that unknown datasets are 404 and unknown formats are rejected."""
+        self.assertEqual(self.client.get(reverse('DjTraders.Export', kwargs={'dataset': 'x'})).status_code, 404)
+        response = self.client.get(reverse('DjTraders.Export', kwargs={'dataset': 'orders'}), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command_writes_file(self):
+        """Test that manage.py export writes the dataset to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.jsonl')
+            call_command('export', 'orders', '--format', 'jsonl', '--output', path, stderr=io.StringIO())
+            with open(path) as handle:
+                self.assertEqual(len(handle.readlines()), 2)
+
+
+class KeysetPaginationTest(UnmanagedModelsTestCase):
+    """Tests for keyset (cursor) pagination (pagination.py) in CustomerListView."""
+    unmanaged_models = [Customers]
+
+    @classmethod
+    def setUpTestData(cls):
+        # Duplicate company names make sure ties are broken by customer_id.
+        for number in range(25):
+            Customers.objects.create(customer_id=f'C{number:04d}', company_name=f'Company {number // 2:02d}')
+
+    def walk(self, paginator):
+        page = paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_pages_cover_all_rows_in_order(self):
+        """Test that walking forward returns every row once, in (company_name, customer_id) order."""
+        paginator = pagination.KeysetPaginator(Customers.objects.all(), 10, 'company_name')
+        pages = self.walk(paginator)
+        ids = [customer.customer_id for page in pages for customer in page]
+        expected = list(Customers.objects.order_by('company_name', 'customer_id').values_list('customer_id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+        self.assertFalse(pages[0].has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Test that going back from a page returns exactly the previous page."""
+        paginator = pagination.KeysetPaginator(Customers.objects.all(), 10, 'company_name')
+        pages = self.walk(paginator)
+        back = paginator.page(pages[2].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        self.assertEqual(back.number, 2)
+        self.assertTrue(back.has_next())
+
+    def test_page_makes_no_count_query(self):
+        """Test that a keyset page is a single query, without COUNT(*)."""
+        paginator = pagination.KeysetPaginator(Customers.objects.all(), 10, 'company_name')
+        first = paginator.page()
+        with self.assertNumQueries(1):
+            list(paginator.page(first.next_cursor))
+
+    def test_customer_list_view_cursor_mode(self):
+        """Test that the customer list uses cursors when asked and rejects malformed cursors."""
+        response = self.client.get(reverse('DjTraders.Customers'), {'paging': 'keyset'})
+        self.assertTrue(response.context['page_obj'].is_keyset)
+        self.assertContains(response, 'cursor=' + response.context['page_obj'].next_cursor)
+        response = self.client.get(reverse('DjTraders.Customers'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+        # A position without the company_name value of its row.
+        response = self.client.get(reverse('DjTraders.Customers'),
+                                   {'cursor': pagination.encode_cursor({'d': 'next', 'k': 'C0001', 'n': 1})})
+        self.assertEqual(response.status_code, 404)
+
+    def test_customer_list_view_offset_mode_by_default(self):
+        """Test that the existing page-number pagination still works."""
+        response = self.client.get(reverse('DjTraders.Customers'), {'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertFalse(getattr(response.context['page_obj'], 'is_keyset', False))
+
+
+class SQLInstrumentationTest(OrderFixturesTestCase):
+    """Tests for the per-request SQL instrumentation middleware (instrumentation.py)."""
+
+    def test_fingerprint_ignores_values(self):
+        """Test that statements differing only in their values share a fingerprint."""
+        self.assertEqual(
+            instrumentation.fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x' AND k IN (%s, %s)"),
+            instrumentation.fingerprint("SELECT *  FROM t WHERE id = 7 AND name = 'it''s' AND k IN (%s, %s, %s)"),
+        )
+
+    def test_server_timing_header(self):
+        """Test that responses carry the query count and database time."""
+        response = self.client.get(reverse('DjTraders.CustomerOrders', kwargs={'customer_id': 'ALFKI'}))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('total;dur=', header)
+
+    def test_duplicates_and_budget_warning(self):
+        """Test that repeated statements are reported and an exceeded budget logs a warning."""
+        recorder = instrumentation.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for order_id in (1, 2, 1):
+                Orders.objects.get(order_id=order_id)
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.duplicate_count(), 2)
+
+        with override_settings(QUERY_BUDGETS={'DjTraders.CustomerOrders': 0}):
+            with self.assertLogs('DjangoTradersApp.instrumentation', 'WARNING') as logs:
+                self.client.get(reverse('DjTraders.CustomerOrders', kwargs={'customer_id': 'ALFKI'}))
+        self.assertIn('DjTraders.CustomerOrders ran', logs.output[0])
+        self.assertEqual(logs.records[0].sql['url_name'], 'DjTraders.CustomerOrders')
+
+
+class AsyncReadViewsTest(OrderFixturesTestCase):
+    """Tests for the async read views (views.py, "Async read views")."""
+
+    def setUp(self):
+        cache.clear()
+        Shippers.objects.create(shipper_id=1, company_name='Speedy Express')
+        Orders.objects.filter(order_id=1).update(ship_via_id=1)
+        rollups.rebuild()
+
+    def test_customer_detail_matches_sync_view(self):
+        """Test that the async customer page shows the same data as the sync one."""
+        sync = self.client.get(reverse('DjTraders.CustomerDetail', kwargs={'customer_id': 'ALFKI'}))
+        response = self.client.get(reverse('DjTraders.Async.CustomerDetail', kwargs={'customer_id': 'ALFKI'}))
+        for key in ('orders_count', 'revenue', 'products_count'):
+            self.assertEqual(response.context[key], sync.context[key])
+        self.assertEqual([order.order_id for order in response.context['orders']],
+                         [order.order_id for order in sync.context['orders']])
+        self.assertContains(response, 'Speedy Express')
+        self.assertContains(response, '$110.00')
+
+    def test_lists_paginate_like_list_views(self):
+        """Test the page object and invalid pages of the async lists."""
+        response = self.client.get(reverse('DjTraders.Async.Products'))
+        self.assertEqual([p.product_id for p in response.context['products']], [11, 12])
+        self.assertEqual(response.context['paginator'].count, 2)
+        self.assertEqual(self.client.get(reverse('DjTraders.Async.Products'), {'page': 'last'}).status_code, 200)
+        self.assertEqual(self.client.get(reverse('DjTraders.Async.Products'), {'page': 3}).status_code, 404)
+        response = self.client.get(reverse('DjTraders.Async.Customers'), {'customer': 'alfreds'})
+        self.assertEqual([c.customer_id for c in response.context['customers']], ['ALFKI'])
+
+    def test_missing_objects_are_404(self):
+        self.assertEqual(self.client.get(reverse('DjTraders.Async.ProductDetail', kwargs={'product_id': 99})).status_code, 404)
+        self.assertEqual(self.client.get(reverse('DjTraders.Async.CustomerOrders', kwargs={'customer_id': 'NONE'})).status_code, 404)
+
+    async def test_async_client_runs_async_middleware(self):
+        """Test the async request path, including the instrumentation middleware's async mode."""
+        response = await self.async_client.get(
+            reverse('DjTraders.Async.CustomerOrders', kwargs={'customer_id': 'ALFKI'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="2 queries"')
+        response = await self.async_client.get(reverse('DjTraders.Async.ProductDetail', kwargs={'product_id': 12}))
+        self.assertContains(response, '5 in 1 order')
+
+
+class ConditionalGetTest(OrderFixturesTestCase):
+    """Tests for the ETag / Last-Modified handling of the product and customer pages (versioning.py)."""
+
+    def get(self, name, kwargs, **headers):
+        return self.client.get(reverse(name, kwargs=kwargs), headers=headers)
+
+    def test_unchanged_pages_are_304_after_one_query(self):
+        """Test that a matching If-None-Match is answered from the version stamps alone."""
+        for name, kwargs in [('DjTraders.ProductDetail', {'product_id': 11}),
+                             ('DjTraders.CustomerDetail', {'customer_id': 'ALFKI'}),
+                             ('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'})]:
+            response = self.get(name, kwargs)
+            self.assertEqual(response.status_code, 200)
+            with self.assertNumQueries(1):
+                response = self.get(name, kwargs, if_none_match=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        """Test that product, reference data and order writes bump the stamps of the pages showing them."""
+        product = self.get('DjTraders.ProductDetail', {'product_id': 11})['ETag']
+        customer = self.get('DjTraders.CustomerDetail', {'customer_id': 'ALFKI'})['ETag']
+        orders = self.get('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'})['ETag']
+
+        Products.objects.get(pk=12).save()  # another product: only customer pages list it
+        self.assertEqual(self.get('DjTraders.ProductDetail', {'product_id': 11}, if_none_match=product).status_code, 304)
+        self.assertEqual(self.get('DjTraders.CustomerDetail', {'customer_id': 'ALFKI'}, if_none_match=customer).status_code, 200)
+
+        shipper = Shippers.objects.create(shipper_id=1, company_name='Speedy Express')
+        employee = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy')
+        self.assertEqual(self.get('DjTraders.ProductDetail', {'product_id': 11}, if_none_match=product).status_code, 200)
+        self.assertEqual(self.get('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'}, if_none_match=orders).status_code, 304)
+
+        ordering.place_order(customer=self.customer, employee=employee, shipper=shipper,
+                             items=[{'product_id': 11, 'unit_price': 2.0, 'quantity': 1, 'discount': 0}],
+                             required_date=date.today())
+        self.assertEqual(self.get('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'}, if_none_match=orders).status_code, 200)
+
+    def test_new_day_and_release_change_the_etag(self):
+        """Test that 304s stop when the page's date or the deployed release changes, though no stamp did."""
+        url = ('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'})
+        with override_settings(RELEASE_ID='r1'):
+            etag = self.get(*url)['ETag']
+            self.assertEqual(self.get(*url, if_none_match=etag).status_code, 304)
+            with mock.patch.object(versioning, 'page_date', return_value=date.today() + timedelta(days=1)):
+                response = self.get(*url, if_none_match=etag)
+            self.assertEqual(response.status_code, 200)
+        with override_settings(RELEASE_ID='r2'):
+            self.assertEqual(self.get(*url, if_none_match=etag).status_code, 200)
+
+    def test_last_modified_is_not_before_today(self):
+        """Test that If-Modified-Since from yesterday does not keep yesterday's date on the page."""
+        with mock.patch.object(versioning, 'page_date', return_value=date.today() + timedelta(days=1)):
+            response = self.get('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'},
+                                if_modified_since=http_date(time.time()))
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        versioning.bump(versioning.customer_key('ALFKI'))
+        response = self.get('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'})
+        self.assertEqual(response['Last-Modified'],
+                         http_date(VersionStamp.objects.get(key='customer:ALFKI').modified.timestamp()))
+        response = self.get('DjTraders.CustomerOrders', {'customer_id': 'ALFKI'},
+                            if_modified_since=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+
+class ProductRowCacheTest(UnmanagedModelsTestCase):
+    """Tests for the cached product table rows of the product list (fragments.py)."""
+    unmanaged_models = [Categories, Suppliers, Products]
+
+    @classmethod
+    def setUpTestData(cls):
+        Categories.objects.create(category_id=1, category_name='Beverages')
+        Categories.objects.create(category_id=2, category_name='Condiments')
+        Suppliers.objects.create(supplier_id=1, company_name='Exotic Liquids')
+        Products.objects.create(product_id=1, product_name='Chai', category_id=1, supplier_id=1, discontinued=0)
+        Products.objects.create(product_id=2, product_name='Aniseed Syrup', category_id=2, supplier_id=1, discontinued=0)
+        Products.objects.create(product_id=3, product_name='Chef Anton', category_id=2, discontinued=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def row_keys(self):
+        return {product.product_id: fragments.row_key(product)
+                for product in fragments.with_row_versions(Products.objects.all())}
+
+    def test_warm_page_reads_only_ids(self):
+        """Test that a page whose rows are cached runs the count and the ID query only."""
+        cold = self.client.get(reverse('DjTraders.Products'))
+        self.assertContains(cold, '<td>Condiments</td>', count=2)
+        self.assertContains(cold, '<td>Exotic Liquids</td>', count=2)
+        self.assertContains(cold, 'Discontinued', count=1)
+        with self.assertNumQueries(2):
+            warm = self.client.get(reverse('DjTraders.Products'))
+        self.assertEqual(warm.content, cold.content)
+
+    def test_writes_change_only_affected_row_keys(self):
+        """Test that product, category and supplier writes re-render exactly the rows showing them."""
+        before = self.row_keys()
+        category = Categories.objects.get(pk=2)
+        category.category_name = 'Sauces'
+        category.save()
+        after = self.row_keys()
+        self.assertEqual(before[1], after[1])
+        self.assertNotEqual(before[2], after[2])
+        self.assertNotEqual(before[3], after[3])
+
+        Products.objects.get(pk=1).save()
+        self.assertNotEqual(self.row_keys()[1], after[1])
+        self.assertEqual(self.row_keys()[3], after[3])
+
+        Suppliers.objects.get(pk=1).save()
+        self.assertEqual(self.row_keys()[3], after[3])  # no supplier
+
+    def test_updated_rows_are_rendered_again(self):
+        self.client.get(reverse('DjTraders.Products'))
+        product = Products.objects.get(pk=2)
+        product.product_name = 'Aniseed Syrup Deluxe'
+        product.save()
+        with self.assertNumQueries(3):  # count, IDs, and the one changed product
+            response = self.client.get(reverse('DjTraders.Products'))
+        self.assertContains(response, 'Aniseed Syrup Deluxe')
+        self.assertContains(response, 'Chai')
+
+
+class SearchResultCacheTest(UnmanagedModelsTestCase):
+    """Tests for the search result caches (resultcache.py) behind the product and customer list searches."""
+    unmanaged_models = [Categories, Suppliers, Products, Customers]
+
+    @classmethod
+    def setUpTestData(cls):
+        Products.objects.create(product_id=1, product_name='Chai', discontinued=0)
+        Products.objects.create(product_id=2, product_name='Chang', discontinued=0)
+        for index in range(12):
+            Customers.objects.create(customer_id=f'C{index:02}', company_name=f'Company {index:02}',
+                                     contact_title='Owner' if index % 2 else 'Sales Agent', country='Germany')
+
+    def setUp(self):
+        cache.clear()
+        resultcache.invalidate_all()
+        for result_cache in resultcache.REGISTRY:
+            result_cache.hits = result_cache.misses = result_cache.evictions = 0
+
+    def test_pages_of_a_search_share_one_result(self):
+        """Test that every page and spelling of a search is served from one cached primary-key list."""
+        url = reverse('DjTraders.Customers')
+        first = self.client.get(url, {'country': 'germany', 'title': 'Owner'})
+        self.assertEqual([c.customer_id for c in first.context['customers']],
+                         ['C01', 'C03', 'C05', 'C07', 'C09', 'C11'])
+        with self.assertNumQueries(1):  # only the page's customers (the country list is cached too)
+            second = self.client.get(url, {'country': 'GERMANY', 'title': 'owner', 'page': 1, 'customer': ''})
+        self.assertEqual(list(second.context['customers']), list(first.context['customers']))
+        self.assertEqual(resultcache.CUSTOMER_SEARCHES.stats()['hits'], 1)
+        self.assertEqual(resultcache.CUSTOMER_SEARCHES.stats()['misses'], 1)
+
+        response = self.client.get(url, {'title': 'agent'})
+        self.assertEqual(response.context['paginator'].count, 6)
+        self.assertEqual(self.client.get(reverse('DjTraders.Async.Customers'), {'title': 'agent'}).context['paginator'].count, 6)
+        self.assertEqual(resultcache.CUSTOMER_SEARCHES.stats()['hits'], 2)
+
+    def test_writes_invalidate_results(self):
+        self.assertEqual(search.cached_search_product_ids('Chai!'), [1])
+        self.assertEqual(search.cached_search_product_ids('chai'), [1])
+        Products.objects.create(product_id=3, product_name='Chai Latte', discontinued=0)
+        self.assertEqual(sorted(search.cached_search_product_ids('chai')), [1, 3])
+        self.assertEqual(resultcache.PRODUCT_SEARCHES.stats()['hits'], 1)
+
+        self.client.get(reverse('DjTraders.Customers'), {'customer': 'company 1'})
+        Customers.objects.create(customer_id='C99', company_name='Company 19')
+        response = self.client.get(reverse('DjTraders.Customers'), {'customer': 'company 1'})
+        self.assertEqual(response.context['paginator'].count, 3)
+
+    @override_settings(SEARCH_RESULT_CACHE_SIZE=2)
+    def test_least_recently_used_results_are_evicted(self):
+        for term in ('chai', 'chang', 'chai', 'c'):
+            search.cached_search_product_ids(term)
+        stats = resultcache.PRODUCT_SEARCHES.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses'], stats['evictions']), (2, 1, 3, 1))
+        search.cached_search_product_ids('chai')  # kept: used more recently than 'chang'
+        self.assertEqual(resultcache.PRODUCT_SEARCHES.stats()['hits'], 2)
+
+        response = self.client.get(reverse('DjTraders.SearchCacheStats'))
+        self.assertEqual(response.json()['caches'][0]['name'], 'product_search')
+        self.assertEqual(response.json()['caches'][0]['hit_rate'], 0.4)
+
+
+@override_settings(
+    DATABASE_ROUTERS=['DjangoTradersApp.routing.PrimaryReplicaRouter'],
+    DATABASE_PRIMARY='routing_primary',
+    DATABASE_REPLICAS=['routing_replica'],
+)
+class PrimaryReplicaRoutingTest(SimpleTestCase):
+    """
+    Two SQLite files stand in for the primary and a replica. They are not replicated, so each holds
+    a differently named shipper 1 and the name read shows which database a read went to.
+    """
+    aliases = ('routing_primary', 'routing_replica')
+
+    @classmethod
+    def setUpClass(cls):
+        # Added here rather than in settings, and only then listed in databases: the test runner checks
+        # the databases of all test classes before any test runs.
+        cls.directory = tempfile.TemporaryDirectory()
+        for alias in cls.aliases:
+            path = os.path.join(cls.directory.name, f'{alias}.sqlite3')
+            configured = connections.configure_settings({
+                DEFAULT_DB_ALIAS: {}, alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}})
+            connections.settings[alias] = configured[alias]
+            with connections[alias].schema_editor() as editor:
+                editor.create_model(Shippers)
+            Shippers.objects.using(alias).create(shipper_id=1, company_name=alias)
+        cls.databases = set(cls.aliases)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.aliases:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.directory.cleanup()
+
+    def setUp(self):
+        # A fresh pin state per test, as a request has.
+        self.enterContext(routing.pin_scope())
+
+    def read(self):
+        return Shippers.objects.get(pk=1).company_name
+
+    def request(self, method='get', cookies=None):
+        """Runs a view through PrimaryPinningMiddleware; the view reads, renames shipper 1 on POST, and reads again."""
+        reads = []
+
+        def view(request):
+            reads.append(self.read())
+            if request.method == 'POST':
+                Shippers.objects.filter(pk=1).update(company_name='renamed')
+                reads.append(self.read())
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = routing.PrimaryPinningMiddleware(view)(request)
+        return reads, response
+
+    def test_reads_use_replica_and_writes_use_primary(self):
+        self.assertEqual(self.read(), 'routing_replica')
+        Shippers.objects.filter(pk=1).update(phone='written')
+        self.assertEqual(Shippers.objects.using('routing_primary').get(pk=1).phone, 'written')
+        self.assertIsNone(Shippers.objects.using('routing_replica').get(pk=1).phone)
+
+    def test_reads_after_write_are_pinned_for_the_request_and_session(self):
+        reads, response = self.request()
+        self.assertEqual(reads, ['routing_replica'])
+        self.assertNotIn(routing.PIN_COOKIE, response.cookies)
+
+        reads, response = self.request('post')
+        self.assertEqual(reads, ['routing_primary', 'renamed'])
+        self.assertEqual(response.cookies[routing.PIN_COOKIE]['max-age'], 5)
+        Shippers.objects.using('routing_primary').filter(pk=1).update(company_name='routing_primary')
+
+        # The next request of the same client still reads its write; other clients use the replica.
+        self.assertEqual(self.request(cookies={routing.PIN_COOKIE: '1'})[0], ['routing_primary'])
+        self.assertEqual(self.request()[0], ['routing_replica'])
+
+    def test_write_pins_the_rest_of_a_get_request(self):
+        def view(request):
+            reads = [self.read()]
+            Shippers.objects.filter(pk=1).update(phone='written')
+            reads.append(self.read())
+            return HttpResponse(','.join(reads))
+
+        response = routing.PrimaryPinningMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'routing_replica,routing_primary')
+        self.assertIn(routing.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.read(), 'routing_replica')  # the pin ended with the request
+
+    def test_transactions_on_primary_read_from_primary(self):
+        with transaction.atomic(using='routing_primary'):
+            self.assertEqual(self.read(), 'routing_primary')
+        with routing.pin_scope(pinned=True):
+            self.assertEqual(self.read(), 'routing_primary')
+        self.assertEqual(self.read(), 'routing_replica')
+
+    def test_replica_policies(self):
+        round_robin = routing.RoundRobin()
+        self.assertEqual([round_robin.choose(['a', 'b']) for _ in range(4)], ['a', 'b', 'a', 'b'])
+
+        least_latency = routing.LeastLatency()
+        self.assertEqual(least_latency.choose(['routing_replica']), 'routing_replica')
+        self.assertIsNotNone(least_latency.latencies['routing_replica'])
+        least_latency.latencies = {'a': 0.005, 'b': 0.001, 'c': None}
+        self.assertEqual(least_latency.choose(['a', 'b', 'c']), 'b')
+        least_latency.record('b', None)  # unreachable at the last probe
+        self.assertEqual(least_latency.choose(['a', 'b', 'c']), 'a')
+        least_latency.latencies = {'a': None}
+        self.assertIsNone(least_latency.choose(['a']))
+
+    def test_without_replicas_routing_is_left_to_django(self):
+        router = routing.PrimaryReplicaRouter()
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertIsNone(router.db_for_read(Shippers))
+            self.assertIsNone(router.db_for_write(Shippers))
+        self.assertFalse(router.allow_migrate('routing_replica', 'DjangoTradersApp'))
+        self.assertEqual(router.db_for_read(Session), 'routing_primary')
+
+
+class WarmupTest(OrderFixturesTestCase):
+    def test_templates_are_compiled_into_the_cached_loader(self):
+        names = warmup.template_names()
+        self.assertIn('base.html', names)
+        self.assertIn('DjangoTradersApp/Products/row.html', names)
+
+        self.assertEqual(warmup.compile_templates(), len(names))
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIsInstance(loader, CachedLoader)
+        self.assertIn('DjangoTradersApp/Products/row.html', loader.get_template_cache)
+
+    def test_named_urls_are_resolved(self):
+        names = dict(warmup.named_patterns())
+        self.assertIn('DjTraders.ProductDetail', names)
+        self.assertEqual(warmup.sample_kwargs(names['DjTraders.ProductDetail']), {'product_id': 'warmup'})
+        self.assertGreater(warmup.resolve_urls(), 20)
+
+    def test_caches_are_primed(self):
+        lookups.invalidate_all()
+        self.assertEqual(warmup.prime_caches(), len(lookups.REGISTRY) + len(choices.REGISTRY))
+        with self.assertNumQueries(0):
+            for lookup in lookups.REGISTRY:
+                lookup.get()
+
+    def test_startup_hooks_skip_other_management_commands(self):
+        with mock.patch.object(sys, 'argv', ['manage.py', 'migrate']):
+            self.assertFalse(warmup.server_process())
+        with mock.patch.object(sys, 'argv', ['manage.py', 'runserver']):
+            self.assertTrue(warmup.server_process())
+        with mock.patch.object(sys, 'argv', ['gunicorn', 'DjangoProject.wsgi']):
+            self.assertTrue(warmup.server_process())
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('warmup', stdout=output)
+        self.assertIn('Templates:', output.getvalue())
+        self.assertIn('Warm-up finished', output.getvalue())
+
+
+class ProductsApiTest(UnmanagedModelsTestCase):
+    """Tests for the read-only JSON products API (api.py)."""
+    unmanaged_models = [Categories, Suppliers, Products]
+
+    @classmethod
+    def setUpTestData(cls):
+        beverages = Categories.objects.create(category_id=1, category_name='Beverages')
+        supplier = Suppliers.objects.create(supplier_id=1, company_name='Exotic Liquids')
+        for product_id in range(1, 8):
+            Products.objects.create(product_id=product_id, product_name=f'Product {product_id}', unit_price=product_id,
+                                    category=beverages, supplier=supplier, discontinued=0)
+
+    def get(self, **params):
+        return self.client.get(reverse('DjTraders.Api.Products'), params)
+
+    def test_field_projection_selects_only_requested_columns(self):
+        """Test that fields= limits both the JSON keys and the selected columns, joining only for names."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(fields='unit_price,category_name', limit=2)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['results'], [{'unit_price': 1.0, 'category_name': 'Beverages'},
+                                                      {'unit_price': 2.0, 'category_name': 'Beverages'}])
+        sql = queries[-1]['sql']
+        self.assertNotIn('product_name', sql)
+        self.assertNotIn('suppliers', sql)
+        self.assertIn('categories', sql)
+
+    def test_cursor_pages_cover_every_product(self):
+        """Test that following next_cursor returns every product once, in product_id order."""
+        ids, cursor = [], None
+        while True:
+            payload = self.get(fields='product_id', limit=3, **({'cursor': cursor} if cursor else {})).json()
+            ids += [row['product_id'] for row in payload['results']]
+            cursor = payload['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(ids, list(range(1, 8)))
+        self.assertIsNotNone(payload['previous_cursor'])
+
+    def test_batch_lookup_by_ids(self):
+        """Test that ids= returns the products in the requested order with one query, listing the missing IDs."""
+        with self.assertNumQueries(2):  # version stamps + products
+            payload = self.get(ids='5,2,99', fields='product_name,supplier_name').json()
+        self.assertEqual(payload['results'], [{'product_name': 'Product 5', 'supplier_name': 'Exotic Liquids'},
+                                              {'product_name': 'Product 2', 'supplier_name': 'Exotic Liquids'}])
+        self.assertEqual(payload['missing'], [99])
+
+    def test_invalid_parameters_are_400(self):
+        for params in [{'fields': 'product_name,password'}, {'ids': '1,x'}, {'limit': '0'}, {'cursor': 'nonsense'}]:
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_malformed_cursors_are_400(self):
+        """Test that cursors with keys, values or page numbers of the wrong type or range are rejected."""
+        for position in [{'k': 'abc'}, {'k': [1]}, {'k': {'a': 1}}, {'k': 10 ** 30}, {'k': None}, {'k': True},
+                         {'k': 1, 'n': 'x'}, {'k': 1, 'n': 0}, {'k': 1, 'n': [2]}, {'k': 1, 'v': [1]}]:
+            response = self.get(cursor=pagination.encode_cursor({'d': 'next', 'n': 1, **position}))
+            self.assertEqual(response.status_code, 400, position)
+            self.assertIn('error', response.json())
+
+    def test_unchanged_catalog_is_304(self):
+        """Test that a product save changes the ETag of the API."""
+        etag = self.get()['ETag']
+        self.assertEqual(self.client.get(reverse('DjTraders.Api.Products'), headers={'if_none_match': etag}).status_code, 304)
+        Products.objects.get(pk=3).save()
+        self.assertEqual(self.client.get(reverse('DjTraders.Api.Products'), headers={'if_none_match': etag}).status_code, 200)
+
+    def test_encoders_agree(self):
+        payload = {'results': [{'product_id': 1, 'unit_price': 18.0, 'product_name': 'Chai'}], 'next_cursor': None}
+        with mock.patch.object(api, 'orjson', None):
+            fallback = api.dumps(payload)
+        self.assertEqual(json.loads(api.dumps(payload)), json.loads(fallback))
+
+
+class BulkProductUpdateTest(UnmanagedModelsTestCase):
+    """Tests for bulk price and stock updates (bulkupdates.py)."""
+    unmanaged_models = [Categories, Suppliers, Products]
+
+    @classmethod
+    def setUpTestData(cls):
+        Suppliers.objects.create(supplier_id=1, company_name='Exotic Liquids')
+        Suppliers.objects.create(supplier_id=2, company_name='Tokyo Traders')
+        for product_id, supplier_id, price, stock in [(1, 1, 18.0, 39), (2, 1, 19.0, 17), (3, 2, 10.0, 13)]:
+            Products.objects.create(product_id=product_id, product_name=f'Product {product_id}', supplier_id=supplier_id,
+                                    unit_price=price, units_in_stock=stock, discontinued=0)
+
+    def prices(self):
+        return dict(Products.objects.values_list('product_id', 'unit_price'))
+
+    def test_percentage_change_for_one_supplier(self):
+        """Test that a set-based change updates only the selected products and reports the diff."""
+        stamps = dict(VersionStamp.objects.values_list('key', 'version'))
+        change = bulkupdates.Change.parse('unit_price', 'percent', '5')
+        with self.assertNumQueries(5):  # savepoint, SELECT, UPDATE, version stamps, release
+            summary = bulkupdates.apply_changes(bulkupdates.select(supplier_id=1), [change])
+        self.assertEqual(self.prices(), {1: 18.9, 2: 19.95, 3: 10.0})
+        self.assertEqual(summary.matched, 2)
+        self.assertEqual(summary.changes[0], (1, 'Product 1', {'unit_price': (18.0, 18.9)}))
+        bumped = {key for key, version in VersionStamp.objects.values_list('key', 'version') if stamps.get(key) != version}
+        self.assertEqual(bumped, {versioning.product_key(1), versioning.product_key(2), versioning.PRODUCTS})
+
+    def test_summary_values_keep_the_field_types(self):
+        """Test that old and new values are floats for prices and ints for stock (also in the JSON summary)."""
+        summary = bulkupdates.apply_changes(bulkupdates.select(product_ids=[1]), [
+            bulkupdates.Change.parse('unit_price', 'percent', '5'), bulkupdates.Change.parse('units_in_stock', 'add', '1'),
+        ], dry_run=True)
+        fields = summary.as_dict()['changes'][0]['fields']
+        self.assertEqual({name: (type(values['old']), type(values['new'])) for name, values in fields.items()},
+                         {'unit_price': (float, float), 'units_in_stock': (int, int)})
+        self.assertEqual(json.loads(json.dumps(summary.as_dict()))['changes'][0]['fields']['unit_price'],
+                         {'old': 18.0, 'new': 18.9})
+
+    def test_invalid_values_reject_the_whole_batch(self):
+        """Test that ProductForm's rules are applied to every new value and nothing is written on errors."""
+        change = bulkupdates.Change.parse('units_in_stock', 'add', '-15')
+        with self.assertRaises(bulkupdates.BulkUpdateError) as raised:
+            bulkupdates.apply_changes(bulkupdates.select(all_products=True), [change])
+        self.assertEqual(raised.exception.errors, {3: {'units_in_stock': ['Units in stock cannot be negative.']}})
+        self.assertEqual(Products.objects.get(pk=1).units_in_stock, 39)
+
+    def test_explicit_values_use_bulk_update(self):
+        summary = bulkupdates.apply_values([{'product_id': '1', 'unit_price': '20', 'units_in_stock': ''},
+                                            {'product_id': 3, 'units_in_stock': 13}])
+        self.assertEqual(summary.matched, 2)
+        self.assertEqual(summary.changes, [(1, 'Product 1', {'unit_price': (18.0, 20.0)})])
+        self.assertEqual(self.prices()[1], 20.0)
+
+        with self.assertRaises(bulkupdates.BulkUpdateError) as raised:
+            bulkupdates.apply_values([{'product_id': 99, 'unit_price': 1}])
+        self.assertEqual(raised.exception.errors, {99: {'product_id': ['Unknown product.']}})
+
+    def test_dry_run_changes_nothing(self):
+        summary = bulkupdates.apply_changes(bulkupdates.select(product_ids=[3]),
+                                            [bulkupdates.Change.parse('unit_price', 'set', 12)], dry_run=True)
+        self.assertEqual(summary.changes, [(3, 'Product 3', {'unit_price': (10.0, 12.0)})])
+        self.assertEqual(self.prices()[3], 10.0)
+
+    def test_request_validation(self):
+        for payload in [{'changes': [{'field': 'unit_price', 'operation': 'set', 'value': 1}]},
+                        {'select': {'all': True}, 'changes': [{'field': 'units_in_stock', 'operation': 'percent', 'value': 1}]},
+                        {'select': {'all': True}, 'changes': [{'field': 'product_name', 'operation': 'set', 'value': 1}]},
+                        {'select': {'all': True}, 'changes': [{'field': 'units_in_stock', 'operation': 'set', 'value': 1.5}]},
+                        {'products': [{'product_id': 1, 'discontinued': 1}]}]:
+            with self.assertRaises(bulkupdates.BulkUpdateError, msg=payload):
+                bulkupdates.apply_request(payload)
+
+    def test_caches_are_invalidated_after_commit(self):
+        """Test that the choice and search caches are invalidated only once the update has committed."""
+        change = bulkupdates.Change.parse('unit_price', 'set', '12')
+        with mock.patch.object(choices, 'invalidate_model') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                bulkupdates.apply_changes(bulkupdates.select(product_ids=[3]), [change])
+                invalidate.assert_not_called()
+            self.assertEqual(len(callbacks), 1)
+            invalidate.assert_called_once_with(Products)
+
+    def test_api_requires_the_change_permission(self):
+        url = reverse('DjTraders.Api.ProductsBulkUpdate')
+        payload = {'select': {'all': True}, 'changes': [{'field': 'unit_price', 'operation': 'set', 'value': 0}]}
+        self.assertEqual(self.client.post(url, payload, content_type='application/json').status_code, 403)
+        self.client.force_login(User.objects.create_user('clerk'))
+        self.assertEqual(self.client.post(url, payload, content_type='application/json').status_code, 403)
+        self.assertEqual(self.prices()[1], 18.0)
+
+    def test_api(self):
+        url = reverse('DjTraders.Api.ProductsBulkUpdate')
+        manager = User.objects.create_user('manager')
+        manager.user_permissions.add(Permission.objects.get(codename='change_products'))
+        self.client.force_login(manager)
+        payload = {'select': {'supplier_id': 2}, 'changes': [{'field': 'unit_price', 'operation': 'add', 'value': 2.5}]}
+        response = self.client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['changes'],
+                         [{'product_id': 3, 'product_name': 'Product 3', 'fields': {'unit_price': {'old': 10.0, 'new': 12.5}}}])
+
+        payload['changes'][0]['value'] = -20
+        response = self.client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'3': {'unit_price': ['Unit price cannot be negative.']}})
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('bulk_update_products', '--products', '1,2', '--change', 'units_in_stock', 'set', '50',
+                     stdout=output)
+        self.assertIn('Updated 2 of 2 selected products', output.getvalue())
+        self.assertEqual(set(Products.objects.values_list('units_in_stock', flat=True)), {50, 13})
+
+
+class StockReservationTest(OrderFixturesTestCase):
+    """Tests for the stock reservation of order placement (ordering.reserve_stock)."""
+
+    def setUp(self):
+        self.employee = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy')
+        self.shipper = Shippers.objects.create(shipper_id=1, company_name='Speedy Express')
+        Products.objects.filter(product_id=11).update(units_in_stock=5)
+        Products.objects.filter(product_id=12).update(units_in_stock=2)
+
+    def place(self, quantities):
+        return ordering.place_order(
+            customer=self.customer, employee=self.employee, shipper=self.shipper,
+            items=[{'product_id': product_id, 'unit_price': 10.0, 'quantity': quantity, 'discount': 0}
+                   for product_id, quantity in quantities],
+            required_date=date.today() + timedelta(days=7),
+        )
+
+    def stock(self):
+        return dict(Products.objects.values_list('product_id', 'units_in_stock'))
+
+    def test_placed_order_decrements_stock_in_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.place([(12, 2), (11, 3)])
+        self.assertEqual(self.stock(), {11: 2, 12: 0})
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "products"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_all_insufficient_lines_are_reported_and_nothing_is_written(self):
+        with self.assertRaises(ordering.InsufficientStock) as raised:
+            self.place([(11, 6), (12, 3)])
+        self.assertEqual([(s.product_id, s.requested, s.available) for s in raised.exception.shortages],
+                         [(11, 6, 5), (12, 3, 2)])
+        self.assertEqual(self.stock(), {11: 5, 12: 2})
+        self.assertEqual(Orders.objects.count(), 2)
+
+    def test_lines_of_the_same_product_are_added_up(self):
+        with self.assertRaises(ordering.InsufficientStock):
+            self.place([(12, 1), (12, 2)])
+
+    def test_placed_order_bumps_the_stock_stamp(self):
+        etag = self.client.get(reverse('DjTraders.Api.Products'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place([(11, 1)])
+        response = self.client.get(reverse('DjTraders.Api.Products'), headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_rows_shared_by_all_orders_are_written_after_commit(self):
+        """Test that the stock stamp and the monthly rollup are not locked by the placing transaction."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.place([(11, 1)])
+            self.assertFalse(VersionStamp.objects.filter(key=versioning.STOCK).exists())
+            self.assertFalse(MonthlySales.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(VersionStamp.objects.filter(key=versioning.STOCK).exists())
+        self.assertEqual(MonthlySales.objects.get().order_count, 1)
+
+    def test_product_selection_form_checks_stock(self):
+        form = ProductSelectionForm({'product': 12, 'quantity': 3, 'discount': 0})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Only 2 units', form.errors['quantity'][0])
+
+    def test_order_confirm_reports_shortages(self):
+        session = self.client.session
+        session['order_data'] = {
+            'customer_id': 'ALFKI',
+            'products': [{'product_id': 11, 'product_name': 'Queso Cabrales', 'unit_price': 21.0, 'quantity': 9,
+                          'discount': 0}],
+            'order_details': {'employee_id': 1, 'shipper_id': 1,
+                              'required_date': (date.today() + timedelta(days=7)).isoformat()},
+        }
+        session.save()
+        response = self.client.post(reverse('DjTraders.OrderConfirm'), {'action': 'confirm'}, follow=True)
+        self.assertRedirects(response, reverse('DjTraders.OrderCreate') + '?step=2')
+        self.assertContains(response, 'Not enough stock for Queso Cabrales: 9 ordered, 5 in stock')
+        self.assertIn('order_data', self.client.session)
+
+
+class StockReservationConcurrencyTest(UnmanagedModelsMixin, TransactionTestCase):
+    """Simultaneous checkouts of the same products: no unit is sold twice and no decrement is lost."""
+    unmanaged_models = [Categories, Suppliers, Products, Customers, Employees, Shippers, Orders, OrderDetails]
+    checkouts = 20
+
+    @classmethod
+    def setUpClass(cls):
+        # Checked here, not at import: the test runner replaces the configured database with the test database
+        # (in-memory for SQLite unless TEST NAME is a file) before the classes are set up.
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise SkipTest('needs a database that separate threads can share '
+                           '(PostgreSQL or a file-based SQLite test database)')
+        super().setUpClass()
+
+    def test_simultaneous_checkouts(self):
+        customer = Customers.objects.create(customer_id='ALFKI', company_name='Alfreds Futterkiste')
+        employee = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy')
+        shipper = Shippers.objects.create(shipper_id=1, company_name='Speedy Express')
+        Products.objects.create(product_id=1, product_name='Chai', units_in_stock=10, discontinued=0)
+        Products.objects.create(product_id=2, product_name='Chang', units_in_stock=25, discontinued=0)
+        start = threading.Barrier(self.checkouts)
+        outcomes = []
+
+        def checkout(number):
+            lines = [{'product_id': 1, 'unit_price': 18.0, 'quantity': 1, 'discount': 0},
+                     {'product_id': 2, 'unit_price': 19.0, 'quantity': 2, 'discount': 0}]
+            if number % 2:
+                lines.reverse()  # locks must still be taken in product ID order
+            start.wait()
+            try:
+                ordering.place_order(customer, employee, shipper, lines, date.today() + timedelta(days=7))
+                outcomes.append('placed')
+            except ordering.InsufficientStock:
+                outcomes.append('rejected')
+            except Exception as error:
+                outcomes.append(repr(error))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=checkout, args=(number,)) for number in range(self.checkouts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['placed'] * 10 + ['rejected'] * 10)
+        self.assertEqual(dict(Products.objects.values_list('product_id', 'units_in_stock')), {1: 0, 2: 5})
+        sold = dict(OrderDetails.objects.values('product').annotate(units=Sum('quantity')).values_list('product', 'units'))
+        self.assertEqual(sold, {1: 10, 2: 20})
+
+
+class PurchaseSummaryTest(OrderFixturesTestCase):
+    """Tests for Customers.get_purchase_summary() and the product table of the customer page."""
+
+    def setUp(self):
+        Orders.objects.filter(order_id=1).update(order_date=date(2024, 1, 5))
+        Orders.objects.filter(order_id=2).update(order_date=date(2024, 3, 9))
+        OrderDetails.objects.create(order_id=2, product_id=12, unit_price=22.0, quantity=1, discount=0)
+
+    def test_one_query_with_units_spend_dates_and_order_count(self):
+        with self.assertNumQueries(1):
+            summary = list(self.customer.get_purchase_summary())
+        self.assertEqual(summary, [
+            {'product_id': 12, 'product_name': 'Queso Manchego', 'units': 6, 'net_spend': 112.0,
+             'first_order_date': date(2024, 1, 5), 'last_order_date': date(2024, 3, 9), 'order_count': 2},
+            {'product_id': 11, 'product_name': 'Queso Cabrales', 'units': 2, 'net_spend': 20.0,
+             'first_order_date': date(2024, 1, 5), 'last_order_date': date(2024, 1, 5), 'order_count': 1},
+        ])
+
+    def test_other_customers_lines_are_excluded(self):
+        Customers.objects.create(customer_id='ANATR', company_name='Ana Trujillo')
+        self.assertEqual(list(Customers(customer_id='ANATR').get_purchase_summary()), [])
+
+    def test_customer_page_shows_product_table(self):
+        rollups.rebuild()
+        response = self.client.get(reverse('DjTraders.CustomerDetail', kwargs={'customer_id': 'ALFKI'}))
+        self.assertEqual(response.context['products_count'], 2)
+        self.assertContains(response, '<td>$112.00</td>', html=True)
+        self.assertContains(response, reverse('DjTraders.ProductDetail', kwargs={'product_id': 12}))
+
+
+class CustomerDashboardTest(OrderFixturesTestCase):
+    """Tests for the cached customer dashboard (dashboard.py) of CustomerDetailView."""
+
+    def setUp(self):
+        cache.clear()
+        self.employee = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy')
+        self.shipper = Shippers.objects.create(shipper_id=1, company_name='Speedy Express')
+        for order_id in (3, 4, 5):
+            Orders.objects.create(order_id=order_id, customer=self.customer, ship_via=self.shipper)
+            OrderDetails.objects.create(order_id=order_id, product_id=11, unit_price=10.0, quantity=1, discount=0)
+
+    def get(self):
+        return self.client.get(reverse('DjTraders.CustomerDetail', kwargs={'customer_id': 'ALFKI'}))
+
+    def test_fixed_number_of_queries(self):
+        """Test that a dashboard is built in the same number of queries however many orders are shown."""
+        with self.assertNumQueries(4):  # version stamps, customer, orders with totals and shippers, purchase summary
+            response = self.get()
+        self.assertEqual(response.context['orders_count'], 5)
+        self.assertAlmostEqual(response.context['revenue'], 140.0)
+        self.assertEqual(response.context['products_count'], 2)
+        self.assertContains(response, 'Speedy Express', count=3)
+
+    def test_cached_until_the_customer_places_an_order(self):
+        self.get()
+        with self.assertNumQueries(2):  # version stamps, customer
+            self.assertEqual(self.get().context['orders_count'], 5)
+
+        ordering.place_order(self.customer, self.employee, self.shipper,
+                             [{'product_id': 12, 'unit_price': 20.0, 'quantity': 1, 'discount': 0}],
+                             required_date=date.today() + timedelta(days=7))
+        response = self.get()
+        self.assertEqual(response.context['orders_count'], 6)
+        self.assertAlmostEqual(response.context['revenue'], 160.0)
+
+    def test_other_customers_orders_keep_the_cache(self):
+        dashboard.customer_dashboard('ALFKI')
+        other = Customers.objects.create(customer_id='ANATR', company_name='Ana Trujillo')
+        ordering.place_order(other, self.employee, self.shipper,
+                             [{'product_id': 12, 'unit_price': 20.0, 'quantity': 1, 'discount': 0}],
+                             required_date=date.today() + timedelta(days=7))
+        with self.assertNumQueries(1):  # version stamps
+            dashboard.customer_dashboard('ALFKI')
+
+
+def bitmap(width=2, height=2):
+    """A minimal 24-bit BMP file."""
+    pixels = b'\x00' * (((width * 3 + 3) // 4) * 4 * height)
+    size = 54 + len(pixels)
+    return (b'BM' + size.to_bytes(4, 'little') + b'\x00' * 4 + (54).to_bytes(4, 'little')
+            + (40).to_bytes(4, 'little') + width.to_bytes(4, 'little') + height.to_bytes(4, 'little')
+            + b'\x01\x00\x18\x00' + b'\x00' * 24 + pixels)
+
+
+class ImageEndpointsTest(UnmanagedModelsTestCase):
+    """Tests for the deferred binary columns and the image endpoints (images.py)."""
+    unmanaged_models = [Categories, Suppliers, Products, Employees]  # category saves reindex its products
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = directory.name
+        settings = override_settings(IMAGE_CACHE_DIR=self.cache_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # A Northwind OLE object: a 78-byte header, the bitmap and trailing bytes.
+        self.photo = bitmap()
+        self.employee = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy',
+                                                 photo=b'\x15\x1c' + b'\x00' * 76 + self.photo + b'\x00' * 10,
+                                                 notes='Education includes a BA in psychology.')
+        self.category = Categories.objects.create(category_id=1, category_name='Beverages',
+                                                  description='Soft drinks', picture=b'\x89PNG\r\n\x1a\n1234')
+
+    def get(self, name, object_id, **headers):
+        return self.client.get(reverse(name, args=[object_id]), **headers)
+
+    def test_managers_defer_binary_and_text_columns(self):
+        """Test that listings and related objects do not select the images, which stay readable on access."""
+        with CaptureQueriesContext(connection) as queries:
+            employee = Employees.objects.get(employee_id=1)
+            category = Categories.objects.get(category_id=1)
+        self.assertEqual(employee.get_deferred_fields(), {'photo', 'notes'})
+        self.assertEqual(category.get_deferred_fields(), {'description', 'picture'})
+        self.assertNotIn('"employees"."photo",', queries[0]['sql'])
+        self.assertNotIn('picture', queries[1]['sql'])
+        with self.assertNumQueries(1):
+            self.assertEqual(category.description, 'Soft drinks')
+
+        Products.objects.create(product_id=1, product_name='Chai', category=self.category, discontinued=0)
+        product = Products.objects.get(product_id=1)
+        self.assertEqual(product.category.get_deferred_fields(), {'description', 'picture'})
+        product = Products.objects.select_related('category').defer(*deferred_related('category', Categories)).get(product_id=1)
+        self.assertEqual(product.category.get_deferred_fields(), {'description', 'picture'})
+
+    def test_saving_a_deferred_instance_keeps_the_image(self):
+        employee = Employees.objects.get(employee_id=1)
+        employee.title = 'Sales Representative'
+        employee.save()
+        self.assertEqual(bytes(Employees.objects.values_list('photo', flat=True).get(employee_id=1))[78:78 + len(self.photo)],
+                         self.photo)
+
+    def test_decode_strips_the_ole_header_and_trailing_bytes(self):
+        self.assertEqual(images.decode(b'\x15\x1c' + b'\x00' * 76 + self.photo + b'\x00' * 10), self.photo)
+        self.assertEqual(images.decode(self.photo), self.photo)
+        self.assertEqual(images.decode(b'unknown'), b'unknown')
+
+    def test_photo_is_served_with_content_type_and_cache_headers(self):
+        response = self.get('DjTraders.EmployeePhoto', 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/bmp')
+        self.assertEqual(b''.join(response.streaming_content), self.photo)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=2592000', response['Cache-Control'])
+        self.assertIn('ETag', response)
+
+        response = self.get('DjTraders.CategoryPicture', 1)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(response.streaming_content), b'\x89PNG\r\n\x1a\n1234')
+
+    def test_cached_file_is_served_without_reading_the_row(self):
+        b''.join(self.get('DjTraders.EmployeePhoto', 1).streaming_content)
+        with self.assertNumQueries(1):  # version stamp
+            response = self.get('DjTraders.EmployeePhoto', 1)
+            self.assertEqual(b''.join(response.streaming_content), self.photo)
+
+    def test_unchanged_image_is_304(self):
+        etag = self.get('DjTraders.EmployeePhoto', 1)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get('DjTraders.EmployeePhoto', 1, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_changed_photo_replaces_the_cached_file(self):
+        b''.join(self.get('DjTraders.EmployeePhoto', 1).streaming_content)
+        new_photo = bitmap(width=3)
+        Employees.objects.filter(employee_id=1).update(photo=new_photo)
+        Employees.objects.get(employee_id=1).save()  # the signal bumps the employee's stamp
+        response = self.get('DjTraders.EmployeePhoto', 1)
+        self.assertEqual(b''.join(response.streaming_content), new_photo)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_missing_images_are_404(self):
+        Employees.objects.create(employee_id=2, last_name='Fuller', first_name='Andrew')
+        self.assertEqual(self.get('DjTraders.EmployeePhoto', 2).status_code, 404)
+        self.assertEqual(self.get('DjTraders.EmployeePhoto', 99).status_code, 404)
+        self.assertEqual(self.client.post(reverse('DjTraders.CategoryPicture', args=[1])).status_code, 405)
+
+    def test_image_url_changes_with_the_stamp(self):
+        url = images.image_url('employee', 1)
+        self.assertTrue(url.startswith(reverse('DjTraders.EmployeePhoto', args=[1]) + '?v='))
+        self.employee.save()
+        self.assertNotEqual(images.image_url('employee', 1), url)
+
+    def test_product_pages_link_the_versioned_category_picture(self):
+        Products.objects.create(product_id=1, product_name='Chai', category=self.category, discontinued=0)
+        url = images.image_url('category', 1)
+        for name in ('DjTraders.ProductDetail', 'DjTraders.Async.ProductDetail'):
+            response = self.client.get(reverse(name, kwargs={'product_id': 1}))
+            self.assertContains(response, f'<img src="{url}"', msg_prefix=name)
+        self.category.save()
+        self.assertNotContains(self.client.get(reverse('DjTraders.ProductDetail', kwargs={'product_id': 1})), url)
+
+    def test_image_replaced_before_it_is_opened_is_served_from_memory(self):
+        """Test that a request whose new file was removed by a concurrent request serves the decoded image."""
+        with mock.patch.object(images, '_store'):  # stored, then removed before the request opens it
+            stream, content_type = images.open_image('employee', 1)
+        self.assertEqual((stream.read(), content_type), (self.photo, 'image/bmp'))
+
+
+class CommissionReportTest(OrderFixturesTestCase):
+    """Tests for the employee commission report (commissions.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        davolio = Employees.objects.create(employee_id=1, last_name='Davolio', first_name='Nancy')
+        fuller = Employees.objects.create(employee_id=2, last_name='Fuller', first_name='Andrew')
+        for order_id, employee, order_date, product_id, unit_price, quantity, discount in [
+            (10, davolio, date(2025, 1, 15), 11, 10000.0, 1, 0),
+            (11, davolio, date(2025, 1, 20), 12, 5000.0, 4, 10),
+            (12, davolio, date(2025, 2, 1), 11, 500.0, 1, 0),
+            (13, fuller, date(2025, 1, 31), 11, 100.0, 1, 0),
+            (14, fuller, date(2024, 12, 31), 11, 100.0, 1, 0),  # before the reported range
+        ]:
+            Orders.objects.create(order_id=order_id, customer=cls.customer, employee=employee, order_date=order_date)
+            OrderDetails.objects.create(order_id=order_id, product_id=product_id, unit_price=unit_price,
+                                        quantity=quantity, discount=discount)
+
+    def test_tiers_are_marginal(self):
+        plan = commissions.CommissionPlan.parse('0:2,10000:3,25000:5')
+        self.assertEqual(plan.commission(0), 0)
+        self.assertEqual(plan.commission(5000), 100.0)
+        self.assertEqual(plan.commission(28000), 800.0)  # 2% of 10,000 + 3% of 15,000 + 5% of 3,000
+        self.assertEqual(commissions.CommissionPlan.parse('1000:10').commission(1500), 50.0)
+        self.assertEqual(str(plan), '0:2,10000:3,25000:5')
+
+    def test_invalid_tiers(self):
+        for tiers in ('', 'abc', '0:2,0:3', '0:2:3', '0:101', '-5:2'):
+            with self.assertRaises(commissions.InvalidPlan):
+                commissions.CommissionPlan.parse(tiers)
+
+    def test_report_per_employee_and_month_in_one_query(self):
+        with self.assertNumQueries(1):
+            report = commissions.report(date(2025, 1, 1), date(2025, 12, 31))
+        rows = [(month.employee_name, month.month, month.orders, month.net_sales, month.commission)
+                for month in report.months]
+        self.assertEqual(rows, [
+            ('Nancy Davolio', date(2025, 1, 1), 2, 28000.0, 800.0),
+            ('Nancy Davolio', date(2025, 2, 1), 1, 500.0, 10.0),
+            ('Andrew Fuller', date(2025, 1, 1), 1, 100.0, 2.0),
+        ])
+        davolio, fuller = report.employees()
+        self.assertEqual((davolio.orders, davolio.net_sales, davolio.commission), (3, 28500.0, 810.0))
+        self.assertEqual(fuller.commission, 2.0)
+        self.assertEqual(report.commission, 812.0)
+
+    def test_page_and_csv_download(self):
+        url = reverse('DjTraders.CommissionReport')
+        response = self.client.get(url, {'start': '2025-01-01', 'end': '2025-01-31', 'tiers': '0:10'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Nancy Davolio total')
+        self.assertAlmostEqual(response.context['report'].commission, 2810.0)
+
+        response = self.client.get(url, {'start': '2025-01-01', 'end': '2025-01-31', 'tiers': '0:10', 'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('commissions_2025-01-01_2025-01-31.csv', response['Content-Disposition'])
+        self.assertEqual(list(csv.reader(io.StringIO(response.content.decode()))), [
+            list(commissions.CSV_COLUMNS),
+            ['1', 'Nancy Davolio', '2025-01', '2', '5', '28000.00', '2800.00'],
+            ['2', 'Andrew Fuller', '2025-01', '1', '1', '100.00', '10.00'],
+        ])
+
+    def test_invalid_form_shows_errors(self):
+        response = self.client.get(reverse('DjTraders.CommissionReport'),
+                                   {'start': '2025-02-01', 'end': '2025-01-01', 'tiers': 'lots'})
+        self.assertIsNone(response.context['report'])
+        self.assertTrue(response.context['form'].has_error('end'))
+        self.assertTrue(response.context['form'].has_error('tiers'))
+
+    def test_defaults_to_this_year(self):
+        response = self.client.get(reverse('DjTraders.CommissionReport'))
+        self.assertEqual(response.context['report'].start, date.today().replace(month=1, day=1))
+        self.assertEqual(response.context['report'].end, date.today())
+        self.assertEqual(str(response.context['report'].plan), '0:2,10000:3,25000:5')
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'commissions.csv')
+            output = io.StringIO()
+            call_command('commission_report', '--start', '2025-01-01', '--end', '2025-12-31', '--output', path,
+                         stdout=output)
+            with open(path, newline='') as stream:
+                self.assertEqual(len(list(csv.reader(stream))), 4)
+        self.assertIn('Commission 812.00 on net sales of 28,600.00', output.getvalue())
+
@@ -96,4 +96,96 @@ urlpatterns = [
 	),
 
 	#endregion Order Placement URLs
-]
\ No newline at end of file
+
+	#region Export URLs
+	path(
+		'DjTraders/Export/<str:dataset>/',
+		views.export,
+		name='DjTraders.Export'
+	),
+
+	#endregion Export URLs
+
+	#region Cache Statistics URLs
+	path(
+		'DjTraders/Stats/SearchCache/',
+		views.search_cache_stats,
+		name='DjTraders.SearchCacheStats'
+	),
+
+	#endregion Cache Statistics URLs
+
+	#region API URLs
+	path(
+		'DjTraders/Api/Products/',
+		views.products_api,
+		name='DjTraders.Api.Products'
+	),
+
+	path(
+		'DjTraders/Api/Products/BulkUpdate/',
+		views.products_bulk_update,
+		name='DjTraders.Api.ProductsBulkUpdate'
+	),
+
+	#endregion API URLs
+
+	#region Image URLs
+	# Employee photos and category pictures (images.py), decoded and cached on disk.
+	path(
+		'DjTraders/Images/Employees/<int:employee_id>/',
+		views.employee_photo,
+		name='DjTraders.EmployeePhoto'
+	),
+
+	path(
+		'DjTraders/Images/Categories/<int:category_id>/',
+		views.category_picture,
+		name='DjTraders.CategoryPicture'
+	),
+
+	#endregion Image URLs
+
+	#region Report URLs
+	path(
+		'DjTraders/Reports/Commissions/',
+		views.commission_report,
+		name='DjTraders.CommissionReport'
+	),
+
+	#endregion Report URLs
+
+	#region Async Read URLs
+	# Async versions of the read pages (views.py, "Async read views"), for ASGI deployments.
+	path(
+		'DjTraders/Async/Products',
+		views.products_list_async,
+		name='DjTraders.Async.Products'
+	),
+
+	path(
+		'DjTraders/Async/ProductDetail/<str:product_id>/',
+		views.product_detail_async,
+		name='DjTraders.Async.ProductDetail'
+	),
+
+	path(
+		'DjTraders/Async/Customers',
+		views.customers_list_async,
+		name='DjTraders.Async.Customers'
+	),
+
+	path(
+		'DjTraders/Async/CustomerDetail/<str:customer_id>/',
+		views.customer_detail_async,
+		name='DjTraders.Async.CustomerDetail'
+	),
+
+	path(
+		'DjTraders/Async/CustomerOrders/<str:customer_id>/',
+		views.customer_orders_async,
+		name='DjTraders.Async.CustomerOrders'
+	),
+
+	#endregion Async Read URLs
+]
\ No newline at end of file
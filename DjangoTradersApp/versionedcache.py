@@ -0,0 +1,87 @@
+"""
+Versioned caches: the invalidation mechanism shared by the reference lookups (lookups.py), the choice sets
+(choices.py) and the search result caches (resultcache.py).
+
+Each VersionedCache has a version number in the Django cache (settings.CACHES), shared by all processes.
+Its entries are stored under, or tagged with, the version they were read at; invalidate() increments the
+version, so every process stops reading the older entries (they expire with their timeout) and drops the
+copies it holds in memory. A missing version key (never set, or evicted) starts at the current time in
+microseconds rather than 1, so it never returns to a version whose entries may still be cached.
+
+Writes invalidate the caches over the written model: invalidate_model() of each module, called from the
+post_save / post_delete handlers in signals.py. Bulk queryset.update()/delete() calls do not send signals,
+so code making them calls invalidate_model() itself (see bulkupdates.products_updated()).
+"""
+
+import threading
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+
+
+class VersionedCache:
+    """
+    Base class of a named cache over the rows of one or more models.
+
+    name:   unique name, used in the cache keys (under the subclass's key_prefix).
+    models: labels of the models whose writes invalidate it, e.g. ["DjangoTradersApp.Customers"]
+            (resolved lazily, so models.py can use the caches).
+
+    Subclasses keep their in-memory entries under self._lock and drop them in clear_local().
+    """
+
+    key_prefix = "versioned_cache"
+
+    def __init__(self, name, models):
+        self.name = name
+        self.model_labels = list(models)
+        self._lock = threading.Lock()
+
+    @property
+    def models(self):
+        return [apps.get_model(label) for label in self.model_labels]
+
+    @property
+    def version_key(self):
+        return f"{self.key_prefix}:{self.name}:version"
+
+    def entry_key(self, version):
+        return f"{self.key_prefix}:{self.name}:{version}"
+
+    def version(self):
+        """The current version (one Django cache read)."""
+        version = cache.get(self.version_key)
+        if version is None:
+            # add() keeps a version another process set in the meantime.
+            cache.add(self.version_key, _new_version(), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        """Moves the cache to a new version; every process stops using its older entries."""
+        try:
+            cache.incr(self.version_key)
+        except ValueError:  # no version yet
+            cache.set(self.version_key, _new_version(), None)
+        with self._lock:
+            self.clear_local()
+
+    def clear_local(self):
+        """Drops the entries this process holds in memory (called with self._lock held)."""
+
+
+def _new_version():
+    return time.time_ns() // 1000
+
+
+def invalidate_model(registry, model):
+    """Invalidates the caches of registry over the given model."""
+    for versioned_cache in registry:
+        if model in versioned_cache.models:
+            versioned_cache.invalidate()
+
+
+def invalidate_all(registry):
+    for versioned_cache in registry:
+        versioned_cache.invalidate()
@@ -0,0 +1,148 @@
+"""
+Per-entity version stamps for conditional GET (ETag / Last-Modified).
+
+A page is stamped by the version stamps of what it shows (see models.VersionStamp):
+    product:<product_id>     the product, its sales totals                  (ProductDetailView)
+    customer:<customer_id>   the customer, their orders and sales totals    (CustomerDetailView, OrdersListView)
+    category:<category_id>   the category (product table rows, see fragments.py; its picture, see images.py)
+    supplier:<supplier_id>   the supplier (product table rows)
+    employee:<employee_id>   the employee (their photo, see images.py)
+    products                 any product (names and prices on customer pages)
+    stock                    the units in stock of any product, changed by placed orders (the products API);
+                             bumped once the order has committed (every order would otherwise hold its lock)
+    reference                categories, suppliers, shippers and employees
+Writes bump the stamps they affect: model saves and deletes through signals.py, placed and imported orders
+through orders_written() (called in the transaction that writes them, so a rolled back order bumps nothing).
+
+The stamps of a page are read with one primary-key lookup, before the view runs; conditional() wraps a view
+with Django's condition decorator, so a request whose If-None-Match / If-Modified-Since still matches
+is answered with 304 Not Modified without running the view's queries or rendering its template.
+
+Pages also show things no stamp tracks: today's date (base.html, contextUtilities.today) and the markup
+of the deployed templates and code. So the validators sent to clients also carry the date and the release
+(settings.RELEASE_ID, or the process start when it is not set): the ETag is
+    <release>-<date>-<stamp versions>
+and Last-Modified is never before today's midnight or the process start. Stamp.etag itself stays the
+data version (cache keys are built from it).
+
+Bulk queryset.update()/delete() calls do not send signals, so call bump() after them.
+A stamp that was never bumped has version 0; rows must not be deleted (a reset stamp could match an old ETag).
+"""
+
+import time
+from datetime import date, datetime, time as clock_time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import VersionStamp
+
+
+PRODUCTS = "products"
+REFERENCE = "reference"
+STOCK = "stock"
+
+# Fallback release of this process (when settings.RELEASE_ID is not set).
+PROCESS_STARTED = timezone.now()
+
+
+def product_key(product_id):
+    return f"product:{product_id}"
+
+
+def customer_key(customer_id):
+    return f"customer:{customer_id}"
+
+
+def category_key(category_id):
+    return f"category:{category_id}"
+
+
+def supplier_key(supplier_id):
+    return f"supplier:{supplier_id}"
+
+
+def employee_key(employee_id):
+    return f"employee:{employee_id}"
+
+
+def bump(*keys):
+    """Gives the stamps new versions (one upsert)."""
+    if not keys:
+        return
+    version = time.time_ns() // 1000
+    now = timezone.now()
+    VersionStamp.objects.bulk_create(
+        [VersionStamp(key=key, version=version, modified=now) for key in dict.fromkeys(keys)],
+        update_conflicts=True, unique_fields=["key"], update_fields=["version", "modified"],
+    )
+
+
+def orders_written(orders_with_lines, *keys):
+    """Bumps the customers and products of newly written orders ((order, lines) pairs), and keys."""
+    keys = list(keys)
+    for order, lines in orders_with_lines:
+        keys.append(customer_key(order.customer_id))
+        keys.extend(product_key(line.product_id) for line in lines)
+    bump(*keys)
+
+
+class Stamp:
+    """The combined version of a page's stamps."""
+
+    def __init__(self, keys, rows):
+        versions = {row.key: row for row in rows}
+        self.etag = "-".join(str(versions[key].version) if key in versions else "0" for key in keys)
+        self.last_modified = max((row.modified for row in rows), default=None)
+
+
+def lookup(*keys):
+    return Stamp(keys, list(VersionStamp.objects.filter(key__in=keys)))
+
+
+def request_stamp(request):
+    """The stamp conditional() read for this request (None outside conditional views)."""
+    return getattr(request, "_version_stamp", None)
+
+
+def page_date():
+    """The date shown on the pages (contextUtilities.today uses the server's local date)."""
+    return date.today()
+
+
+def release():
+    return getattr(settings, "RELEASE_ID", None) or str(int(PROCESS_STARTED.timestamp()))
+
+
+def page_etag(stamp):
+    """The ETag of a page with this stamp: also changes with the date and the release."""
+    return f"{release()}-{page_date():%Y%m%d}-{stamp.etag}"
+
+
+def page_last_modified(stamp):
+    """The Last-Modified of a page with this stamp: not before today's midnight or the process start."""
+    midnight = datetime.combine(page_date(), clock_time.min).astimezone()
+    return max(moment for moment in (stamp.last_modified, midnight, PROCESS_STARTED) if moment is not None)
+
+
+def conditional(keys):
+    """
+    A view decorator answering conditional GETs from the stamps named by keys(**view_kwargs).
+    The stamps are read once per request and shared by the ETag and Last-Modified checks.
+    """
+    def stamp(request, **kwargs):
+        if request_stamp(request) is None:
+            request._version_stamp = lookup(*keys(**kwargs))
+        return request._version_stamp
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: page_etag(stamp(request, **kwargs)),
+        last_modified_func=lambda request, *args, **kwargs: page_last_modified(stamp(request, **kwargs)),
+    )
+
+
+def conditional_view(keys):
+    """conditional() for class-based views."""
+    return method_decorator(conditional(keys), name="dispatch")
@@ -1,11 +1,35 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.shortcuts import render, get_object_or_404, redirect
-from django.urls import reverse_lazy
-from django.db.models import Q
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.template.response import TemplateResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.urls import reverse, reverse_lazy
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.auth.decorators import permission_required
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST, require_safe
 from datetime import date
-from .models import Customers, Orders, Products, OrderDetails, Employees, Shippers
-from .forms import CustomerSelectionForm, ProductSelectionForm, OrderDetailsForm, ProductForm
+from .models import Customers, Orders, Products, Categories, Employees, Shippers, CustomerSales, ProductSales
+from .models import deferred_related
+from .forms import CustomerSelectionForm, ProductSelectionForm, OrderDetailsForm, ProductForm, CommissionReportForm
+from . import api
+from . import bulkupdates
+from . import commissions
+from . import dashboard
+from . import search as product_search
+from . import exports
+from . import fragments
+from . import images
+from . import resultcache
+from . import rollups
+from . import versioning
+from .ordering import InsufficientStock, place_order
+from .pagination import KeysetPaginationMixin
 
 
 # Home view for DjangoTradersApp
@@ -14,37 +38,54 @@ def home(request):
 
 
 # Products list view
-class ProductsListView(ListView):
+class ProductsListView(KeysetPaginationMixin, ListView):
     model = Products
     template_name = "DjangoTradersApp/Products/index.html"
     context_object_name = "products"
     paginate_by = 10
+    # Opt-in cursor pagination (see pagination.py): pages ordered by name, then product_id
+    keyset_sort_field = "product_name"
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # Only the IDs and version stamps are read: the rows are rendered from the row cache (see fragments.py)
+        queryset = fragments.with_row_versions(super().get_queryset())
         search = self.request.GET.get("search", "")
         if search:
-            queryset = queryset.filter(
-                Q(product_name__icontains=search) |
-                Q(category__category_name__icontains=search) |
-                Q(supplier__company_name__icontains=search) |
-                Q(quantity_per_unit__icontains=search)
+            # Ranked full-text search over the product search documents (see search.py).
+            # Only the products of the requested page are loaded.
+            return product_search.RankedProducts(
+                product_search.cached_search_product_ids(search), queryset
             )
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["search"] = self.request.GET.get("search", "")
+        context["product_rows"] = fragments.render_rows(context["object_list"])
         return context
 
 
 # Product detail view
+# Conditional GET: 304 Not Modified while the product's version stamps are unchanged (see versioning.py)
+@versioning.conditional_view(lambda product_id: [versioning.product_key(product_id), versioning.REFERENCE])
 class ProductDetailView(DetailView):
     model = Products
     template_name = "DjangoTradersApp/Products/details.html"
     context_object_name = "product"
     pk_url_kwarg = "product_id"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Sales totals come from the product_sales rollup instead of summing order_details
+        context['sales'] = rollups.sales_for(ProductSales, self.object.product_id)
+        context['category_picture_url'] = _category_picture_url(self.object)
+        return context
+
+
+def _category_picture_url(product):
+    """The versioned URL of the product's category picture (see images.image_url()), None without a category."""
+    return images.image_url("category", product.category_id) if product.category_id else None
+
 
 # Product create view
 class ProductCreateView(CreateView):
@@ -69,6 +110,7 @@ class ProductUpdateView(UpdateView):
     model = Products
     form_class = ProductForm
     template_name = "DjangoTradersApp/Products/edit.html"
+    context_object_name = "product"
     pk_url_kwarg = "product_id"
 
     def get_success_url(self):
@@ -84,6 +126,7 @@ class ProductUpdateView(UpdateView):
 
 
 # Orders list view for a customer
+@versioning.conditional_view(lambda customer_id: [versioning.customer_key(customer_id)])
 class OrdersListView(DetailView):
     model = Customers
     template_name = "DjangoTradersApp/Customers/OrdersList.html"
@@ -93,7 +136,8 @@ class OrdersListView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         customer = self.object
-        orders = customer.get_orders()
+        # Totals are computed in SQL instead of one query per row for order.order_total
+        orders = customer.get_orders().with_totals()
         context['orders'] = orders
         return context
 
@@ -137,8 +181,8 @@ def CustomerDetail(request, customer_id):
     The data will be displayed in the customer_detail.html template.
     """
     customer = Customers.objects.get(customer_id=customer_id)
-    orders = Orders.objects.filter(customer=customer)
-    products = Products.objects.filter(orderdetails__order__in=orders).distinct()
+    orders = list(Orders.objects.filter(customer=customer).with_totals())
+    products = list(customer.get_purchase_summary())
     return render(
         request=request,
         template_name="DjangoTradersApp/Customers/Detail.html",
@@ -146,8 +190,9 @@ def CustomerDetail(request, customer_id):
             "customer": customer,
             "orders": orders,
             "products": products,
-            "orders_count": orders.count(),
-            "products_count": products.count(),
+            "orders_count": len(orders),
+            "revenue": sum(order.net_total for order in orders),
+            "products_count": len(products),
         },
     )
 
@@ -156,34 +201,64 @@ def CustomerDetail(request, customer_id):
 
 # region Class-based Customer views
 
-class CustomerListView(ListView):
+def filter_customers(queryset, params):
+    """
+    Applies the customer list's search parameters (customer, title, country) to a queryset.
+    Shared by CustomerListView and its async version.
+    """
+    customer_search = params.get("customer", "")
+    title_search = params.get("title", "")
+    country_search = params.get("country", "")
+
+    if customer_search:
+        queryset = queryset.filter(company_name__icontains=customer_search)
+    if title_search:
+        queryset = queryset.filter(contact_title__icontains=title_search)
+    if country_search:
+        queryset = queryset.filter(country__iexact=country_search)
+    return queryset
+
+
+def cached_customer_ids(queryset, params):
+    """
+    The primary keys of filter_customers(queryset, params), in the queryset's order (else by customer_id),
+    through the customer search result cache (resultcache.py). None when no filter is given.
+    All three filters are case-insensitive, so the cache key uses the lower-cased values.
+    """
+    filters = {name: params.get(name, "").lower() for name in ("customer", "title", "country")}
+    if not any(filters.values()):
+        return None
+    ordering = queryset.query.order_by or ["customer_id"]
+    return resultcache.CUSTOMER_SEARCHES.get(
+        filters,
+        lambda: filter_customers(queryset, params).order_by(*ordering).values_list("customer_id", flat=True),
+    )
+
+
+class CustomerListView(KeysetPaginationMixin, ListView):
     """
     View to list all customers with search functionality.
     Supports case-insensitive, partial search on company_name, contact_title, and country.
+    Supports opt-in cursor pagination (see pagination.py), ordered by company_name, then customer_id.
     """
     model = Customers
-    template_name = "DjangoTradersApp/Customers/Index.html"
+    template_name = "DjangoTradersApp/Customers/index.html"
     context_object_name = "customers"
     paginate_by = 10  # Paginate results, 10 per page
+    keyset_sort_field = "company_name"
 
     def get_queryset(self):
         """
         Get the filtered queryset based on search criteria.
         Uses icontains for partial/case-insensitive matching.
+        Searches are served from the result cache (see resultcache.py), except in cursor pagination.
         """
         queryset = super().get_queryset()
-
-        customer_search = self.request.GET.get("customer", "")
-        title_search = self.request.GET.get("title", "")
-        country_search = self.request.GET.get("country", "")
-
-        if customer_search:
-            queryset = queryset.filter(company_name__icontains=customer_search)
-        if title_search:
-            queryset = queryset.filter(contact_title__icontains=title_search)
-        if country_search:
-            queryset = queryset.filter(country__iexact=country_search)
-        return queryset
+        if not self.keyset_enabled(queryset):
+            customer_ids = cached_customer_ids(queryset, self.request.GET)
+            if customer_ids is not None:
+                return resultcache.ResultList(customer_ids, queryset)
+        return filter_customers(queryset, self.request.GET)
 
     def get_context_data(self, **kwargs):
         """
@@ -197,6 +272,7 @@ class CustomerListView(ListView):
         return context
 
 
+@versioning.conditional_view(dashboard.stamp_keys)
 class CustomerDetailView(DetailView):
     model = Customers
     template_name = "DjangoTradersApp/Customers/Detail.html"
@@ -205,24 +281,179 @@ class CustomerDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        customer = self.object
-        # Orders placed
-        orders = customer.get_orders()
-        context['orders'] = orders
-        context['orders_count'] = customer.get_order_count()
-        # Products purchased
-        products = customer.get_ordered_products()
-        context['products'] = products
-        context['products_count'] = products.count() if hasattr(products, 'count') else len(products)
-        # Order details for product table
-        order_ids = list(orders.values_list('order_id', flat=True))
-        order_details = OrderDetails.objects.filter(order_id__in=order_ids)
-        context['order_details'] = order_details
+        # Order history with totals and shippers, purchase summary and the statistics derived from them,
+        # cached per customer until the page's version stamps change (see dashboard.py)
+        customer_dashboard = dashboard.customer_dashboard(
+            self.object.customer_id, versioning.request_stamp(self.request)
+        )
+        context.update(customer_dashboard.context())
         return context
 
 # endregion Class-based Customer views
 
 
+# region Async read views
+# Async versions of the product and customer read pages, for deployments under ASGI
+# (DjangoProject/asgi.py). Independent queries are started together with asyncio.gather;
+# each view fetches everything its template uses (no lazy relation access while rendering).
+# Note: Django's async ORM still runs the queries of one request on that request's sync thread,
+# so they are not executed in parallel on the database yet; the gain is that the event loop
+# serves other requests while a request waits, instead of one worker thread per request.
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _apaginate(request, queryset, per_page):
+    """
+    Offset pagination like ListView's: for a numeric ?page= the page's rows and the total count
+    are read concurrently. Returns (paginator, page). Raises Http404 for an invalid page.
+    """
+    paginator = Paginator(queryset, per_page)
+    number = request.GET.get("page") or 1
+    if number == "last":
+        # Paginator.count is a cached_property: setting it avoids the sync COUNT query.
+        paginator.count = await queryset.acount()
+        number = paginator.num_pages
+        rows = await _alist(queryset[(number - 1) * per_page:number * per_page])
+    else:
+        try:
+            number = int(number)
+        except ValueError:
+            raise Http404("Invalid page.")
+        if number < 1:
+            raise Http404("Invalid page.")
+        paginator.count, rows = await asyncio.gather(
+            queryset.acount(), _alist(queryset[(number - 1) * per_page:number * per_page])
+        )
+    try:
+        number = paginator.validate_number(number)
+    except InvalidPage as error:
+        raise Http404(f"Invalid page ({error}).")
+    return paginator, Page(rows, number, paginator)
+
+
+def _page(paginator, number):
+    """paginator.page(number) for in-memory lists (ResultList); Http404 for an invalid page."""
+    try:
+        return paginator.page(number)
+    except InvalidPage as error:
+        raise Http404(f"Invalid page ({error}).")
+
+
+def _list_context(name, paginator, page):
+    """The pagination context ListView provides."""
+    return {
+        "paginator": paginator,
+        "page_obj": page,
+        "is_paginated": page.has_other_pages(),
+        "object_list": page.object_list,
+        name: page.object_list,
+    }
+
+
+async def products_list_async(request):
+    """Async ProductsListView (offset pagination; a search is ranked as in the sync view)."""
+    queryset = fragments.with_row_versions(Products.objects.order_by("product_id"))
+    search = request.GET.get("search", "")
+    if search:
+        # The search runs vendor-specific raw SQL (search.py), so it runs on the sync thread.
+        ranked = product_search.RankedProducts(
+            await sync_to_async(product_search.cached_search_product_ids)(search), queryset
+        )
+        paginator = Paginator(ranked, ProductsListView.paginate_by)
+        page = await sync_to_async(_page)(paginator, request.GET.get("page") or 1)
+    else:
+        paginator, page = await _apaginate(request, queryset, ProductsListView.paginate_by)
+    context = _list_context("products", paginator, page)
+    context["search"] = search
+    context["product_rows"] = await sync_to_async(fragments.render_rows)(page.object_list)
+    return TemplateResponse(request, ProductsListView.template_name, context)
+
+
+async def product_detail_async(request, product_id):
+    """Async ProductDetailView: the product (with category and supplier) and its sales rollup together."""
+    product, sales = await asyncio.gather(
+        Products.objects.select_related("category", "supplier").defer(*deferred_related("category", Categories))
+        .filter(product_id=product_id).afirst(),
+        rollups.asales_for(ProductSales, product_id),
+    )
+    if product is None:
+        raise Http404("No product found.")
+    return TemplateResponse(request, ProductDetailView.template_name, {
+        "product": product,
+        "sales": sales,
+        "category_picture_url": await sync_to_async(_category_picture_url)(product),
+    })
+
+
+async def customers_list_async(request):
+    """Async CustomerListView (offset pagination), with the country list read concurrently."""
+    queryset = Customers.objects.order_by("customer_id")
+    customer_ids = await sync_to_async(cached_customer_ids)(queryset, request.GET)
+    if customer_ids is not None:
+        paginator = Paginator(resultcache.ResultList(customer_ids, queryset), CustomerListView.paginate_by)
+        page, countries = await asyncio.gather(
+            sync_to_async(_page)(paginator, request.GET.get("page") or 1),
+            sync_to_async(Customers.get_all_countries)(),
+        )
+    else:
+        (paginator, page), countries = await asyncio.gather(
+            _apaginate(request, queryset, CustomerListView.paginate_by),
+            sync_to_async(Customers.get_all_countries)(),
+        )
+    context = _list_context("customers", paginator, page)
+    context.update({
+        "search_country": request.GET.get("country", ""),
+        "search_customer": request.GET.get("customer", ""),
+        "search_title": request.GET.get("title", ""),
+        "available_countries": countries,
+    })
+    return TemplateResponse(request, CustomerListView.template_name, context)
+
+
+async def customer_detail_async(request, customer_id):
+    """
+    Async CustomerDetailView: the customer, the order history (with totals and shippers),
+    the sales rollup and the purchase summary are read concurrently.
+    """
+    orders = (
+        Customers(customer_id=customer_id).get_orders()
+        .with_totals()
+        .select_related("ship_via")
+    )
+    customer, orders, sales, products = await asyncio.gather(
+        Customers.objects.filter(customer_id=customer_id).afirst(),
+        _alist(orders),
+        rollups.asales_for(CustomerSales, customer_id),
+        _alist(Customers(customer_id=customer_id).get_purchase_summary()),
+    )
+    if customer is None:
+        raise Http404("No customer found.")
+    return TemplateResponse(request, CustomerDetailView.template_name, {
+        "customer": customer,
+        "orders": orders,
+        "sales": sales,
+        "orders_count": len(orders),
+        "revenue": sales.revenue,
+        "products": products,
+        "products_count": len(products),
+    })
+
+
+async def customer_orders_async(request, customer_id):
+    """Async OrdersListView: the customer and their orders (with totals) together."""
+    customer, orders = await asyncio.gather(
+        Customers.objects.filter(customer_id=customer_id).afirst(),
+        _alist(Customers(customer_id=customer_id).get_orders().with_totals()),
+    )
+    if customer is None:
+        raise Http404("No customer found.")
+    return TemplateResponse(request, OrdersListView.template_name, {"customer": customer, "orders": orders})
+
+# endregion Async read views
+
+
 # region Order Placement Views
 
 def order_create(request, customer_id=None):
@@ -411,38 +642,26 @@ def order_confirm(request):
         action = request.POST.get('action', '')
         
         if action == 'confirm':
-            # Generate new order ID (find max and add 1)
-            max_order = Orders.objects.order_by('-order_id').first()
-            new_order_id = (max_order.order_id + 1) if max_order else 1
-            
-            # Create the order
-            order = Orders(
-                order_id=new_order_id,
-                customer=customer,
-                employee=employee,
-                order_date=date.today(),
-                required_date=date.fromisoformat(order_data['order_details']['required_date']),
-                ship_via=shipper,
-                freight=0,  # Could calculate based on shipper rates
-                ship_name=order_data['order_details']['ship_name'],
-                ship_address=order_data['order_details']['ship_address'],
-                ship_city=order_data['order_details']['ship_city'],
-                ship_region=order_data['order_details']['ship_region'],
-                ship_postal_code=order_data['order_details']['ship_postal_code'],
-                ship_country=order_data['order_details']['ship_country'],
-            )
-            order.save()
-            
-            # Create order details for each product
-            for item in order_data['products']:
-                order_detail = OrderDetails(
-                    order_id=new_order_id,
-                    product_id=item['product_id'],
-                    unit_price=item['unit_price'],
-                    quantity=item['quantity'],
-                    discount=item['discount']
+            # Allocate the order ID, reserve the stock and write the order and all its lines in one transaction.
+            order_details = order_data['order_details']
+            try:
+                result = place_order(
+                    customer=customer,
+                    employee=employee,
+                    shipper=shipper,
+                    items=order_data['products'],
+                    required_date=date.fromisoformat(order_details['required_date']),
+                    shipping=order_details,
+                    freight=0,  # Could calculate based on shipper rates
                 )
-                order_detail.save()
+            except InsufficientStock as error:
+                # The cart is kept so the quantities can be adjusted.
+                for shortage in error.shortages:
+                    messages.error(request, f'Not enough stock for {shortage}.')
+                if not error.shortages:
+                    messages.error(request, str(error))
+                return redirect(reverse('DjTraders.OrderCreate') + '?step=2')
+            new_order_id = result.order.order_id
             
             # Clear session data
             del request.session['order_data']
@@ -469,14 +688,16 @@ def order_success(request, order_id):
     """
     Order success page - displays order confirmation.
     """
-    order = get_object_or_404(Orders, order_id=order_id)
-    order_details = OrderDetails.objects.filter(order_id=order_id)
+    # Customer, shipper, lines and their products are loaded up front (2 queries in total),
+    # so rendering detail.product.product_name does not query once per line.
+    order = get_object_or_404(
+        Orders.objects.select_related('customer', 'ship_via').with_lines(),
+        order_id=order_id
+    )
+    order_details = order.get_order_details()
     
     # Calculate total
-    total = sum(
-        detail.unit_price * detail.quantity * (1 - detail.discount / 100)
-        for detail in order_details
-    )
+    total = sum(detail.line_total for detail in order_details)
     
     return render(request, 'DjangoTradersApp/Orders/success.html', {
         'order': order,
@@ -495,3 +716,135 @@ def order_cancel(request):
     return redirect('DjTraders.Products')
 
 # endregion Order Placement Views
+
+
+# region Export Views
+
+def export(request, dataset):
+    """
+    Streams a dataset (customers, orders or order_lines) as CSV or JSONL.
+    Query parameters: format=csv|jsonl (default csv), gzip=1 to compress.
+    Rows are streamed as they are read, so memory stays flat however large the table is.
+    """
+    if dataset not in exports.DATASETS:
+        raise Http404(f"Unknown export '{dataset}'.")
+    file_format = request.GET.get("format", "csv")
+    if file_format not in exports.FORMATS:
+        return HttpResponseBadRequest(f"Unknown format '{file_format}'.")
+    compress = request.GET.get("gzip", "") in ("1", "true", "yes")
+
+    response = StreamingHttpResponse(
+        exports.stream_export(dataset, file_format, compress),
+        content_type=exports.CONTENT_TYPES[file_format],
+    )
+    if compress:
+        # Served as a .gz download (not Content-Encoding), so clients keep the compressed file.
+        response["Content-Type"] = "application/gzip"
+    filename = exports.export_filename(dataset, file_format, compress)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+# endregion Export Views
+
+
+# region Cache Statistics Views
+
+def search_cache_stats(request):
+    """Hit, miss and eviction counters of the search result caches of this process (see resultcache.py)."""
+    return JsonResponse({"caches": resultcache.stats()})
+
+# endregion Cache Statistics Views
+
+
+# region API Views
+
+@require_safe
+@versioning.conditional(lambda: [versioning.PRODUCTS, versioning.STOCK, versioning.REFERENCE])
+def products_api(request):
+    """
+    Read-only JSON products API (see api.py).
+    Query parameters: fields=a,b,c (projection), ids=1,2,3 (batch lookup) or cursor= and limit= (pages).
+    """
+    try:
+        return api.json_response(api.products_page(request.GET))
+    except api.BadRequest as error:
+        return api.json_response({"error": str(error)}, status=400)
+
+
+@require_POST
+@permission_required("DjangoTradersApp.change_products", raise_exception=True)
+def products_bulk_update(request):
+    """
+    Bulk price and stock updates from a JSON request body (see bulkupdates.apply_request()),
+    in one transaction. Returns the diff summary, or 400 with every validation error (nothing is changed then).
+    Requires the change_products permission (403 otherwise).
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return api.json_response({"error": "The request body is not valid JSON."}, status=400)
+    try:
+        summary = bulkupdates.apply_request(payload)
+    except bulkupdates.BulkUpdateError as error:
+        return api.json_response({"error": str(error), "errors": error.errors}, status=400)
+    return api.json_response(summary.as_dict())
+
+# endregion API Views
+
+
+# region Image Views
+
+def _image_response(request, kind, object_id):
+    """Streams a decoded image from the file cache (see images.py), cacheable by browsers and proxies."""
+    image = images.open_image(kind, object_id, versioning.request_stamp(request))
+    if image is None:
+        raise Http404("No image found.")
+    stream, content_type = image
+    response = FileResponse(stream, content_type=content_type)
+    patch_cache_control(response, public=True, max_age=settings.IMAGE_MAX_AGE)
+    return response
+
+
+@require_safe
+@versioning.conditional(lambda employee_id: [versioning.employee_key(employee_id)])
+def employee_photo(request, employee_id):
+    """The employee's photo (Employees.photo)."""
+    return _image_response(request, "employee", employee_id)
+
+
+@require_safe
+@versioning.conditional(lambda category_id: [versioning.category_key(category_id)])
+def category_picture(request, category_id):
+    """The category's picture (Categories.picture)."""
+    return _image_response(request, "category", category_id)
+
+# endregion Image Views
+
+
+# region Report Views
+
+@require_safe
+def commission_report(request):
+    """
+    Net sales and commission per employee and month (see commissions.py).
+    Query parameters: start and end (dates), tiers ("threshold:percent,..."), format=csv to download the rows.
+    Without parameters, the report covers this year up to today under the default tiers.
+    """
+    form = CommissionReportForm(request.GET or CommissionReportForm.defaults())
+    report = None
+    if form.is_valid():
+        report = commissions.report(form.cleaned_data['start'], form.cleaned_data['end'], form.cleaned_data['tiers'])
+        if request.GET.get('format') == 'csv':
+            response = HttpResponse(commissions.to_csv(report), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{report.filename()}"'
+            return response
+
+    context = {'form': form, 'report': report}
+    if report is not None:
+        context['employees'] = report.employees()
+        context['csv_query'] = urlencode({
+            'start': report.start.isoformat(), 'end': report.end.isoformat(), 'tiers': str(report.plan), 'format': 'csv',
+        })
+    return render(request, "DjangoTradersApp/Reports/Commissions.html", context)
+
+# endregion Report Views
@@ -0,0 +1,175 @@
+"""
+Worker warm-up.
+
+The first request a new worker serves to each page used to pay for compiling that page's templates
+(Orders/create.html, Products/edit.html, ... and base.html), for populating the URL resolver
+(importing every view module and compiling every pattern) and for filling the cached reference lookups
+and dropdown choice sets. warm_up() does all of that up front:
+    1. compile_templates(): loads every template of the project's template directories
+       (static/templates and the apps' templates folders under BASE_DIR) through the cached template loader
+       (enabled explicitly in settings.TEMPLATES), which keeps the compiled templates for the process,
+    2. resolve_urls(): reverses and resolves every named URL,
+    3. prime_caches(): loads the reference lookups (lookups.py) and choice sets (choices.py).
+
+It runs:
+    - when settings.WARMUP_ON_STARTUP is True: on_ready() (from DjangotradersappConfig.ready(), in server
+      processes: runserver, or a WSGI/ASGI server importing the project) runs steps 1 and 2, since the database
+      should not be used while apps are being initialized; on_application_loaded() (from DjangoProject/wsgi.py
+      and asgi.py, once the application is loaded) runs step 3,
+    - from "python manage.py warmup", which can also measure the cold start with and without warm-up.
+"""
+
+import logging
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import URLPattern, URLResolver, converters, get_resolver, resolve, reverse
+from django.urls.exceptions import NoReverseMatch, Resolver404
+
+from . import choices, lookups
+
+
+logger = logging.getLogger(__name__)
+
+# Sample values for the path converters of URL parameters when reversing URLs.
+SAMPLE_VALUES = {
+    converters.IntConverter: 1,
+    converters.UUIDConverter: uuid.UUID(int=0),
+}
+SAMPLE_STRING = "warmup"
+
+
+def server_process():
+    """False when running a management command other than runserver (migrate, test, shell, ...)."""
+    program = os.path.basename(sys.argv[0]) if sys.argv else ""
+    if program in ("manage.py", "django-admin", "django-admin.py", "__main__.py"):
+        return len(sys.argv) > 1 and sys.argv[1] == "runserver"
+    return True
+
+
+# region Templates
+
+def template_dirs():
+    """The project's template directories: the engines' DIRS and the apps' templates folders under BASE_DIR."""
+    base = Path(settings.BASE_DIR).resolve()
+    dirs = []
+    for backend in engines.all():
+        engine = getattr(backend, "engine", None)  # DjangoTemplates backends
+        if engine is not None:
+            dirs.extend(engine.dirs)
+    dirs.extend(path for path in get_app_template_dirs("templates") if base in Path(path).resolve().parents)
+    return [Path(path) for path in dirs if Path(path).is_dir()]
+
+
+def template_names():
+    names = set()
+    for directory in template_dirs():
+        for path in directory.rglob("*.html"):
+            names.add(path.relative_to(directory).as_posix())
+    return sorted(names)
+
+
+def compile_templates():
+    """Compiles every project template into the cached template loader; returns the number of templates."""
+    from django.template.loader import get_template
+
+    names = template_names()
+    for name in names:
+        get_template(name)
+    return len(names)
+
+# endregion Templates
+
+
+# region URLs
+
+def named_patterns(resolver=None, namespace=""):
+    """(name, pattern) for every named URL pattern, with namespaces ("admin:index")."""
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            yield from named_patterns(pattern, prefix)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f"{namespace}{pattern.name}", pattern
+
+
+def sample_kwargs(pattern):
+    return {
+        name: SAMPLE_VALUES.get(type(converter), SAMPLE_STRING)
+        for name, converter in getattr(pattern.pattern, "converters", {}).items()
+    }
+
+
+def resolve_urls():
+    """
+    Populates the URL resolver and reverses and resolves every named URL.
+    Returns the number of URLs resolved (patterns that cannot be reversed with sample values are skipped).
+    """
+    resolved = 0
+    for name, pattern in named_patterns():
+        try:
+            resolve(reverse(name, kwargs=sample_kwargs(pattern) or None))
+        except (NoReverseMatch, Resolver404):
+            continue
+        resolved += 1
+    return resolved
+
+# endregion URLs
+
+
+def prime_caches():
+    """Loads the reference lookups and choice sets; returns how many were loaded (0 if the database is down)."""
+    primed = 0
+    try:
+        for lookup in lookups.REGISTRY:
+            lookup.get()
+            primed += 1
+        for choice_set in choices.REGISTRY:
+            choice_set.get()
+            primed += 1
+    except DatabaseError as error:
+        logger.warning("Cache warm-up skipped: %s", error)
+    return primed
+
+
+STEPS = {
+    "templates": compile_templates,
+    "urls": resolve_urls,
+    "caches": prime_caches,
+}
+
+
+def warm_up(steps=tuple(STEPS)):
+    """Runs the warm-up steps; returns {step: (count, milliseconds)}."""
+    report = {}
+    for step in steps:
+        started = time.perf_counter()
+        count = STEPS[step]()
+        report[step] = (count, (time.perf_counter() - started) * 1000)
+    logger.info(
+        "Warm-up: %s",
+        ", ".join(f"{step} {count} in {ms:.1f} ms" for step, (count, ms) in report.items()),
+    )
+    return report
+
+
+def on_ready():
+    """DjangotradersappConfig.ready(): compiles the templates and resolves the URLs of server processes."""
+    if getattr(settings, "WARMUP_ON_STARTUP", False) and server_process():
+        warm_up(["templates", "urls"])
+
+
+def on_application_loaded():
+    """DjangoProject/wsgi.py and asgi.py: primes the caches of a new worker."""
+    if getattr(settings, "WARMUP_ON_STARTUP", False):
+        warm_up(["caches"])
+        # Opened outside a request: don't keep the worker's startup connections.
+        connections.close_all()
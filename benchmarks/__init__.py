@@ -0,0 +1,8 @@
+"""
+Performance benchmarks for DjangoTraders.
+
+The benchmarks run against a local SQLite database (benchmarks/settings.py), never the PostgreSQL
+database configured in DjangoProject/settings.py. Run them from the repository root, e.g.:
+
+    python -m benchmarks.keyset_pagination
+"""
@@ -0,0 +1,187 @@
+"""
+Sync views under WSGI vs async views under ASGI, at 50 to 500 concurrent clients.
+
+    python -m benchmarks.asgi_throughput [--clients 50,100,250,500] [--requests-per-client 5]
+                                         [--wsgi-threads 32] [--pages customer_detail,...]
+
+Both applications are driven in-process (no HTTP server or sockets), so the numbers compare the
+request handling models rather than a particular server:
+    wsgi: DjangoProject.wsgi's application called from a pool of --wsgi-threads threads,
+          like a threaded WSGI server (gunicorn --threads, mod_wsgi); the sync views are requested.
+    asgi: DjangoProject.asgi's application called from asyncio tasks on one event loop,
+          like uvicorn/daphne; the async views (DjTraders/Async/...) are requested.
+Each client sends its requests one after another (closed loop). For every page, mode and client count
+the output has the throughput (requests per second), p50/p95/p99 latency and the error count, as JSON.
+
+Uses the benchmark database (benchmarks/settings.py); run benchmarks.dataset or
+benchmarks.url_latency --generate first to fill it.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from benchmarks.schema import setup_django
+
+
+# page name: (sync URL name, async URL name, URL kwargs factory, query)
+PAGES = {
+    "products": ("DjTraders.Products", "DjTraders.Async.Products", lambda keys: {}, {"page": 2}),
+    "product_detail": ("DjTraders.ProductDetail", "DjTraders.Async.ProductDetail",
+                       lambda keys: {"product_id": keys["hot_product"]}, {}),
+    "customers": ("DjTraders.Customers", "DjTraders.Async.Customers", lambda keys: {}, {"country": "Germany"}),
+    "customer_detail": ("DjTraders.CustomerDetail", "DjTraders.Async.CustomerDetail",
+                        lambda keys: {"customer_id": keys["cold_customer"]}, {}),
+    "customer_orders": ("DjTraders.CustomerOrders", "DjTraders.Async.CustomerOrders",
+                        lambda keys: {"customer_id": keys["cold_customer"]}, {}),
+}
+
+
+def percentile(sorted_values, percent):
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+# region Drivers
+
+def wsgi_request(application, path, query):
+    """Calls the WSGI application once; returns the status code."""
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query, "SCRIPT_NAME": "",
+        "SERVER_NAME": "testserver", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "testserver", "wsgi.input": io.BytesIO(b""), "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http", "wsgi.version": (1, 0), "wsgi.multithread": True,
+        "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    status = []
+    body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_request(application, path, query):
+    """Calls the ASGI application once; returns the status code."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "headers": [(b"host", b"testserver")],
+        "server": ("testserver", 80), "client": ("127.0.0.1", 50000),
+    }
+    received = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()  # the client stays connected until the response is complete
+        return {"type": "http.disconnect"}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await application(scope, receive, send)
+    disconnected.set()
+    return status[0]
+
+# endregion Drivers
+
+
+async def run_clients(clients, requests_per_client, request):
+    """Runs "clients" closed-loop clients; request() is an awaitable factory returning a status code."""
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                status = await request()
+            except Exception:
+                status = 599
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 500:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {p: round(percentile(latencies, int(p[1:])), 2) for p in ("p50", "p95", "p99")},
+    }
+
+
+def run(client_counts, requests_per_client, wsgi_threads, pages, log=None):
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import reverse
+
+    from benchmarks.url_latency import sample_keys
+
+    log = log or (lambda message: None)
+    keys = sample_keys()
+    wsgi_application = get_wsgi_application()
+    asgi_application = get_asgi_application()
+    results = []
+    with ThreadPoolExecutor(max_workers=wsgi_threads) as pool:
+        for page in pages:
+            sync_name, async_name, kwargs, query = PAGES[page]
+            query_string = urlencode(query)
+            sync_path = reverse(sync_name, kwargs=kwargs(keys))
+            async_path = reverse(async_name, kwargs=kwargs(keys))
+
+            def wsgi_call():
+                loop = asyncio.get_running_loop()
+                return loop.run_in_executor(pool, wsgi_request, wsgi_application, sync_path, query_string)
+
+            def asgi_call():
+                return asgi_request(asgi_application, async_path, query_string)
+
+            for clients in client_counts:
+                for mode, request in (("wsgi", wsgi_call), ("asgi", asgi_call)):
+                    log(f"{page}: {mode}, {clients} clients")
+                    asyncio.run(run_clients(min(clients, 5), 1, request))  # warm-up
+                    result = asyncio.run(run_clients(clients, requests_per_client, request))
+                    results.append({"page": page, "mode": mode, "clients": clients, **result})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="50,100,250,500")
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    parser.add_argument("--wsgi-threads", type=int, default=32)
+    parser.add_argument("--pages", default=",".join(PAGES), help=f"Comma-separated subset of: {', '.join(PAGES)}.")
+    args = parser.parse_args()
+
+    setup_django()
+    client_counts = [int(count) for count in args.clients.split(",")]
+    pages = [page for page in args.pages.split(",") if page]
+    results = run(client_counts, args.requests_per_client, args.wsgi_threads, pages,
+                  log=lambda message: print(message, file=sys.stderr))
+    print(json.dumps({"benchmark": "asgi_throughput", "wsgi_threads": args.wsgi_threads,
+                      "requests_per_client": args.requests_per_client, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
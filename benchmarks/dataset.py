@@ -0,0 +1,359 @@
+"""
+Synthetic Northwind-shaped dataset for the benchmarks.
+
+    python -m benchmarks.dataset [--customers 100000] [--orders 1000000] [--lines 5000000] [--seed 1]
+
+Replaces the contents of the benchmark database's Northwind tables with generated rows
+(the schema is created first if needed, see schema.py). Volumes are configurable; the data is skewed
+like real order history rather than uniform:
+    - customers and products are picked with Zipf-like popularity (a few customers and products
+      account for most orders and lines), employees with a milder skew;
+    - customer countries follow a weighted list (USA and Germany are the most common);
+    - order dates grow denser towards the end of the date range;
+    - lines per order, quantities and discounts follow long-tailed distributions.
+Employee photos and category pictures are small bitmaps behind an OLE header, stored like Northwind's.
+
+The same --seed always produces the same data. Orders and order lines are written with executemany
+in batches (one transaction per batch); afterwards the product search documents and the sales rollups
+are rebuilt, so every page sees consistent derived data.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import struct
+import time
+from datetime import date, timedelta
+
+from benchmarks.schema import create_schema, setup_django
+
+
+COUNTRIES = [
+    # (country, weight, cities)
+    ("USA", 20, ["Seattle", "Portland", "Boise", "Anchorage", "Albuquerque", "Eugene"]),
+    ("Germany", 16, ["Berlin", "Munchen", "Frankfurt", "Koln", "Stuttgart", "Leipzig"]),
+    ("France", 12, ["Paris", "Lyon", "Marseille", "Nantes", "Lille"]),
+    ("Brazil", 10, ["Sao Paulo", "Rio de Janeiro", "Campinas", "Resende"]),
+    ("UK", 8, ["London", "Cowes", "Manchester", "Leeds"]),
+    ("Spain", 6, ["Madrid", "Barcelona", "Sevilla"]),
+    ("Mexico", 6, ["Mexico D.F.", "Monterrey", "Puebla"]),
+    ("Venezuela", 4, ["Caracas", "Barquisimeto"]),
+    ("Italy", 4, ["Torino", "Bergamo", "Reggio Emilia"]),
+    ("Canada", 4, ["Montreal", "Tsawassen", "Vancouver"]),
+    ("Sweden", 3, ["Lulea", "Brache"]),
+    ("Austria", 3, ["Graz", "Salzburg"]),
+    ("Argentina", 2, ["Buenos Aires"]),
+    ("Denmark", 2, ["Kobenhavn", "Arhus"]),
+]
+CATEGORIES = [
+    "Beverages", "Condiments", "Confections", "Dairy Products",
+    "Grains/Cereals", "Meat/Poultry", "Produce", "Seafood",
+]
+COMPANY_WORDS = [
+    "Alfreds", "Blauer", "Bon", "Centro", "Comercio", "Die", "Eastern", "Folk", "Great", "Hungry",
+    "Island", "La", "Lonesome", "Maison", "North", "Old", "Piccolo", "Queen", "Rattlesnake", "Save",
+    "Split", "The", "Toms", "Vaffeljernet", "White", "Wilman", "Wolski",
+]
+COMPANY_NOUNS = [
+    "Futterkiste", "Trading", "Delikatessen", "Markets", "Imports", "Grocery", "Traders", "Foods",
+    "Market", "Cozinha", "Supermarket", "Handel", "Canyon", "Export", "Kiosk", "Store",
+]
+PRODUCT_WORDS = [
+    "Chai", "Chang", "Aniseed", "Cajun", "Gumbo", "Boysenberry", "Organic", "Northwoods", "Mishi",
+    "Ikura", "Queso", "Konbu", "Tofu", "Genen", "Pavlova", "Alice", "Carnarvon", "Teatime", "Sir",
+    "Gustaf's", "Tunnbrod", "Guarana", "NuNuCa", "Gumbar", "Schoggi", "Rossle", "Thuringer",
+]
+PRODUCT_NOUNS = [
+    "Tea", "Syrup", "Seasoning", "Mix", "Spread", "Pears", "Sauce", "Cheese", "Chocolate", "Biscuits",
+    "Crab", "Scones", "Bread", "Coffee", "Sausage", "Herring", "Lager", "Ale", "Dumplings", "Noodles",
+]
+FIRST_NAMES = ["Nancy", "Andrew", "Janet", "Margaret", "Steven", "Michael", "Robert", "Laura", "Anne"]
+LAST_NAMES = ["Davolio", "Fuller", "Leverling", "Peacock", "Buchanan", "Suyama", "King", "Callahan", "Dodsworth"]
+TITLES = ["Owner", "Sales Representative", "Order Administrator", "Marketing Manager",
+          "Accounting Manager", "Sales Agent", "Purchasing Manager"]
+SHIPPERS = ["Speedy Express", "United Package", "Federal Shipping", "Northwind Freight", "Global Cargo"]
+DISCOUNTS = [0] * 12 + [5, 5, 10, 10, 15, 20, 25]
+
+START_DATE = date(2015, 1, 1)
+END_DATE = date(2025, 12, 31)
+
+
+def zipf_weights(count, exponent):
+    """Cumulative weights 1/rank^exponent for random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def ole_bitmap(width, height, shade):
+    """
+    A 24-bit BMP (a color gradient, varied by shade) behind a zeroed OLE header and with trailing padding,
+    like the images Northwind stores (see DjangoTradersApp.images.decode()).
+    """
+    from DjangoTradersApp.images import OLE_HEADER_SIZE
+
+    row_size = (width * 3 + 3) // 4 * 4
+    # Rows are stored bottom-up, as blue, green, red bytes padded to a multiple of 4.
+    pixels = b"".join(
+        b"".join(bytes((shade % 256, y * 255 // height, x * 255 // width)) for x in range(width)).ljust(row_size, b"\0")
+        for y in range(height)
+    )
+    header = b"BM" + struct.pack("<IHHI", 54 + len(pixels), 0, 0, 54)
+    info = struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, len(pixels), 2835, 2835, 0, 0)
+    return bytes(OLE_HEADER_SIZE) + header + info + pixels + bytes(16)
+
+
+def customer_code(number):
+    """A 5-letter customer ID (like ALFKI) for a number below 26**5."""
+    letters = []
+    for _ in range(5):
+        number, digit = divmod(number, 26)
+        letters.append(chr(ord("A") + digit))
+    return "".join(reversed(letters))
+
+
+class DatasetGenerator:
+    """Generates and writes the dataset; see the module docstring."""
+
+    def __init__(self, customers=10_000, orders=100_000, lines=500_000, products=1_000, employees=50,
+                 suppliers=100, seed=1, batch_size=10_000):
+        if customers > 26 ** 5:
+            raise ValueError("At most 26**5 customers can be generated (5-letter customer IDs).")
+        self.counts = {"customers": customers, "orders": orders, "lines": lines, "products": products,
+                       "employees": employees, "suppliers": suppliers}
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+
+    # region Writing
+
+    def _insert(self, model, columns, rows):
+        """INSERTs rows (tuples in "columns" order) with executemany, batch by batch."""
+        from django.db import connection
+
+        quote = connection.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(model._meta.get_field(name).column) for name in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        written = 0
+        with connection.cursor() as cursor:
+            for batch in _batches(rows, self.batch_size):
+                cursor.executemany(sql, batch)
+                written += len(batch)
+        return written
+
+    def clear(self):
+        """Deletes all rows of the Northwind tables and the derived app tables."""
+        from django.db import connection
+
+        from benchmarks.schema import unmanaged_models
+        from DjangoTradersApp.models import IdCounter, ProductSearchDocument
+        from DjangoTradersApp.rollups import ROLLUPS
+
+        models = [rollup for rollup, _, _ in ROLLUPS] + [ProductSearchDocument, IdCounter]
+        models += list(reversed(unmanaged_models()))
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+
+    # endregion Writing
+
+    # region Reference tables
+
+    def reference_rows(self):
+        from DjangoTradersApp.models import Categories, Employees, Products, Region, Shippers, Suppliers
+
+        rand = self.random
+        counts = self.counts
+        self._insert(Region, ["region_id", "region_description"],
+                     [(1, "Eastern"), (2, "Western"), (3, "Northern"), (4, "Southern")])
+        self._insert(Categories, ["category_id", "category_name", "description", "picture"],
+                     [(number, name, f"{name} of all kinds", ole_bitmap(64, 64, number * 32))
+                      for number, name in enumerate(CATEGORIES, start=1)])
+        self._insert(Shippers, ["shipper_id", "company_name", "phone"],
+                     [(number, name, f"(503) 555-{number:04d}") for number, name in enumerate(SHIPPERS, start=1)])
+
+        suppliers = []
+        for number in range(1, counts["suppliers"] + 1):
+            country, _, cities = rand.choice(COUNTRIES)
+            suppliers.append((number, self._company_name(), rand.choice(FIRST_NAMES) + " " + rand.choice(LAST_NAMES),
+                              rand.choice(TITLES), rand.choice(cities), country))
+        self._insert(Suppliers, ["supplier_id", "company_name", "contact_name", "contact_title", "city", "country"],
+                     suppliers)
+
+        employees = []
+        for number in range(1, counts["employees"] + 1):
+            employees.append((number, rand.choice(LAST_NAMES), rand.choice(FIRST_NAMES), "Sales Representative",
+                              START_DATE - timedelta(days=rand.randint(0, 3650)), "Seattle", "USA",
+                              None if number == 1 else 1 + (number - 1) // 10, ole_bitmap(96, 112, number * 5)))
+        self._insert(Employees, ["employee_id", "last_name", "first_name", "title", "hire_date", "city", "country",
+                                 "reports_to", "photo"], employees)
+
+        self.product_prices = []
+        products = []
+        for number in range(1, counts["products"] + 1):
+            price = round(rand.lognormvariate(3.0, 0.8), 2)
+            self.product_prices.append(price)
+            products.append((
+                number,
+                f"{rand.choice(PRODUCT_WORDS)} {rand.choice(PRODUCT_NOUNS)} {number}"[:40],
+                rand.randint(1, counts["suppliers"]),
+                rand.randint(1, len(CATEGORIES)),
+                f"{rand.choice([10, 12, 24, 36, 48])} - {rand.choice([100, 250, 500])} g",
+                price,
+                rand.randint(0, 120),
+                rand.choice([0, 0, 0, 10, 20, 40]),
+                rand.choice([0, 5, 10, 15, 25, 30]),
+                1 if rand.random() < 0.1 else 0,
+            ))
+        self._insert(Products, ["product_id", "product_name", "supplier", "category", "quantity_per_unit",
+                                "unit_price", "units_in_stock", "units_on_order", "reorder_level", "discontinued"],
+                     products)
+
+    def _company_name(self):
+        return f"{self.random.choice(COMPANY_WORDS)} {self.random.choice(COMPANY_NOUNS)}"
+
+    def customer_rows(self):
+        from DjangoTradersApp.models import Customers
+
+        rand = self.random
+        weights = list(itertools.accumulate(weight for _, weight, _ in COUNTRIES))
+        self.customers = []  # (customer_id, company_name, city, country) for the ship_* columns
+        rows = []
+        # Customer IDs are spread over the 5-letter space so the ID order differs from the name order.
+        stride = max(26 ** 5 // max(self.counts["customers"], 1), 1)
+        for number in range(self.counts["customers"]):
+            country, _, cities = rand.choices(COUNTRIES, cum_weights=weights)[0]
+            city = rand.choice(cities)
+            customer_id = customer_code(number * stride)
+            company = f"{self._company_name()} {number}"[:40]
+            self.customers.append((customer_id, company, city, country))
+            rows.append((customer_id, company, rand.choice(FIRST_NAMES) + " " + rand.choice(LAST_NAMES),
+                         rand.choice(TITLES), f"{rand.randint(1, 999)} Main St.", city, None,
+                         f"{rand.randint(10000, 99999)}", country, f"030-{rand.randint(1000000, 9999999)}"))
+        self._insert(Customers, ["customer_id", "company_name", "contact_name", "contact_title", "address", "city",
+                                 "region", "postal_code", "country", "phone"], rows)
+
+    # endregion Reference tables
+
+    # region Orders
+
+    def order_rows(self):
+        """Writes the orders and their lines, one transaction per batch of orders. Returns the line count."""
+        from django.db import transaction
+
+        from DjangoTradersApp.models import OrderDetails, Orders
+
+        rand = self.random
+        counts = self.counts
+        customer_weights = zipf_weights(len(self.customers), 1.0)
+        product_ids = list(range(1, counts["products"] + 1))
+        product_weights = zipf_weights(counts["products"], 1.1)
+        employee_ids = list(range(1, counts["employees"] + 1))
+        employee_weights = zipf_weights(counts["employees"], 0.5)
+        extra_lines = max(counts["lines"] / max(counts["orders"], 1) - 1, 0)
+        span = (END_DATE - START_DATE).days
+
+        order_columns = ["order_id", "customer", "employee", "order_date", "required_date", "shipped_date",
+                         "ship_via", "freight", "ship_name", "ship_city", "ship_country"]
+        line_columns = ["order", "product", "unit_price", "quantity", "discount"]
+        line_count = 0
+        for first in range(1, counts["orders"] + 1, self.batch_size):
+            size = min(self.batch_size, counts["orders"] + 1 - first)
+            customers = rand.choices(self.customers, cum_weights=customer_weights, k=size)
+            employees = rand.choices(employee_ids, cum_weights=employee_weights, k=size)
+            orders, lines = [], []
+            for order_id, customer, employee_id in zip(range(first, first + size), customers, employees):
+                # sqrt skews the dates towards the end of the range (a growing business).
+                order_date = START_DATE + timedelta(days=int(span * rand.random() ** 0.5))
+                shipped = order_date + timedelta(days=rand.randint(1, 30)) if rand.random() < 0.97 else None
+                customer_id, company, city, country = customer
+                orders.append((order_id, customer_id, employee_id, order_date, order_date + timedelta(days=28),
+                               shipped, rand.randint(1, len(SHIPPERS)), round(rand.expovariate(1 / 60), 2),
+                               company, city, country))
+
+                wanted = min(1 + (int(rand.expovariate(1 / extra_lines)) if extra_lines else 0), len(product_ids))
+                chosen = set()
+                while len(chosen) < wanted:  # popular products are drawn repeatedly; draw until distinct
+                    chosen.update(rand.choices(product_ids, cum_weights=product_weights, k=wanted - len(chosen)))
+                for product_id in sorted(chosen):
+                    lines.append((order_id, product_id, self.product_prices[product_id - 1],
+                                  min(1 + int(rand.expovariate(1 / 12)), 1000), rand.choice(DISCOUNTS)))
+            with transaction.atomic():
+                self._insert(Orders, order_columns, orders)
+                line_count += self._insert(OrderDetails, line_columns, lines)
+        return line_count
+
+    # endregion Orders
+
+    def generate(self, log=None):
+        """Replaces the data and returns a summary (counts and timings)."""
+        from django.db import connection
+
+        from DjangoTradersApp import lookups, rollups, search
+
+        log = log or (lambda message: None)
+        timings = {}
+
+        def step(name, function):
+            started = time.perf_counter()
+            log(f"{name}...")
+            result = function()
+            timings[name] = round(time.perf_counter() - started, 2)
+            return result
+
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode = WAL")
+                cursor.execute("PRAGMA synchronous = OFF")
+        step("clear", self.clear)
+        step("reference tables", self.reference_rows)
+        step("customers", self.customer_rows)
+        line_count = step("orders", self.order_rows)
+        step("search index", search.index_products)
+        step("rollups", rollups.rebuild)
+        if connection.vendor == "sqlite":
+            step("analyze", lambda: connection.cursor().execute("ANALYZE"))
+        lookups.invalidate_all()
+        return {"seed": self.seed, **self.counts, "lines": line_count, "seconds": timings}
+
+
+def _batches(rows, size):
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def add_arguments(parser):
+    """The dataset volume options (shared with the view benchmark)."""
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=500_000, help="Target number of order lines (approximate).")
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--employees", type=int, default=50)
+    parser.add_argument("--suppliers", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def generator_from_args(args):
+    return DatasetGenerator(customers=args.customers, orders=args.orders, lines=args.lines,
+                            products=args.products, employees=args.employees, suppliers=args.suppliers,
+                            seed=args.seed)
+
+
+def main():
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django()
+    create_schema()
+    summary = generator_from_args(args).generate(log=lambda message: print(message, file=sys.stderr))
+    print(json.dumps({"dataset": summary}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Offset vs keyset pagination latency, from page 1 to page 10,000.
+
+    python -m benchmarks.keyset_pagination [--customers 100000] [--pages 1,10,100,1000,10000]
+
+Fills the customers table of the benchmark database up to --customers rows, then times
+loading each page of CustomerListView's ordering (company_name, customer_id) with:
+    offset: Django's Paginator (COUNT(*) + OFFSET), as the list views do by default;
+    keyset: pagination.KeysetPaginator, from a cursor positioned at the end of the previous page.
+Prints the median latency per page (milliseconds) as JSON.
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.schema import create_schema, setup_django
+
+
+def fill_customers(count, batch_size=5000):
+    from DjangoTradersApp.models import Customers
+
+    existing = Customers.objects.count()
+    batch = []
+    for number in range(existing, count):
+        batch.append(Customers(
+            customer_id=f"{number:05X}",
+            company_name=f"Company {number * 7919 % count:07d}",
+            country="Germany",
+        ))
+        if len(batch) >= batch_size:
+            Customers.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Customers.objects.bulk_create(batch)
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def run(customers, pages, per_page, repeat):
+    from django.core.paginator import Paginator
+
+    from DjangoTradersApp.models import Customers
+    from DjangoTradersApp.pagination import KeysetPaginator, encode_cursor
+
+    fill_customers(customers)
+    queryset = Customers.objects.order_by("company_name", "customer_id")
+    keyset = KeysetPaginator(Customers.objects.all(), per_page, "company_name")
+
+    results = []
+    for page in pages:
+        if (page - 1) * per_page >= customers:
+            continue
+        offset_ms = median_ms(lambda: list(Paginator(queryset, per_page).page(page)), repeat)
+
+        cursor = None
+        if page > 1:
+            # Position the cursor at the last row of the previous page (not timed).
+            last = queryset[(page - 1) * per_page - 1]
+            cursor = encode_cursor({"v": last.company_name, "k": last.customer_id, "d": "next", "n": page - 1})
+        keyset_ms = median_ms(lambda: list(keyset.page(cursor)), repeat)
+        results.append({"page": page, "offset_ms": offset_ms, "keyset_ms": keyset_ms})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--pages", default="1,10,100,1000,10000")
+    parser.add_argument("--per-page", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    create_schema()
+    pages = [int(page) for page in args.pages.split(",")]
+    results = run(args.customers, pages, args.per_page, args.repeat)
+    print(json.dumps({"benchmark": "keyset_pagination", "customers": args.customers,
+                      "per_page": args.per_page, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
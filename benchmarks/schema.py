@@ -0,0 +1,50 @@
+"""
+Builds the DjangoTraders schema in the benchmark database.
+
+The Northwind models are managed = False (their tables live in the PostgreSQL database),
+so their tables are created here with the schema editor; the app's own tables come from migrate.
+"""
+
+import os
+
+import django
+
+
+def setup_django():
+    """Configures Django with benchmarks.settings (unless another settings module is already set)."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+
+
+def unmanaged_models():
+    """The app's unmanaged (Northwind) models, referenced tables first."""
+    from DjangoTradersApp import models
+
+    return [
+        models.Categories,
+        models.Suppliers,
+        models.Products,
+        models.Region,
+        models.Shippers,
+        models.Customers,
+        models.Employees,
+        models.Orders,
+        models.OrderDetails,
+    ]
+
+
+def create_schema(verbosity=0):
+    """
+    Creates the missing Northwind tables, then runs the migrations
+    (app tables, and the indexes that are only created when the Northwind tables exist).
+    """
+    from django.core.management import call_command
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        existing = set(connection.introspection.table_names(cursor))
+    with connection.schema_editor() as editor:
+        for model in unmanaged_models():
+            if model._meta.db_table not in existing:
+                editor.create_model(model)
+    call_command("migrate", verbosity=verbosity, interactive=False)
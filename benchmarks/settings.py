@@ -0,0 +1,34 @@
+"""
+Settings for the benchmarks: the project settings with a local SQLite database.
+The database file defaults to benchmarks/benchmark.sqlite3 and can be changed with BENCHMARK_DB.
+BENCHMARK_REPLICA_DB names a second SQLite file (e.g. a copy of the first) used as a read replica.
+"""
+
+import os
+
+from DjangoProject.settings import *  # noqa: F401,F403
+from DjangoProject.settings import BASE_DIR
+
+DEBUG = False
+ALLOWED_HOSTS = ["testserver", "localhost", "127.0.0.1"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("BENCHMARK_DB", str(BASE_DIR / "benchmarks" / "benchmark.sqlite3")),
+    }
+}
+if os.environ.get("BENCHMARK_REPLICA_DB"):
+    DATABASES["replica"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": os.environ["BENCHMARK_REPLICA_DB"]}
+    DATABASE_REPLICAS = ["replica"]
+
+# Keep the benchmark output machine-readable.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "loggers": {"DjangoTradersApp": {"level": "WARNING"}},
+}
+
+# Query counts are part of the benchmark reports; don't log query budget warnings for every request.
+DEFAULT_QUERY_BUDGET = None
+QUERY_BUDGETS = {}
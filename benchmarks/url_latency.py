@@ -0,0 +1,378 @@
+"""
+Latency, query count and memory of every URL in DjangoTradersApp/urls.py.
+
+    python -m benchmarks.url_latency [--generate] [--customers 100000 --orders 1000000 --lines 5000000]
+                                     [--iterations 20] [--urls DjTraders.Products,...] [--output results.json]
+
+Requests go through django.test.Client against the benchmark database (benchmarks/settings.py),
+so the full middleware stack, URL resolution and template rendering are included.
+With --generate (or when the database holds no orders) the synthetic dataset is generated first,
+with the volume options of benchmarks.dataset.
+
+Every URL name has one or more scenarios (see scenarios()): e.g. a page for the busiest customer and for
+a customer with a single order. Each scenario is requested once to warm up, then --iterations times;
+the output has per scenario:
+    latency_ms: p50/p95/p99/mean/min/max,
+    queries / db_ms: median and maximum per request (recorded with instrumentation.QueryRecorder),
+    peak_memory_kb: Python memory allocated at the peak of one extra request (tracemalloc),
+    status codes and response size,
+plus the process's maximum resident set size. POST scenarios (the order confirmation, the bulk product
+update) run in a transaction that is rolled back, so the dataset is the same for every run; scenarios that
+need a permission are requested as a "benchmark" user holding it. URL names without a scenario are listed
+under "not_covered" (and reported on stderr). The JSON keys are stable, so results of two releases can be diffed.
+"""
+
+import argparse
+import json
+import math
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from benchmarks import dataset
+from benchmarks.schema import create_schema, setup_django
+
+
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class Scenario:
+    """
+    One request to time: URL name, URL kwargs, query parameters, method (with its body, sent as form data
+    or with content_type), a session to prepare and the permission the user needs.
+    """
+    url_name: str
+    label: str
+    kwargs: dict = field(default_factory=dict)
+    query: dict = field(default_factory=dict)
+    method: str = "get"
+    data: dict = field(default_factory=dict)
+    content_type: str = None
+    session: dict = None
+    permission: str = None
+    # Requests that read a whole table (exports) run with fewer iterations.
+    heavy: bool = False
+
+
+# region Scenarios
+
+def sample_keys():
+    """Picks the sample customers, products and order the scenarios request, from the sales rollups."""
+    from DjangoTradersApp.models import CustomerSales, Orders, ProductSales
+
+    def busiest_and_quietest(model, key):
+        ordered = model.objects.filter(order_count__gt=0).order_by("-order_count", key)
+        busiest = ordered.values_list(key, flat=True).first()
+        quietest = ordered.reverse().values_list(key, flat=True).first()
+        return busiest, quietest
+
+    hot_customer, cold_customer = busiest_and_quietest(CustomerSales, "customer_id")
+    hot_product, cold_product = busiest_and_quietest(ProductSales, "product_id")
+    latest_order = Orders.objects.order_by("-order_id").values_list("order_id", flat=True).first()
+    return {
+        "hot_customer": hot_customer, "cold_customer": cold_customer,
+        "hot_product": hot_product, "cold_product": cold_product,
+        "latest_order": latest_order,
+    }
+
+
+def benchmark_user(permission):
+    """The "benchmark" user, holding permission ("app_label.codename")."""
+    from django.contrib.auth.models import Permission, User
+
+    app_label, codename = permission.split(".")
+    user, _ = User.objects.get_or_create(username="benchmark")
+    user.user_permissions.add(Permission.objects.get(content_type__app_label=app_label, codename=codename))
+    return user
+
+
+def order_session(keys):
+    """The order wizard's session data for a two-line order of the busiest customer."""
+    from DjangoTradersApp.models import Products
+
+    items = [
+        {"product_id": product.product_id, "product_name": product.product_name,
+         "unit_price": product.unit_price or 0, "quantity": 2, "discount": 0}
+        for product in Products.objects.filter(product_id__in=[keys["hot_product"], keys["cold_product"]])
+    ]
+    return {"order_data": {
+        "customer_id": keys["hot_customer"],
+        "products": items,
+        "order_details": {
+            "employee_id": 1, "shipper_id": 1,
+            "required_date": (date.today() + timedelta(days=14)).isoformat(),
+            "ship_name": "Benchmark", "ship_address": "1 Main St.", "ship_city": "Berlin",
+            "ship_region": "", "ship_postal_code": "12209", "ship_country": "Germany",
+        },
+    }}
+
+
+def scenarios(keys):
+    hot, cold = {"customer_id": keys["hot_customer"]}, {"customer_id": keys["cold_customer"]}
+    hot_product, cold_product = {"product_id": keys["hot_product"]}, {"product_id": keys["cold_product"]}
+    session = order_session(keys)
+    return [
+        Scenario("home", "welcome page"),
+        Scenario("DjTraders.Customers", "first page"),
+        Scenario("DjTraders.Customers", "page 100", query={"page": 100}),
+        Scenario("DjTraders.Customers", "country filter", query={"country": "Germany"}),
+        Scenario("DjTraders.Customers", "keyset first page", query={"paging": "keyset"}),
+        Scenario("DjTraders.Products", "first page"),
+        Scenario("DjTraders.Products", "page 10", query={"page": 10}),
+        Scenario("DjTraders.Products", "search", query={"search": "chai"}),
+        Scenario("DjTraders.ProductDetail", "best seller", kwargs=hot_product),
+        Scenario("DjTraders.ProductDetail", "rarely sold", kwargs=cold_product),
+        Scenario("DjTraders.ProductCreate", "form"),
+        Scenario("DjTraders.ProductEdit", "form", kwargs=hot_product),
+        Scenario("DjTraders.CustomerOrders", "busiest customer", kwargs=hot),
+        Scenario("DjTraders.CustomerOrders", "quietest customer", kwargs=cold),
+        Scenario("DjTraders.CustomerDetail", "busiest customer", kwargs=hot),
+        Scenario("DjTraders.CustomerDetail", "quietest customer", kwargs=cold),
+        Scenario("CustomersList", "all customers"),
+        Scenario("CustomersList", "country filter", query={"country": "Germany"}),
+        Scenario("CustomerDetail", "busiest customer", kwargs=hot),
+        Scenario("CustomerDetail", "quietest customer", kwargs=cold),
+        Scenario("DjTraders.OrderCreate", "select customer"),
+        Scenario("DjTraders.OrderCreateForCustomer", "add products", kwargs=hot),
+        Scenario("DjTraders.OrderConfirm", "review", session=session),
+        Scenario("DjTraders.OrderConfirm", "place order (rolled back)", method="post",
+                 data={"action": "confirm"}, session=session),
+        Scenario("DjTraders.OrderSuccess", "latest order", kwargs={"order_id": keys["latest_order"]}),
+        Scenario("DjTraders.OrderCancel", "cancel"),
+        Scenario("DjTraders.Async.Products", "first page"),
+        Scenario("DjTraders.Async.ProductDetail", "best seller", kwargs=hot_product),
+        Scenario("DjTraders.Async.Customers", "country filter", query={"country": "Germany"}),
+        Scenario("DjTraders.Async.CustomerDetail", "busiest customer", kwargs=hot),
+        Scenario("DjTraders.Async.CustomerOrders", "busiest customer", kwargs=hot),
+        Scenario("DjTraders.Api.Products", "first page"),
+        Scenario("DjTraders.Api.Products", "price projection", query={"fields": "product_id,unit_price"}),
+        Scenario("DjTraders.Api.Products", "batch of 20", query={"ids": ",".join(str(i) for i in range(1, 21))}),
+        Scenario("DjTraders.Api.ProductsBulkUpdate", "+5% for one supplier (dry run)", method="post",
+                 data={"select": {"supplier_id": 1},
+                       "changes": [{"field": "unit_price", "operation": "percent", "value": 5}], "dry_run": True},
+                 content_type="application/json", permission="DjangoTradersApp.change_products"),
+        Scenario("DjTraders.Api.ProductsBulkUpdate", "+5% for all products (dry run)", method="post",
+                 data={"select": {"all": True},
+                       "changes": [{"field": "unit_price", "operation": "percent", "value": 5}], "dry_run": True},
+                 content_type="application/json", permission="DjangoTradersApp.change_products"),
+        Scenario("DjTraders.SearchCacheStats", "counters"),
+        Scenario("DjTraders.EmployeePhoto", "photo", kwargs={"employee_id": 1}),
+        Scenario("DjTraders.CategoryPicture", "picture", kwargs={"category_id": 1}),
+        Scenario("DjTraders.CommissionReport", "this year"),
+        Scenario("DjTraders.CommissionReport", "all years, custom tiers",
+                 query={"start": "2000-01-01", "end": date.today().isoformat(), "tiers": "0:1,5000:2,20000:4"}),
+        Scenario("DjTraders.CommissionReport", "all years csv",
+                 query={"start": "2000-01-01", "end": date.today().isoformat(), "format": "csv"}),
+        Scenario("DjTraders.Export", "customers csv", kwargs={"dataset": "customers"}, heavy=True),
+        Scenario("DjTraders.Export", "orders jsonl", kwargs={"dataset": "orders"},
+                 query={"format": "jsonl"}, heavy=True),
+        Scenario("DjTraders.Export", "order lines csv.gz", kwargs={"dataset": "order_lines"},
+                 query={"gzip": 1}, heavy=True),
+    ]
+
+
+def url_names():
+    """All named URL patterns of DjangoTradersApp/urls.py."""
+    from DjangoTradersApp import urls
+
+    return [pattern.name for pattern in urls.urlpatterns if getattr(pattern, "name", None)]
+
+# endregion Scenarios
+
+
+# region Measuring
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else None
+
+
+class ScenarioRunner:
+    def __init__(self, client):
+        self.client = client
+
+    def prepare(self, scenario):
+        if scenario.permission is not None:
+            self.client.force_login(benchmark_user(scenario.permission))
+        if scenario.session is not None:
+            session = self.client.session
+            session.update(scenario.session)
+            session.save()
+
+    def request(self, scenario, url):
+        """Makes one request; returns (response, content size). Streaming content is consumed."""
+        from django.db import transaction
+
+        send = getattr(self.client, scenario.method)
+        data = scenario.query if scenario.method == "get" else scenario.data
+        if scenario.method == "get":
+            response = send(url, data)
+        else:
+            options = {"content_type": scenario.content_type} if scenario.content_type else {}
+            with transaction.atomic():
+                response = send(url, data, **options)
+                transaction.set_rollback(True)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response, size
+
+    def measure(self, scenario, iterations):
+        from django.db import connections
+        from django.urls import reverse
+
+        from DjangoTradersApp.instrumentation import QueryRecorder
+
+        url = reverse(scenario.url_name, kwargs=scenario.kwargs)
+        self.prepare(scenario)
+        self.request(scenario, url)  # warm-up
+
+        latencies, queries, db_ms, statuses, size = [], [], [], set(), 0
+        for _ in range(iterations):
+            self.prepare(scenario)
+            recorder = QueryRecorder()
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                started = time.perf_counter()
+                response, size = self.request(scenario, url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(recorder.count)
+            db_ms.append(recorder.duration_ms)
+            statuses.add(response.status_code)
+
+        self.prepare(scenario)
+        tracemalloc.start()
+        try:
+            self.request(scenario, url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        if scenario.permission is not None:
+            self.client.logout()
+
+        latencies.sort()
+        return {
+            "url_name": scenario.url_name,
+            "scenario": scenario.label,
+            "method": scenario.method.upper(),
+            "path": url,
+            "query": scenario.query,
+            "iterations": iterations,
+            "status": sorted(statuses),
+            "response_bytes": size,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 3),
+                "p95": round(percentile(latencies, 95), 3),
+                "p99": round(percentile(latencies, 99), 3),
+                "mean": round(sum(latencies) / len(latencies), 3),
+                "min": round(latencies[0], 3),
+                "max": round(latencies[-1], 3),
+            },
+            "queries": {"median": _median(queries), "max": max(queries)},
+            "db_ms": {"median": round(_median(db_ms), 3), "max": round(max(db_ms), 3)},
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+
+# endregion Measuring
+
+
+def dataset_counts():
+    from DjangoTradersApp.models import Customers, Employees, OrderDetails, Orders, Products
+
+    return {
+        "customers": Customers.objects.count(),
+        "orders": Orders.objects.count(),
+        "lines": OrderDetails.objects.count(),
+        "products": Products.objects.count(),
+        "employees": Employees.objects.count(),
+    }
+
+
+def run(iterations=20, heavy_iterations=3, only=None, skip_heavy=False, log=None):
+    """Runs the scenarios (optionally only those of the URL names in "only") and returns the report dict."""
+    import django
+    from django.db import connection
+    from django.test import Client
+
+    log = log or (lambda message: None)
+    runner = ScenarioRunner(Client(raise_request_exception=False))
+    selected = [
+        scenario for scenario in scenarios(sample_keys())
+        if (not only or scenario.url_name in only) and not (skip_heavy and scenario.heavy)
+    ]
+    results = []
+    for scenario in selected:
+        log(f"{scenario.url_name}: {scenario.label}")
+        results.append(runner.measure(scenario, heavy_iterations if scenario.heavy else iterations))
+
+    covered = {scenario.url_name for scenario in scenarios(sample_keys())}
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "benchmark": "url_latency",
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": f"{connection.vendor} {connection.Database.sqlite_version}"
+            if connection.vendor == "sqlite" else connection.vendor,
+            "platform": platform.platform(),
+        },
+        "dataset": dataset_counts(),
+        "results": results,
+        "not_covered": [name for name in url_names() if name not in covered],
+        # Linux reports kilobytes (macOS: bytes).
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    dataset.add_arguments(parser)
+    parser.add_argument("--generate", action="store_true", help="Regenerate the dataset before measuring.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--heavy-iterations", type=int, default=3, help="Iterations of the export scenarios.")
+    parser.add_argument("--skip-heavy", action="store_true", help="Skip the export scenarios.")
+    parser.add_argument("--urls", default="", help="Comma-separated URL names to measure (default: all).")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args()
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    setup_django()
+    create_schema()
+    from DjangoTradersApp.models import Orders
+
+    report = {}
+    if args.generate or not Orders.objects.exists():
+        report["generated"] = dataset.generator_from_args(args).generate(log=log)
+    only = {name for name in args.urls.split(",") if name}
+    report.update(run(args.iterations, args.heavy_iterations, only, args.skip_heavy, log=log))
+    if report["not_covered"]:
+        log(f"URL names without a scenario (add them to scenarios()): {', '.join(report['not_covered'])}")
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()